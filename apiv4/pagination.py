@@ -0,0 +1,71 @@
+import base64
+from collections import OrderedDict
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class WeightCursorPagination(BasePagination):
+    """ Keyset pagination over (weight, id), heaviest first.
+
+    The cursor holds the weight and id of the last row of the previous page,
+    so every page is one indexed range query however deep it is, and rows
+    added or removed meanwhile do not shift the following pages.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 20
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def encode_cursor(self, row):
+        return base64.urlsafe_b64encode(f"{row.weight}:{row.pk}".encode("ascii")).decode("ascii")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            weight, pk = base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii").split(":")
+            return int(weight), int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by("-weight", "-pk")
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            weight, pk = cursor
+            queryset = queryset.filter(Q(weight__lt=weight) | Q(weight=weight, pk__lt=pk))
+
+        page = list(queryset[:page_size + 1])
+        self.next_cursor = self.encode_cursor(page[page_size - 1]) if len(page) > page_size else None
+        return page[:page_size]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_first_link(self):
+        return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("first", self.get_first_link()),
+            ("next", self.get_next_link()),
+            ("results", data),
+        ]))
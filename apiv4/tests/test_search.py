@@ -0,0 +1,44 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from package.tests import initial_data
+from searchv2.builders import build_1
+from searchv2.models import SearchV2
+
+
+class SearchBrowseTest(TestCase):
+
+    def setUp(self):
+        initial_data.load()
+        build_1()
+        self.url = reverse('apiv4:searchv2-browse')
+
+    def test_pages(self):
+        expected = list(SearchV2.objects.order_by('-weight', '-pk').values_list('slug', flat=True))
+        slugs = []
+        url = self.url + '?page_size=4'
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        while url:
+            data = self.client.get(url).json()
+            slugs += [item['slug'] for item in data['results']]
+            url = data['next']
+        self.assertEqual(slugs, expected)
+        self.assertEqual(response.json()['facets']['item_type'], {'package': 4, 'grid': 2})
+
+    def test_filters(self):
+        data = self.client.get(self.url, {'q': 'test', 'item_type': 'package'}).json()
+        self.assertEqual(data['next'], None)
+        self.assertEqual(
+            {item['slug'] for item in data['results']},
+            set(SearchV2.objects.filter(item_type='package').values_list('slug', flat=True)),
+        )
+        self.assertEqual(data['facets']['item_type'], {'package': 4})
+        self.assertEqual(data['facets']['category'], {'App': 4})
+
+        data = self.client.get(self.url, {'python3': '1'}).json()
+        self.assertEqual(data['results'], [])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'nope'}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'fresh': 'soon'}).status_code, 400)
@@ -1,12 +1,17 @@
 
 from rest_framework import mixins
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import viewsets
 
 from grid.models import Grid
 from package.models import Package, Category
 from searchv2.models import SearchV2
-from searchv2.views import search_function
+from searchv2.cache import search_results
+from searchv2.query import facet_counts, filter_results, search_queryset
+
+from .pagination import WeightCursorPagination
 
 from .serializers import (
     CategorySerializer,
@@ -17,18 +22,47 @@ from .serializers import (
 
 
 class SearchV2ViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
-    """Accepts a 'q' GET parameter. Results are currently sorted only by
-        their weight.
+    """Accepts a 'q' GET parameter. Results are sorted by relevance and
+        weight, and cached until the next index build.
     """
     serializer_class = SearchV2Serializer
     queryset = SearchV2.objects.all()
+    pagination_class = WeightCursorPagination
 
     def list(self, request):
         qr = request.GET.get('q', '')
-        queryset = search_function(qr)[:20]
+        queryset = search_results(qr, limit=20)
         serializer = SearchV2Serializer(queryset, many=True)
         return Response(serializer.data)
 
+    @action(detail=False)
+    def browse(self, request):
+        """Pages through all the matches of the optional 'q' GET parameter,
+            heaviest first, with the 'cursor' of the 'next' link. Filters:
+            'item_type', 'category', 'python3' (0 or 1) and 'fresh' (committed
+            or released in the last N days). 'facets' counts the matches per
+            item type, category and Python 3 support.
+        """
+        qr = request.GET.get('q', '')
+        queryset = search_queryset(qr) if qr.strip() else SearchV2.objects.all()
+        try:
+            python3 = request.GET.get('python3')
+            fresh = request.GET.get('fresh')
+            queryset = filter_results(
+                queryset,
+                item_type=request.GET.get('item_type'),
+                category=request.GET.get('category'),
+                python3=None if python3 is None else python3 == '1',
+                fresh_days=None if fresh is None else int(fresh),
+            )
+        except ValueError:
+            raise ValidationError({'fresh': 'Expected a number of days'})
+
+        page = self.paginate_queryset(queryset)
+        response = self.get_paginated_response(SearchV2Serializer(page, many=True).data)
+        response.data['facets'] = facet_counts(queryset)
+        return response
+
 
 class PackageViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -0,0 +1,16 @@
+from django.db import connections
+from django.db.models.signals import pre_migrate
+
+
+def create_extensions(sender, using, **kwargs):
+    """ pytest runs with --nomigrations, so the test database is built from
+    the models and the extensions the migrations install do not exist yet.
+    pre_migrate is sent before the tables and their indexes are created. """
+    connection = connections[using]
+    if sender.label == "searchv2" and connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            # searchv2.0005: trigram indexes on SearchV2 use gin_trgm_ops
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+
+pre_migrate.connect(create_extensions, dispatch_uid="conftest_create_extensions")
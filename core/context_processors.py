@@ -1,8 +1,7 @@
 from django.conf import settings
 from django.urls import reverse
-from django.db.models import Max
 
-from searchv2.models import SearchV2
+from searchv2.cache import max_weight
 
 def core_values(request):
     """
@@ -12,7 +11,7 @@ def core_values(request):
     data = {
         'SITE_TITLE': getattr(settings, "SITE_TITLE", "Django Packages"),
         'FRAMEWORK_TITLE': getattr(settings, "FRAMEWORK_TITLE", "Django"),
-        'MAX_WEIGHT': SearchV2.objects.all().aggregate(Max('weight'))['weight__max']
+        'MAX_WEIGHT': max_weight(),
         }
     return data
 
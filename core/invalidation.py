@@ -0,0 +1,132 @@
+"""
+Deferred, coalesced cache invalidation for model save side effects.
+
+Models mark cache keys as dirty with invalidate(), or mark related objects
+with invalidate_related() when finding their keys takes a query (e.g. the
+grids a package belongs to). Inside a deferred_invalidation() block the
+marks are collected and, once the block exits and the current transaction
+commits, resolved with one query per kind and deleted with a single
+cache.delete_many().
+
+Requests that may write run in such a block (see core.middleware); batch
+jobs open one per package or per batch, so that pages do not stay stale
+for the length of a run. Outside a block, keys are deleted when the current
+transaction commits, i.e. right away in autocommit mode.
+
+The block is tracked in a context variable, so the threads started through
+asgiref's sync_to_async share it. Coroutines (the package updater workers)
+use adeferred_invalidation(), which flushes from a thread.
+
+Test settings turn CACHE_INVALIDATION_ON_COMMIT off: TestCase transactions
+never commit, so keys are deleted as soon as the block exits instead.
+"""
+import contextlib
+import contextvars
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+_collector = contextvars.ContextVar("invalidation_collector", default=None)
+_resolvers = {}
+
+
+class InvalidationCollector:
+    """ Dirty cache keys and related objects waiting to be flushed. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.keys = set()
+        self.related = {}
+
+    def add(self, keys=(), name=None, ids=()):
+        with self.lock:
+            self.keys.update(keys)
+            if name is not None:
+                self.related.setdefault(name, set()).update(ids)
+
+    def flush(self):
+        with self.lock:
+            keys, related = self.keys, self.related
+            self.keys, self.related = set(), {}
+        for name, ids in related.items():
+            keys.update(_resolvers[name](ids))
+        if keys:
+            cache.delete_many(list(keys))
+        return keys
+
+
+def _schedule(collector):
+    if settings.CACHE_INVALIDATION_ON_COMMIT:
+        transaction.on_commit(collector.flush)
+    else:
+        collector.flush()
+
+
+def register_invalidation(name, resolver):
+    """ Registers resolver to turn the ids passed to invalidate_related(name)
+    into cache keys. It is called once per flush with a set of ids. """
+    _resolvers[name] = resolver
+
+
+def _add(**kwargs):
+    collector = _collector.get()
+    if collector is not None:
+        collector.add(**kwargs)
+        return
+    collector = InvalidationCollector()
+    collector.add(**kwargs)
+    _schedule(collector)
+
+
+def invalidate(*keys):
+    """ Marks cache keys as dirty. """
+    _add(keys=keys)
+
+
+def invalidate_related(name, *ids):
+    """ Marks objects as dirty; their keys are found by the resolver
+    registered under name. """
+    _add(name=name, ids=ids)
+
+
+@contextlib.contextmanager
+def deferred_invalidation():
+    """ Collects the invalidations of the block and flushes them once on exit.
+    Nested blocks join the outermost one. """
+    if _collector.get() is not None:
+        yield _collector.get()
+        return
+    collector = InvalidationCollector()
+    token = _collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
+        _schedule(collector)
+
+
+@contextlib.asynccontextmanager
+async def adeferred_invalidation():
+    """ deferred_invalidation() for coroutines. The invalidations of the
+    blocking calls the block awaits are flushed from a thread on exit. """
+    if _collector.get() is not None:
+        yield _collector.get()
+        return
+    collector = InvalidationCollector()
+    token = _collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
+        await sync_to_async(_schedule, thread_sensitive=False)(collector)
+
+
+def flush_invalidation():
+    """ Flushes the invalidations collected so far by the current block,
+    which keeps collecting the later ones. """
+    collector = _collector.get()
+    if collector is not None:
+        _schedule(collector)
@@ -0,0 +1,25 @@
+from core.invalidation import deferred_invalidation, flush_invalidation
+
+# Requests that do not write invalidate right away, if ever
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class DeferredInvalidationMiddleware:
+    """ Flushes the cache invalidations of a POST (or any other unsafe)
+    request once, before its response is returned. A TemplateResponse
+    returned by the view is rendered after the flush; templates the view
+    renders itself may still read the fragments it dirtied, so views should
+    redirect after saving. """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method in SAFE_METHODS:
+            return self.get_response(request)
+        with deferred_invalidation():
+            return self.get_response(request)
+
+    def process_template_response(self, request, response):
+        flush_invalidation()
+        return response
@@ -0,0 +1,76 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer:
+    """
+    Local HTTP server replaying recorded responses, used in tests in place of
+    third-party APIs.
+
+    Routes map ``(method, path)`` to a ``(status, body)`` or
+    ``(status, body, headers)`` tuple, or to a list of them that are replayed in order (the last one repeats). Bodies that are
+    not strings are serialized to JSON. A path without a query string also
+    matches the requests with one. Received requests are recorded in
+    ``requests``.
+
+    Example::
+
+        with StubServer({("GET", "/pypi/django/json"): (200, data)}) as server:
+            requests.get(server.url + "/pypi/django/json")
+    """
+
+    def __init__(self, routes):
+        self.routes = {key: list(value) if isinstance(value, list) else [value] for key, value in routes.items()}
+        self.requests = []
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def respond(self, method, path):
+        responses = self.routes.get((method, path)) or self.routes.get((method, path.split("?")[0]))
+        if not responses:
+            return 404, ""
+        if len(responses) > 1:
+            return responses.pop(0)
+        return responses[0]
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def handle_request(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                stub.requests.append((self.command, self.path, dict(self.headers), body))
+                response = stub.respond(self.command, self.path)
+                status, content = response[:2]
+                headers = dict(response[2]) if len(response) > 2 else {}
+                if not isinstance(content, (str, bytes)):
+                    content = json.dumps(content)
+                    headers.setdefault("Content-Type", "application/json")
+                if isinstance(content, str):
+                    content = content.encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_HEAD = handle_request
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.server.shutdown()
+        self.server.server_close()
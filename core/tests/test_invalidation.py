@@ -0,0 +1,79 @@
+import asyncio
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.invalidation import adeferred_invalidation, deferred_invalidation, invalidate
+from core.middleware import DeferredInvalidationMiddleware
+from package.repos.base_handler import run_sync
+from grid.models import Element, Grid, detail_template_cache_keys
+from grid.tests import data
+from package.models import Package
+
+
+class InvalidationTest(TestCase):
+    def setUp(self):
+        data.load()
+        self.grid = Grid.objects.get(slug="testing")
+        self.keys = detail_template_cache_keys([self.grid.pk])
+        cache.set_many({key: "cached" for key in self.keys})
+
+    def test_invalidate_outside_block(self):
+        invalidate(*self.keys)
+        self.assertEqual(cache.get_many(self.keys), {})
+
+    def test_coalesced(self):
+        with mock.patch.object(cache, "delete_many", wraps=cache.delete_many) as delete_many:
+            with deferred_invalidation():
+                for element in Element.objects.filter(feature__grid=self.grid):
+                    element.save()
+                for package in self.grid.packages.all():
+                    package.save()
+                self.assertEqual(cache.get_many(self.keys), {key: "cached" for key in self.keys})
+        delete_many.assert_called_once()
+        self.assertTrue(set(self.keys) <= set(delete_many.call_args[0][0]))
+        self.assertEqual(cache.get_many(self.keys), {})
+
+    def test_nested_blocks(self):
+        with mock.patch.object(cache, "delete_many", wraps=cache.delete_many) as delete_many:
+            with deferred_invalidation():
+                with deferred_invalidation():
+                    self.grid.save()
+                self.assertFalse(delete_many.called)
+                Package.objects.get(slug="testability").save()
+        delete_many.assert_called_once()
+
+    @override_settings(CACHE_INVALIDATION_ON_COMMIT=True)
+    def test_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with deferred_invalidation():
+                self.grid.save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(cache.get_many(self.keys), {key: "cached" for key in self.keys})
+        callbacks[0]()
+        self.assertEqual(cache.get_many(self.keys), {})
+
+    def test_async_block(self):
+        async def update():
+            async with adeferred_invalidation():
+                await run_sync(invalidate, *self.keys)
+                self.assertEqual(cache.get_many(self.keys), {key: "cached" for key in self.keys})
+
+        asyncio.run(update())
+        self.assertEqual(cache.get_many(self.keys), {})
+
+    def test_middleware(self):
+        cached = {key: "cached" for key in self.keys}
+
+        def view(request):
+            invalidate(*self.keys)
+            self.assertEqual(cache.get_many(self.keys), {} if request.method == "GET" else cached)
+            return HttpResponse()
+
+        middleware = DeferredInvalidationMiddleware(view)
+        middleware(RequestFactory().post("/"))
+        self.assertEqual(cache.get_many(self.keys), {})
+        cache.set_many(cached)
+        middleware(RequestFactory().get("/"))
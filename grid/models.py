@@ -1,14 +1,31 @@
-from django.core.cache import cache
 from django.core.cache.utils import make_template_fragment_key
 from django.db import models
 from django.urls import reverse
 
+from core.invalidation import invalidate, invalidate_related, register_invalidation
 from core.models import BaseModel
 from grid.utils import make_template_fragment_key as grid_make_template_fragment_key
 from package.models import Package
+from searchv2.autocomplete import indexed_values, invalidate_autocomplete
 from django.utils.translation import gettext_lazy as _
 
 
+def detail_template_cache_keys(grid_pks):
+    """ Returns the cache keys of the detail templates of the given grids. """
+    keys = []
+    for pk in grid_pks:
+        keys.append(grid_make_template_fragment_key("detail_template_cache", [str(pk)]))
+        keys.append(make_template_fragment_key("html_grid_detail_outer", [str(pk)]))
+    return keys
+
+
+def package_grids_cache_keys(package_pks):
+    """ Returns the detail template cache keys of the grids listing the given
+    packages. """
+    grid_pks = GridPackage.objects.filter(package__in=package_pks).values_list("grid_id", flat=True).distinct()
+    return detail_template_cache_keys(grid_pks)
+
+
 class Grid(BaseModel):
     """Grid object, inherits form :class:`package.models.BaseModel`. Attributes:
 
@@ -47,10 +64,23 @@ class Grid(BaseModel):
         grid_packages = gp.annotate(usage_count=models.Count('package__usage')).order_by('-usage_count', 'package')
         return grid_packages
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Only a new title or slug changes the autocomplete index
+        instance._indexed_values = indexed_values(instance)
+        return instance
+
     def save(self, *args, **kwargs):
-        self.grid_packages  # fire the cache
         self.clear_detail_template_cache()  # Delete the template fragment cache
+        if self._state.adding or indexed_values(self) != getattr(self, "_indexed_values", None):
+            invalidate_autocomplete()
         super().save(*args, **kwargs)
+        self._indexed_values = indexed_values(self)
+
+    def delete(self, *args, **kwargs):
+        invalidate_autocomplete()
+        return super().delete(*args, **kwargs)
 
     def get_absolute_url(self):
         return reverse("grid", args=[self.slug])
@@ -59,12 +89,8 @@ class Grid(BaseModel):
         return grid_make_template_fragment_key("detail_template_cache", [str(self.pk)])
 
     def clear_detail_template_cache(self):
-        key = self.get_detail_template_cache_key()
-        cache.delete(key)
-
-        # delete grid template cache
-        template_key = make_template_fragment_key("html_grid_detail_outer", [str(self.pk)])
-        cache.delete(template_key)
+        if self.pk:
+            invalidate(*detail_template_cache_keys([self.pk]))
 
     class Meta:
         ordering = ['title']
@@ -92,8 +118,7 @@ class GridPackage(BaseModel):
         verbose_name_plural = 'Grid Packages'
 
     def save(self, *args, **kwargs):
-        self.grid.grid_packages  # fire the cache
-        self.grid.clear_detail_template_cache()
+        invalidate_related("grid", self.grid_id)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -114,8 +139,7 @@ class Feature(BaseModel):
     description = models.TextField(_('Description'), blank=True)
 
     def save(self, *args, **kwargs):
-        self.grid.grid_packages  # fire the cache
-        self.grid.clear_detail_template_cache()
+        invalidate_related("grid", self.grid_id)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -149,8 +173,12 @@ class Element(BaseModel):
         ordering = ["-id"]
 
     def save(self, *args, **kwargs):
-        self.feature.save()  # fire grid_packages cache
+        invalidate_related("grid", self.feature.grid_id)
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f'{self.grid_package.grid.slug} : {self.grid_package.package.slug} : {self.feature.title}'
+
+
+register_invalidation("grid", detail_template_cache_keys)
+register_invalidation("package_grids", package_grids_cache_keys)
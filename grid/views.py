@@ -17,6 +17,7 @@ from grid.models import Element, Feature, Grid, GridPackage
 from package.models import Package
 from package.forms import PackageForm
 from package.views import repo_data_for_js
+from searchv2 import autocomplete
 
 
 def build_element_map(elements):
@@ -55,7 +56,7 @@ def grid_detail_landscape(request, slug, template_name="grid/grid_detail2.html")
     grid = get_object_or_404(Grid, slug=slug)
     features = grid.feature_set.all()
 
-    grid_packages = grid.grid_packages.order_by("package__commit_list")
+    grid_packages = grid.grid_packages.order_by("package__commit_list").select_related("package__latest_version")
 
     elements = Element.objects.all() \
                 .filter(feature__in=features,
@@ -316,7 +317,8 @@ def ajax_grid_list(request, template_name="grid/ajax_grid_list.html"):
     q = request.GET.get('q', '')
     grids = []
     if q:
-        grids = Grid.objects.filter(title__istartswith=q)
+        pks = [pk for title, pk in autocomplete.search(autocomplete.GRID, q)]
+        grids = Grid.objects.filter(pk__in=pks)
         package_id = request.GET.get('package_id', '')
         if package_id:
             grids = grids.exclude(gridpackage__package__id=package_id)
@@ -345,7 +347,7 @@ def grid_detail(request, slug, template_name="grid/grid_detail.html"):
         package__score__gt=settings.PACKAGE_SCORE_MIN,
         **({'package__version__supports_python3': True} if filters.get('python3') else {}),
         **({'package__version__development_status': 5} if filters.get('stable') else {}),
-    ).order_by("-package__score")
+    ).order_by("-package__score").select_related("package__latest_version")
 
     elements = Element.objects.filter(feature__in=features,
                         grid_package__in=grid_packages)
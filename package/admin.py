@@ -26,7 +26,7 @@ class PackageAdmin(VersionAdmin):
     inlines = [
         PackageExampleInline,
     ]
-    readonly_fields = ["score", "created_by", "last_modified_by"]
+    readonly_fields = ["score", "created_by", "last_modified_by", "next_refresh"]
     fieldsets = (
         (
             None,
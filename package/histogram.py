@@ -0,0 +1,85 @@
+"""
+Weekly commit histogram stored on every package.
+
+Package.commit_weeks holds the number of commits of the last WEEKS calendar
+weeks, oldest first; its last bucket is the week starting on
+Package.commit_weeks_end (a Monday). The histogram is recounted for the
+packages of every commit batch ingested (see CommitManager.refresh_packages),
+and rolled forward by the weekly roll_commit_weeks command, which only shifts
+the arrays and never reads commits.
+"""
+from datetime import date, datetime, timedelta
+
+from django.db.models import Count
+from django.db.models.functions import TruncWeek
+
+WEEKS = 52
+
+
+def week_start(day=None):
+    """ Monday of the week of day (today by default). """
+    day = day or date.today()
+    if isinstance(day, datetime):
+        day = day.date()
+    return day - timedelta(days=day.weekday())
+
+
+def roll(weeks, end, new_end):
+    """ Shifts a histogram ending on the week of end so it ends on the week
+    of new_end, dropping the oldest buckets and adding empty ones. """
+    if not weeks or end is None:
+        return [0] * WEEKS
+    shift = (new_end - end).days // 7
+    if shift <= 0:
+        return list(weeks)
+    return (list(weeks) + [0] * min(shift, WEEKS))[-WEEKS:]
+
+
+def count_commit_weeks(package_pks, end=None):
+    """ Counts the commits of the last WEEKS weeks of packages with a single
+    query.
+
+        return: dict mapping package pks to histograms ending on end
+    """
+    from package.models import Commit  # Added here to avoid circular imports
+
+    end = end or week_start()
+    first = end - timedelta(weeks=WEEKS - 1)
+    histograms = {pk: [0] * WEEKS for pk in package_pks}
+    counts = Commit.objects.filter(
+        package__in=package_pks,
+        commit_date__gte=datetime.combine(first, datetime.min.time()),
+    ).annotate(week=TruncWeek("commit_date")).values_list("package", "week").annotate(count=Count("pk")).order_by()
+    for pk, week, count in counts:
+        index = (week_start(week) - first).days // 7
+        if 0 <= index < WEEKS:
+            histograms[pk][index] += count
+    return histograms
+
+
+def set_commit_weeks(packages, end=None):
+    """ Recounts the histogram of packages, see count_commit_weeks(). The
+    packages still have to be saved. """
+    end = end or week_start()
+    histograms = count_commit_weeks([package.pk for package in packages], end)
+    for package in packages:
+        package.commit_weeks = histograms[package.pk]
+        package.commit_weeks_end = end
+    return packages
+
+
+def roll_commit_weeks(end=None, batch_size=1000):
+    """ Moves the histograms of every package forward to the week of end.
+
+        return: number of packages rolled
+    """
+    from package.models import Package  # Added here to avoid circular imports
+
+    end = end or week_start()
+    stale = []
+    for package in Package.objects.exclude(commit_weeks_end=end).only("pk", "commit_weeks", "commit_weeks_end").iterator():
+        package.commit_weeks = roll(package.commit_weeks, package.commit_weeks_end, end)
+        package.commit_weeks_end = end
+        stale.append(package)
+    Package.objects.bulk_update(stale, ["commit_weeks", "commit_weeks_end"], batch_size=batch_size)
+    return len(stale)
@@ -0,0 +1,176 @@
+"""
+Background refreshes of single packages, requested from the web.
+
+The views enqueue a refresh job instead of calling the repo APIs inside the
+request, and `manage.py package_refresh_worker` runs the jobs in a separate
+process. At most one job per package is pending at a time; its status is kept
+in the cache so the package page can show it.
+
+The queue backend is configured by PACKAGE_REFRESH_QUEUE, the same way CACHES
+configures the cache:
+
+* RedisQueue keeps the jobs in a Redis list shared by the web and worker
+  processes;
+* InProcessQueue keeps them in memory. With EAGER set it runs every job as soon
+  as it is enqueued; tests turn it off and call run_next() themselves.
+"""
+import collections
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.invalidation import deferred_invalidation
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+
+_queue = None
+
+
+def status_key(pk):
+    return f"package_refresh:{pk}"
+
+
+def lock_key(pk):
+    return f"package_refresh_lock:{pk}"
+
+
+def set_status(pk, status):
+    cache.set(status_key(pk), {"status": status, "updated": timezone.now()}, settings.PACKAGE_REFRESH_JOB_TIMEOUT)
+
+
+def get_status(package):
+    """ return: dict with the status of the last refresh job of package and
+    when it was reached, or None """
+    return cache.get(status_key(package.pk))
+
+
+def refresh_package(pk):
+    from package.models import Package  # Added here to avoid circular imports
+    from package.scheduling import schedule_packages
+
+    with deferred_invalidation():
+        package = Package.objects.get(pk=pk)
+        package.fetch_metadata()
+        package.fetch_commits()
+        package.last_fetched = timezone.now()
+        package.save()
+        schedule_packages([package])
+
+
+def run_job(pk):
+    set_status(pk, RUNNING)
+    try:
+        refresh_package(pk)
+    except Exception:
+        logger.error(f"Unable to refresh package {pk}", exc_info=True)
+        set_status(pk, FAILED)
+    else:
+        set_status(pk, FINISHED)
+    finally:
+        cache.delete(lock_key(pk))
+
+
+class BaseQueue:
+
+    def __init__(self, params):
+        self.options = params.get("OPTIONS", {})
+
+    def push(self, pk):
+        raise NotImplementedError()
+
+    def pop(self, timeout=None):
+        """ Waits up to timeout seconds (forever if None) for a job.
+
+            return: pk of the package to refresh, or None
+        """
+        raise NotImplementedError()
+
+    def enqueue(self, package):
+        """ Queues a refresh of package.
+
+            return: False if a job for the package was already pending
+        """
+        # The lock expires in case a worker dies in the middle of a job
+        if not cache.add(lock_key(package.pk), True, settings.PACKAGE_REFRESH_JOB_TIMEOUT):
+            return False
+        set_status(package.pk, QUEUED)
+        self.push(package.pk)
+        return True
+
+    def run_next(self, timeout=None):
+        """ Runs the next job, waiting up to timeout seconds for one.
+
+            return: True if a job was run
+        """
+        pk = self.pop(timeout)
+        if pk is None:
+            return False
+        run_job(pk)
+        return True
+
+
+class InProcessQueue(BaseQueue):
+
+    def __init__(self, params):
+        super().__init__(params)
+        self.eager = self.options.get("EAGER", False)
+        self.jobs = collections.deque()
+        self.condition = threading.Condition()
+
+    def push(self, pk):
+        if self.eager:
+            run_job(pk)
+            return
+        with self.condition:
+            self.jobs.append(pk)
+            self.condition.notify()
+
+    def pop(self, timeout=None):
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.jobs, timeout):
+                return None
+            return self.jobs.popleft()
+
+
+class RedisQueue(BaseQueue):
+
+    def __init__(self, params):
+        import redis
+
+        super().__init__(params)
+        self.client = redis.Redis.from_url(params["LOCATION"])
+        self.key = self.options.get("KEY", "package_refresh_jobs")
+
+    def push(self, pk):
+        self.client.lpush(self.key, pk)
+
+    def pop(self, timeout=None):
+        if timeout == 0:
+            item = self.client.rpop(self.key)
+        else:
+            # BRPOP blocks forever on a timeout of 0
+            item = self.client.brpop(self.key, timeout=timeout or 0)
+            item = item[1] if item else None
+        return int(item) if item is not None else None
+
+
+def get_queue():
+    """ Queue configured by PACKAGE_REFRESH_QUEUE, shared by the process. """
+    global _queue
+    if _queue is None:
+        params = settings.PACKAGE_REFRESH_QUEUE
+        _queue = import_string(params["BACKEND"])(params)
+    return _queue
+
+
+def enqueue_refresh(package):
+    return get_queue().enqueue(package)
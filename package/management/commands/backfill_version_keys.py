@@ -0,0 +1,34 @@
+import djclick as click
+import logging
+
+from package.models import Package, Version
+from package.utils import version_sort_key
+
+logger = logging.getLogger(__name__)
+
+
+@click.command()
+@click.option("--batch-size", default=2000, help="Versions written per bulk update.")
+def command(batch_size):
+    """Computes the PEP 440 sort key of every version and refreshes the latest release of their packages."""
+    changed = []
+    packages = set()
+    count = 0
+    for version in Version.objects.only("pk", "package", "number", "sort_key", "prerelease").iterator(chunk_size=batch_size):
+        sort_key, prerelease = version_sort_key(version.number)
+        if (sort_key, prerelease) == (version.sort_key, version.prerelease):
+            continue
+        version.sort_key, version.prerelease = sort_key, prerelease
+        changed.append(version)
+        packages.add(version.package_id)
+        if len(changed) >= batch_size:
+            Version.objects.bulk_update(changed, ["sort_key", "prerelease"])
+            count += len(changed)
+            changed = []
+    Version.objects.bulk_update(changed, ["sort_key", "prerelease"])
+    count += len(changed)
+    logger.info(f"{count} version sort keys updated")
+
+    for package in Package.objects.filter(pk__in=packages).iterator():
+        package.refresh_latest_release()
+    print(f"{count} versions of {len(packages)} packages were updated...")
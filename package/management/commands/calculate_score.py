@@ -3,6 +3,7 @@ import logging
 from django.core.management.base import BaseCommand
 
 from package.models import Package
+from package.scoring import rescore_packages
 
 logger = logging.getLogger(__name__)
 
@@ -12,10 +13,7 @@ class Command(BaseCommand):
     help = "Updates the score for all packages"
 
     def handle(self, *args, **options):
-        count = 0
-        for package in Package.objects.filter().iterator():
-            package.save()
-            count += 1
-            msg = "{}. {}".format(count, package)
-            logger.info(msg)
+        count = Package.objects.count()
+        changed = rescore_packages()
+        logger.info(f"{changed} of {count} package scores changed")
         print(f"{count} packages were updated...")
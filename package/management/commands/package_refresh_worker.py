@@ -0,0 +1,39 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from package.jobs import get_queue
+
+
+class Command(BaseCommand):
+
+    help = "Runs the package refreshes requested from the web. Commands belongs to django-packages.package"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=settings.PACKAGE_REFRESH_CONCURRENCY,
+            help="Number of refresh jobs run at the same time",
+        )
+        parser.add_argument(
+            "--burst", action="store_true",
+            help="Exit once the queue is empty instead of waiting for new jobs",
+        )
+
+    def handle(self, *args, **options):
+        queue = get_queue()
+        timeout = 0 if options["burst"] else None
+
+        def work():
+            try:
+                while queue.run_next(timeout=timeout):
+                    close_old_connections()
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=work, daemon=True) for _ in range(options["concurrency"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
@@ -1,55 +1,52 @@
-import logging
-from time import sleep
-
 from django.conf import settings
 from django.core.management.base import BaseCommand
 
-from github3 import login as github_login
-
 from package.models import Package
+from package.scheduling import due_packages, schedule_packages
+from package.updater import update_packages
 from core.utils import healthcheck
 
-logger = logging.getLogger(__name__)
-
-
-class PackageUpdaterException(Exception):
-    def __init__(self, error, title):
-        log_message = "For {title}, {error_type}: {error}".format(
-            title=title,
-            error_type=type(error),
-            error=error
-        )
-        logging.critical(log_message)
-        logging.exception(error)
-
 
 class Command(BaseCommand):
 
     help = "Updates all the packages in the system. Commands belongs to django-packages.package"
 
-    def handle(self, *args, **options):
-
-        github = github_login(token=settings.GITHUB_TOKEN)
-
-        for index, package in enumerate(Package.objects.iterator()):
-
-            # Simple attempt to deal with Github rate limiting
-            while True:
-                print(f"github.ratelimit_remaining=={github.ratelimit_remaining}")
-                if github.ratelimit_remaining < 50:
-                    print(f"{__file__}::handle::sleep(120)")
-                    sleep(120)
-                break
-
-            try:
-                try:
-                    package.fetch_metadata(fetch_pypi=False)
-                    package.fetch_commits()
-                except Exception as e:
-                    raise PackageUpdaterException(e, package.title)
-            except PackageUpdaterException:
-                logger.error(f"Unable to update {package.title}", exc_info=True)
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=settings.PACKAGE_UPDATER_WORKERS,
+            help="Number of packages updated concurrently",
+        )
+        parser.add_argument(
+            "--host-concurrency", type=int, default=settings.PACKAGE_UPDATER_HOST_CONCURRENCY,
+            help="Maximum number of requests in flight per repo host",
+        )
+        parser.add_argument(
+            "--no-batch", action="store_false", dest="batch",
+            help="Fetch metadata one repository at a time instead of in GraphQL batches",
+        )
+        parser.add_argument(
+            "--due", action="store_true",
+            help="Only update the packages whose next refresh time has passed, the most overdue first",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=None,
+            help="Maximum number of packages updated in this run",
+        )
 
-            print(f"{__file__}::handle::sleep(5)")
-            sleep(5)
+    def handle(self, *args, **options):
+        if options["due"]:
+            packages = due_packages()
+        else:
+            packages = Package.objects.all()
+        if options["limit"]:
+            packages = packages[:options["limit"]]
+        packages = list(packages)
+        updated = update_packages(
+            packages,
+            workers=options["workers"],
+            host_concurrency=options["host_concurrency"],
+            batch=options["batch"],
+        )
+        schedule_packages(packages)
+        print(f"{updated} of {len(packages)} packages were updated...")
         healthcheck(settings.PACKAGE_HEALTHCHECK_URL)
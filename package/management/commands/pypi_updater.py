@@ -4,22 +4,33 @@ import logging
 from django.conf import settings
 
 from package.models import Package
+from package.pypi_sync import changed_packages, save_serial
+from core.invalidation import deferred_invalidation
 from core.utils import healthcheck
 
 logger = logging.getLogger(__name__)
 
 
 @click.command()
-def command():
+@click.option("--incremental", is_flag=True, help="Only update the packages released on PyPI since the last incremental run.")
+def command(incremental):
     """Updates all the packages in the system by checking against their PyPI data."""
     count = 0
     count_updated = 0
-    for package in Package.objects.filter().iterator():
-        updated = package.fetch_pypi_data()
-        if updated:
-            count_updated += 1
-            package.save()
+    serial = None
+    if incremental:
+        packages, serial = changed_packages()
+    else:
+        packages = Package.objects.filter()
+    for package in packages.iterator():
+        with deferred_invalidation():
+            updated = package.fetch_pypi_data()
+            if updated:
+                count_updated += 1
+                package.save()
         count += 1
         msg = "{}. {}. {}".format(count, count_updated, package)
         logger.info(msg)
+    if serial is not None:
+        save_serial(serial)
     healthcheck(settings.PYPI_HEALTHCHECK_URL)
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from package.histogram import roll_commit_weeks
+
+
+class Command(BaseCommand):
+
+    help = "Moves the weekly commit histogram of every package to the current week. Commands belongs to django-packages.package"
+
+    def handle(self, *args, **options):
+        rolled = roll_commit_weeks()
+        print(f"{rolled} commit histograms were rolled forward...")
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.7 on 2026-10-18 08:36
+
+from django.db import migrations, models
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0010_auto_20210929_0943'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HTTPValidator',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('url', models.URLField(max_length=500, unique=True, verbose_name='URL')),
+                ('etag', models.CharField(blank=True, default='', max_length=255, verbose_name='ETag')),
+                ('last_modified', models.CharField(blank=True, default='', max_length=64, verbose_name='Last-Modified')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.7 on 2026-10-18 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0011_httpvalidator'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='commit_cursor_date',
+            field=models.DateTimeField(blank=True, help_text='Date of the newest commit synced from the repo', null=True, verbose_name='Commit Cursor Date'),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='commit_cursor_hash',
+            field=models.CharField(blank=True, default='', help_text='Hash of the newest commit synced from the repo', max_length=150, verbose_name='Commit Cursor Hash'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.7 on 2026-10-18 08:39
+
+from django.db import migrations, models
+
+# Keeps the oldest row of every set of duplicate commits
+REMOVE_DUPLICATE_COMMITS = """
+DELETE FROM package_commit duplicate
+USING package_commit original
+WHERE duplicate.id > original.id
+  AND duplicate.package_id = original.package_id
+  AND duplicate.commit_hash = original.commit_hash
+  AND (duplicate.commit_hash <> '' OR duplicate.commit_date = original.commit_date)
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0012_package_commit_cursor'),
+    ]
+
+    operations = [
+        migrations.RunSQL(REMOVE_DUPLICATE_COMMITS, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='commit',
+            constraint=models.UniqueConstraint(condition=models.Q(('commit_hash', ''), _negated=True), fields=('package', 'commit_hash'), name='unique_package_commit_hash'),
+        ),
+        migrations.AddConstraint(
+            model_name='commit',
+            constraint=models.UniqueConstraint(condition=models.Q(('commit_hash', '')), fields=('package', 'commit_date'), name='unique_package_commit_date'),
+        ),
+    ]
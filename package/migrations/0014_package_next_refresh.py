@@ -0,0 +1,18 @@
+# Generated by Django 3.2.7 on 2026-10-18 08:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0013_commit_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='next_refresh',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='When package_updater --due refreshes this package next', null=True, verbose_name='Next Refresh'),
+        ),
+    ]
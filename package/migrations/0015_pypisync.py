@@ -0,0 +1,26 @@
+# Generated by Django 3.2.7 on 2026-10-18 08:42
+
+from django.db import migrations, models
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0014_package_next_refresh'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PyPISync',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('last_serial', models.BigIntegerField(verbose_name='Last Serial')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
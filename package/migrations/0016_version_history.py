@@ -0,0 +1,36 @@
+# Generated by Django 3.2.7 on 2026-10-18 08:44
+
+from django.db import migrations, models
+
+# Keeps the oldest row of every set of duplicate versions
+REMOVE_DUPLICATE_VERSIONS = """
+DELETE FROM package_version duplicate
+USING package_version original
+WHERE duplicate.id > original.id
+  AND duplicate.package_id = original.package_id
+  AND duplicate.number = original.number
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0015_pypisync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='version',
+            name='requires_python',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Requires Python'),
+        ),
+        migrations.AddField(
+            model_name='version',
+            name='yanked',
+            field=models.BooleanField(default=False, help_text='All of the release files were yanked from PyPI', verbose_name='Yanked'),
+        ),
+        migrations.RunSQL(REMOVE_DUPLICATE_VERSIONS, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='version',
+            constraint=models.UniqueConstraint(fields=('package', 'number'), name='unique_package_version_number'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 3.2.7 on 2026-10-18 08:46
+
+from datetime import date, datetime, timedelta
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncWeek
+
+WEEKS = 52
+
+
+def count_commit_weeks(apps, schema_editor):
+    Commit = apps.get_model("package", "Commit")
+    Package = apps.get_model("package", "Package")
+
+    today = date.today()
+    end = today - timedelta(days=today.weekday())
+    first = end - timedelta(weeks=WEEKS - 1)
+    histograms = {}
+    counts = Commit.objects.filter(
+        commit_date__gte=datetime.combine(first, datetime.min.time()),
+    ).annotate(week=TruncWeek("commit_date")).values_list("package", "week").annotate(count=Count("pk")).order_by()
+    for pk, week, count in counts:
+        index = (week.date() - first).days // 7
+        if 0 <= index < WEEKS:
+            histograms.setdefault(pk, [0] * WEEKS)[index] += count
+
+    Package.objects.update(commit_weeks=[0] * WEEKS, commit_weeks_end=end)
+    packages = [Package(pk=pk, commit_weeks=weeks) for pk, weeks in histograms.items()]
+    Package.objects.bulk_update(packages, ["commit_weeks"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0016_version_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='commit_weeks',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, help_text='Commits of the last 52 weeks, oldest first', size=52, verbose_name='Commit Weeks'),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='commit_weeks_end',
+            field=models.DateField(blank=True, help_text='Monday of the last week of the commit histogram', null=True, verbose_name='Commit Weeks End'),
+        ),
+        migrations.RunPython(count_commit_weeks, migrations.RunPython.noop),
+    ]
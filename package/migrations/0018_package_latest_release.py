@@ -0,0 +1,77 @@
+# Generated by Django 3.2.7 on 2026-10-18 08:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from packaging.version import InvalidVersion, Version as PEP440Version
+
+
+def parse(number):
+    try:
+        return PEP440Version(number)
+    except InvalidVersion:
+        return None
+
+
+def fill_latest_fields(apps, schema_editor):
+    Commit = apps.get_model("package", "Commit")
+    Package = apps.get_model("package", "Package")
+    Version = apps.get_model("package", "Version")
+
+    last_commit = Commit.objects.filter(package=OuterRef("pk")).order_by("-commit_date")
+    Package.objects.update(last_commit_date=Subquery(last_commit.values("commit_date")[:1]))
+
+    latest = Version.objects.filter(
+        package=OuterRef("pk"), upload_time__isnull=False, yanked=False,
+    ).order_by("-upload_time")
+    Package.objects.update(
+        latest_version=Subquery(latest.values("pk")[:1]),
+        latest_upload_time=Subquery(latest.values("upload_time")[:1]),
+        latest_license=Coalesce(Subquery(latest.values("license")[:1]), Value("")),
+    )
+
+    # Highest final release, or highest pre-release for packages without one
+    numbers = {}
+    for package_id, number in Version.objects.exclude(package=None).values_list("package", "number").iterator():
+        version = parse(number)
+        if version is not None:
+            numbers.setdefault(package_id, []).append((not version.is_prerelease, version, number))
+    packages = [Package(pk=pk, latest_version_number=max(versions)[2]) for pk, versions in numbers.items()]
+    Package.objects.bulk_update(packages, ["latest_version_number"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0017_package_commit_weeks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='last_commit_date',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='Date of the newest commit on record', null=True, verbose_name='Last Commit'),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='latest_license',
+            field=models.CharField(blank=True, default='', help_text='License of the latest version', max_length=100, verbose_name='Latest License'),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='latest_upload_time',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='When the latest version was uploaded to PyPI', null=True, verbose_name='Latest Upload Time'),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='latest_version',
+            field=models.ForeignKey(blank=True, help_text='Newest release uploaded to PyPI', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='package.version', verbose_name='Latest Version'),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='latest_version_number',
+            field=models.CharField(blank=True, default='', help_text='Highest version number released', max_length=100, verbose_name='Latest Version Number'),
+        ),
+        migrations.RunPython(fill_latest_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.7 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+from package.utils import version_sort_key
+
+
+def fill_sort_keys(apps, schema_editor):
+    Version = apps.get_model("package", "Version")
+
+    versions = []
+    for version in Version.objects.only("pk", "number").iterator(chunk_size=2000):
+        version.sort_key, version.prerelease = version_sort_key(version.number)
+        if version.sort_key:
+            versions.append(version)
+        if len(versions) >= 1000:
+            Version.objects.bulk_update(versions, ["sort_key", "prerelease"])
+            versions = []
+    Version.objects.bulk_update(versions, ["sort_key", "prerelease"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0018_package_latest_release'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='version',
+            name='prerelease',
+            field=models.BooleanField(default=False, verbose_name='Pre-release'),
+        ),
+        migrations.AddField(
+            model_name='version',
+            name='sort_key',
+            field=models.CharField(blank=True, db_collation='C', default='', help_text='Sorts like the PEP 440 version number, empty for invalid numbers', max_length=255, verbose_name='Sort Key'),
+        ),
+        migrations.AddIndex(
+            model_name='version',
+            index=models.Index(fields=['package', 'sort_key'], name='package_version_sort_key'),
+        ),
+        migrations.RunPython(fill_sort_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.7 on 2026-10-18 14:45
+
+from datetime import timedelta
+import random
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def stagger_participants_fetched(apps, schema_editor):
+    """ Spreads the next contributor refresh of the packages over one
+    interval, instead of every package coming due in the same run. """
+    Package = apps.get_model("package", "Package")
+
+    now = timezone.now()
+    packages = []
+    for package in Package.objects.exclude(participants="").only("pk").iterator():
+        package.participants_fetched = now - timedelta(seconds=random.uniform(0, settings.GITHUB_CONTRIBUTORS_INTERVAL))
+        packages.append(package)
+    Package.objects.bulk_update(packages, ["participants_fetched"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('package', '0019_version_sort_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='participants_fetched',
+            field=models.DateTimeField(blank=True, help_text='When the participants were last fetched from the repo', null=True, verbose_name='Participants Fetched'),
+        ),
+        migrations.RunPython(stagger_participants_fetched, migrations.RunPython.noop),
+    ]
@@ -1,29 +1,27 @@
 from datetime import datetime, timedelta
 import json
 import re
-import math
-from dateutil import relativedelta
 
-from django.core.cache import cache
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.postgres.fields import ArrayField
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
-from django.utils.timezone import now
+from django.db import models, transaction
 from django.utils import timezone
 from django.urls import reverse
 from django.utils.functional import cached_property
 from packaging.specifiers import SpecifierSet
 
-from distutils.version import LooseVersion as versioner
-import requests
-
 from core.utils import STATUS_CHOICES, status_choices_switch
+from core.invalidation import invalidate_related
 from core.models import BaseModel
+from package import histogram
 from package.repos import get_repo_for_repo_url
+from package.repos.base_handler import get_session
+from package.repos.conditional import NotModified
+from package.scoring import LATEST_VERSION_ORDER, package_score
 from package.signals import signal_fetch_latest_metadata
-from package.utils import get_version, get_pypi_version, normalize_license
+from package.utils import get_version, get_pypi_version, normalize_license, version_sort_key
+from searchv2.autocomplete import indexed_values, invalidate_autocomplete
 from django.utils.translation import gettext_lazy as _
 
 repo_url_help_text = settings.PACKAGINATOR_HELP_TEXT['REPO_URL']
@@ -71,13 +69,24 @@ class Package(BaseModel):
     supports_python3 = models.BooleanField(_("Supports Python 3"), blank=True, null=True)
     participants = models.TextField(_("Participants"),
                         help_text="List of collaborats/participants on the project", blank=True)
+    participants_fetched = models.DateTimeField(_("Participants Fetched"), help_text="When the participants were last fetched from the repo", blank=True, null=True)
     usage = models.ManyToManyField(User, blank=True)
     created_by = models.ForeignKey(User, blank=True, null=True, related_name="creator", on_delete=models.SET_NULL)
     last_modified_by = models.ForeignKey(User, blank=True, null=True, related_name="modifier", on_delete=models.SET_NULL)
     last_fetched = models.DateTimeField(blank=True, null=True, default=timezone.now)
+    next_refresh = models.DateTimeField(_("Next Refresh"), help_text="When package_updater --due refreshes this package next", blank=True, null=True, db_index=True)
     documentation_url = models.URLField(_("Documentation URL"), blank=True, null=True, default="")
 
     commit_list = models.TextField(_("Commit List"), blank=True)
+    commit_weeks = ArrayField(models.IntegerField(), verbose_name=_("Commit Weeks"), help_text="Commits of the last 52 weeks, oldest first", size=52, blank=True, default=list)
+    last_commit_date = models.DateTimeField(_("Last Commit"), help_text="Date of the newest commit on record", blank=True, null=True, db_index=True)
+    latest_version = models.ForeignKey("Version", verbose_name=_("Latest Version"), help_text="Newest release uploaded to PyPI", blank=True, null=True, related_name="+", on_delete=models.SET_NULL)
+    latest_version_number = models.CharField(_("Latest Version Number"), help_text="Highest version number released", max_length=100, blank=True, default="")
+    latest_upload_time = models.DateTimeField(_("Latest Upload Time"), help_text="When the latest version was uploaded to PyPI", blank=True, null=True, db_index=True)
+    latest_license = models.CharField(_("Latest License"), help_text="License of the latest version", max_length=100, blank=True, default="")
+    commit_weeks_end = models.DateField(_("Commit Weeks End"), help_text="Monday of the last week of the commit histogram", blank=True, null=True)
+    commit_cursor_hash = models.CharField(_("Commit Cursor Hash"), help_text="Hash of the newest commit synced from the repo", max_length=150, blank=True, default="")
+    commit_cursor_date = models.DateTimeField(_("Commit Cursor Date"), help_text="Date of the newest commit synced from the repo", blank=True, null=True)
     score = models.IntegerField(_("Score"), default=0)
 
     date_deprecated = models.DateTimeField(blank=True, null=True)
@@ -105,27 +114,54 @@ class Package(BaseModel):
         if "https://pypi.python.org/pypi/" in name:
             name = name.replace("https://pypi.python.org/pypi/", "")
 
-        if not name.startswith("http"):
-            name = f"https://pypi.org/project/{name}"
+        for prefix in ("http://pypi.org/project/", "https://pypi.org/project/"):
+            if prefix in name:
+                name = name.replace(prefix, "")
 
         if "/" in name:
             return name[:name.index("/")]
         return name
 
     def last_updated(self):
-        cache_name = self.cache_namer(self.last_updated)
-        last_commit = cache.get(cache_name)
-        if last_commit is not None:
-            return last_commit
-        try:
-            last_commit = self.commit_set.latest('commit_date').commit_date
-            if last_commit:
-                cache.set(cache_name, last_commit)
-                return last_commit
-        except ObjectDoesNotExist:
-            last_commit = None
+        return self.last_commit_date
 
-        return last_commit
+    def commits_since(self):
+        """ Date the next commit sync starts from, as an aware datetime
+        ready to be passed to the repo APIs. Packages synced before commit
+        cursors existed start from their latest commit on record.
+        """
+        since = self.commit_cursor_date or self.last_updated()
+        if since is not None and timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
+
+    def add_commits(self, commits):
+        """ Stores the commits newer than the commit cursor with a single
+        insert and moves the cursor to the newest of them. The package still
+        has to be saved.
+
+            commits: iterable of (commit_hash, commit_date) tuples
+            return: list of the Commit instances created
+        """
+        since = self.commit_cursor_date or self.last_updated()
+        new_commits = []
+        for commit_hash, commit_date in commits:
+            if timezone.is_aware(commit_date) and not settings.USE_TZ:
+                commit_date = timezone.make_naive(commit_date)
+            if since is not None:
+                if commit_date < since:
+                    continue
+                if commit_date == since and (not self.commit_cursor_hash or commit_hash == self.commit_cursor_hash):
+                    continue
+            new_commits.append(Commit(package=self, commit_hash=commit_hash, commit_date=commit_date))
+
+        if not new_commits:
+            return []
+        Commit.objects.bulk_ingest(new_commits)
+        newest = max(new_commits, key=lambda commit: commit.commit_date)
+        self.commit_cursor_hash = newest.commit_hash
+        self.commit_cursor_date = newest.commit_date
+        return new_commits
 
     @property
     def repo(self):
@@ -137,10 +173,7 @@ class Package(BaseModel):
 
     @property
     def license_latest(self):
-        try:
-            return self.version_set.latest().license
-        except Version.DoesNotExist:
-            return "UNKNOWN"
+        return self.latest_license or "UNKNOWN"
 
     def grids(self):
 
@@ -163,24 +196,10 @@ class Package(BaseModel):
         return self.usage.count()
 
     def commits_over_52(self):
-        cache_name = self.cache_namer(self.commits_over_52)
-        value = cache.get(cache_name)
-        if value is not None:
-            return value
-        now = datetime.now()
-        commits = self.commit_set.filter(
-            commit_date__gt=now - timedelta(weeks=52),
-        ).values_list('commit_date', flat=True)
-
-        weeks = [0] * 52
-        for cdate in commits:
-            age_weeks = (now - cdate).days // 7
-            if age_weeks < 52:
-                weeks[age_weeks] += 1
-
-        value = ','.join(map(str, reversed(weeks)))
-        cache.set(cache_name, value)
-        return value
+        """ Commits of the last 52 weeks, oldest first, as a comma separated
+        string. Read from the histogram stored on the package (see
+        package.histogram). """
+        return ','.join(map(str, self.commits_over_52_listed()))
 
     def fetch_pypi_data(self, *args, **kwargs):
         # Get the releases from pypi
@@ -188,7 +207,11 @@ class Package(BaseModel):
 
             total_downloads = 0
             url = f"https://pypi.python.org/pypi/{self.pypi_name}/json"
-            response = requests.get(url)
+            try:
+                response = get_session().get(url)
+            except NotModified:
+                # Nothing changed on PyPI since the last fetch
+                return False
             if settings.DEBUG:
                 if response.status_code not in (200, 404):
                     print("BOOM!")
@@ -201,10 +224,7 @@ class Package(BaseModel):
             release = json.loads(response.content)
             info = release['info']
 
-            version, created = Version.objects.get_or_create(
-                package=self,
-                number=info['version']
-            )
+            Version.objects.bulk_ingest(self, self.pypi_releases(release))
 
             if "classifiers" in info and len(info['classifiers']):
                 self.pypi_classifiers = info['classifiers']
@@ -214,39 +234,11 @@ class Package(BaseModel):
                 if self.pypi_requires_python and "3" in SpecifierSet(self.pypi_requires_python):
                     self.supports_python3 = True
 
-            # add to versions
-            if 'license' in info and info['license']:
-                licenses = list(info['license'])
-                for index, license in enumerate(licenses):
-                    if license or "UNKNOWN" == license.upper():
-                        for classifier in info['classifiers']:
-                            if classifier.startswith("License"):
-                                licenses[index] = classifier.strip().replace('License ::', '')
-                                licenses[index] = licenses[index].replace('OSI Approved :: ', '')
-                                break
-
-                version.licenses = licenses
-
-            # version stuff
-            try:
-                url_data = release['urls'][0]
-                version.downloads = url_data['downloads']
-                version.upload_time = url_data['upload_time']
-            except IndexError:
-                # Not a real release so we just guess the upload_time.
-                version.upload_time = version.created
-
-            for classifier in info['classifiers']:
-                if classifier.startswith('Development Status'):
-                    version.development_status = status_choices_switch(classifier)
-                    break
             for classifier in info['classifiers']:
                 if classifier.startswith('Programming Language :: Python :: 3'):
-                    version.supports_python3 = True
                     if not self.supports_python3:
                         self.supports_python3 = True
                     break
-            version.save()
 
             self.pypi_downloads = total_downloads
             # Calculate total downloads
@@ -254,62 +246,118 @@ class Package(BaseModel):
             return True
         return False
 
+    def pypi_releases(self, release):
+        """ Maps every version number of a PyPI JSON response to the values
+        of its Version fields, as expected by Version.objects.bulk_ingest().
+        Licenses, development status and downloads are only known for the
+        latest release.
+        """
+        info = release['info']
+        releases = {}
+        for number, files in release.get('releases', {}).items():
+            upload_times = [datetime.fromisoformat(data['upload_time']) for data in files if data.get('upload_time')]
+            requires_python = [data['requires_python'] for data in files if data.get('requires_python')]
+            releases[number] = {
+                'upload_time': min(upload_times) if upload_times else None,
+                # A release is only gone once all of its files are yanked
+                'yanked': bool(files) and all(data.get('yanked') for data in files),
+                'requires_python': requires_python[0] if requires_python else "",
+            }
+
+        latest = releases.setdefault(info['version'], {'upload_time': None, 'yanked': False, 'requires_python': ""})
+        classifiers = info.get('classifiers') or []
+        licenses = [
+            classifier.replace('License ::', '').replace('OSI Approved :: ', '').strip()
+            for classifier in classifiers if classifier.startswith("License")
+        ]
+        if not licenses and info.get('license'):
+            licenses = [info['license']]
+        latest['license'] = info.get('license')
+        latest['licenses'] = licenses or None
+        if info.get('requires_python'):
+            latest['requires_python'] = info['requires_python']
+        if release.get('urls'):
+            latest['downloads'] = release['urls'][0].get('downloads') or 0
+        for classifier in classifiers:
+            if classifier.startswith('Development Status'):
+                development_status = status_choices_switch(classifier)
+                if development_status is not None:
+                    latest['development_status'] = development_status
+                break
+        latest['supports_python3'] = any(
+            classifier.startswith('Programming Language :: Python :: 3') for classifier in classifiers
+        )
+        return releases
+
     def fetch_metadata(self, fetch_pypi=True, fetch_repo=True):
 
         if fetch_pypi:
             self.fetch_pypi_data()
         if fetch_repo:
-            self.repo.fetch_metadata(self)
+            try:
+                self.repo.fetch_metadata(self)
+            except NotModified:
+                pass
         signal_fetch_latest_metadata.send(sender=self)
         self.save()
 
     def grid_clear_detail_template_cache(self):
-        for grid in self.grids():
-            grid.clear_detail_template_cache()
+        if self.pk:
+            invalidate_related("package_grids", self.pk)
 
     def calculate_score(self):
-        """
-        Scores a penalty of 10% of the stars for each 3 months the package is not updated;
-        + a penalty of -30% of the stars if it does not support python 3.
-        So an abandoned packaged for 2 years would lose 80% of its stars.
-        """
-        delta = relativedelta.relativedelta(now(), self.last_updated())
-        delta_months = (delta.years * 12) + delta.months
-        last_updated_penalty = math.modf(delta_months / 3)[1] * self.repo_watchers / 10
-        last_version = self.version_set.last()
+        """ Score of the package, see package.scoring.package_score(). """
+        last_version = self.version_set.order_by(*LATEST_VERSION_ORDER).first()
         is_python_3 = last_version and last_version.supports_python3
-        # TODO: Address this better
-        python_3_penalty = 0 if is_python_3 else min([self.repo_watchers * 30 / 100, 1000])
-        # penalty for docs maybe
-        return self.repo_watchers - last_updated_penalty - python_3_penalty
+        return package_score(self.repo_watchers, self.last_updated(), is_python_3)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Only a new title or slug changes the autocomplete index
+        instance._indexed_values = indexed_values(instance)
+        return instance
 
     def save(self, *args, **kwargs):
         if not self.repo_description:
             self.repo_description = ""
         self.grid_clear_detail_template_cache()
+        if self._state.adding or indexed_values(self) != getattr(self, "_indexed_values", None):
+            invalidate_autocomplete()
         self.score = self.calculate_score()
         super().save(*args, **kwargs)
+        self._indexed_values = indexed_values(self)
+
+    def delete(self, *args, **kwargs):
+        invalidate_autocomplete()
+        return super().delete(*args, **kwargs)
 
     def fetch_commits(self):
-        self.repo.fetch_commits(self)
+        try:
+            self.repo.fetch_commits(self)
+        except NotModified:
+            pass
 
     def pypi_version(self):
-        cache_name = self.cache_namer(self.pypi_version)
-        version = cache.get(cache_name)
-        if version is not None:
-            return version
-        version = get_pypi_version(self)
-        cache.set(cache_name, version)
-        return version
+        return self.latest_version_number
 
     def last_released(self):
-        cache_name = self.cache_namer(self.last_released)
-        version = cache.get(cache_name)
-        if version is not None:
-            return version
-        version = get_version(self)
-        cache.set(cache_name, version)
-        return version
+        return self.latest_version
+
+    def refresh_latest_release(self):
+        """ Recomputes the latest_* fields from version_set and stores them
+        without saving the rest of the package. """
+        latest = get_version(self)
+        self.latest_version = latest
+        self.latest_version_number = get_pypi_version(self)
+        self.latest_upload_time = latest.upload_time if latest else None
+        self.latest_license = (latest.license or "") if latest else ""
+        Package.objects.filter(pk=self.pk).update(
+            latest_version=self.latest_version,
+            latest_version_number=self.latest_version_number,
+            latest_upload_time=self.latest_upload_time,
+            latest_license=self.latest_license,
+        )
 
     @property
     def development_status(self):
@@ -319,9 +367,8 @@ class Package(BaseModel):
 
     @property
     def pypi_ancient(self):
-        release = self.last_released()
-        if release:
-            return release.upload_time < datetime.now() - timedelta(365)
+        if self.latest_upload_time:
+            return self.latest_upload_time < datetime.now() - timedelta(365)
         return None
 
     @property
@@ -346,7 +393,7 @@ class Package(BaseModel):
         return self.commit_set.latest()
 
     def commits_over_52_listed(self):
-        return [int(x) for x in self.commits_over_52().split(',')]
+        return histogram.roll(self.commit_weeks, self.commit_weeks_end, histogram.week_start())
 
 
 class PackageExample(BaseModel):
@@ -370,46 +417,116 @@ class PackageExample(BaseModel):
         return "http://" + self.url
 
 
+class CommitManager(models.Manager):
+    def bulk_ingest(self, commits, batch_size=1000):
+        """ Inserts unsaved Commit instances, skipping the ones already on
+        record: commits are matched on (package, commit_hash), or on
+        (package, commit_date) when they have no hash. The commit fields of
+        each package involved are refreshed once, in the same transaction.
+        """
+        commits = list(commits)
+        if not commits:
+            return commits
+        with transaction.atomic(savepoint=False):
+            self.bulk_create(commits, batch_size=batch_size, ignore_conflicts=True)
+            self.refresh_packages({commit.package_id: commit.package for commit in commits}.values())
+        return commits
+
+    def refresh_packages(self, packages):
+        """ Recomputes last_commit_date and the commit histogram of packages
+        and stores them with a single bulk update. The instances passed in
+        are updated too, so saving them later does not write stale values
+        back.
+        """
+        packages = [package for package in packages if package.pk is not None]
+        last_commits = dict(
+            self.filter(package__in=packages).order_by().values("package").annotate(
+                last_commit=models.Max("commit_date"),
+            ).values_list("package", "last_commit")
+        )
+        for package in packages:
+            package.last_commit_date = last_commits.get(package.pk)
+        histogram.set_commit_weeks(packages)
+        Package.objects.bulk_update(packages, ["last_commit_date", "commit_weeks", "commit_weeks_end"])
+        return packages
+
+
 class Commit(BaseModel):
 
     package = models.ForeignKey(Package, on_delete=models.CASCADE)
     commit_date = models.DateTimeField(_("Commit Date"))
     commit_hash = models.CharField(_("Commit Hash"), help_text="Example: Git sha or SVN commit id", max_length=150, blank=True, default="")
 
+    objects = CommitManager()
+
     class Meta:
         ordering = ['-commit_date']
         get_latest_by = 'commit_date'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['package', 'commit_hash'],
+                condition=~models.Q(commit_hash=''),
+                name='unique_package_commit_hash',
+            ),
+            models.UniqueConstraint(
+                fields=['package', 'commit_date'],
+                condition=models.Q(commit_hash=''),
+                name='unique_package_commit_date',
+            ),
+        ]
 
     def __str__(self):
         return "Commit for '{}' on {}".format(self.package.title, str(self.commit_date))
 
     def save(self, *args, **kwargs):
-        # reset the last_updated and commits_over_52 caches on the package
-        package = self.package
-        cache.delete(package.cache_namer(self.package.last_updated))
-        cache.delete(package.cache_namer(package.commits_over_52))
-        self.package.last_updated()
-        super().save(*args, **kwargs)
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            Commit.objects.refresh_packages([self.package])
 
 
 class VersionManager(models.Manager):
+    def bulk_ingest(self, package, releases, batch_size=1000):
+        """ Upserts the versions of a package: the ones already on record are
+        updated with a single bulk update, the others inserted with a single
+        insert. The latest release fields of the package are refreshed once.
+
+            releases: dict mapping version numbers to dicts of Version field
+            values, as returned by Package.pypi_releases()
+            return: list of the Version instances created or updated
+        """
+        existing = {version.number: version for version in self.filter(package=package, number__in=list(releases))}
+        created, updated = [], []
+        fields = set()
+        for number, values in releases.items():
+            values = dict(values)
+            values['sort_key'], values['prerelease'] = version_sort_key(number)
+            if 'license' in values:
+                values['license'] = normalize_license(values['license'])
+            fields.update(values)
+            version = existing.get(number)
+            if version is None:
+                version = Version(package=package, number=number, license=normalize_license(None))
+                created.append(version)
+            else:
+                updated.append(version)
+            for name, value in values.items():
+                setattr(version, name, value)
+
+        with transaction.atomic(savepoint=False):
+            self.bulk_create(created, batch_size=batch_size, ignore_conflicts=True)
+            if updated and fields:
+                self.bulk_update(updated, sorted(fields), batch_size=batch_size)
+            package.refresh_latest_release()
+        return created + updated
+
     def by_version(self, visible=False, *args, **kwargs):
-        qs = self.get_queryset().filter(*args, **kwargs)
+        """ Versions with a valid PEP 440 number, oldest first. """
+        qs = self.get_queryset().filter(*args, **kwargs).exclude(sort_key="")
 
         if visible:
             qs = qs.filter(hidden=False)
 
-        def generate_valid_versions(qs):
-            for item in qs:
-                v = versioner(item.number)
-                comparable = True
-                for elem in v.version:
-                    if isinstance(elem, str):
-                        comparable = False
-                if comparable:
-                    yield item
-
-        return sorted(list(generate_valid_versions(qs)), key=lambda v: versioner(v.number))
+        return list(qs.order_by("sort_key"))
 
     def by_version_not_hidden(self, *args, **kwargs):
         return list(reversed(self.by_version(visible=True, *args, **kwargs)))
@@ -431,12 +548,22 @@ class Version(BaseModel):
     upload_time = models.DateTimeField(_("upload_time"), help_text=_("When this was uploaded to PyPI"), blank=True, null=True)
     development_status = models.IntegerField(_("Development Status"), choices=STATUS_CHOICES, default=0)
     supports_python3 = models.BooleanField(_("Supports Python 3"), default=False)
+    yanked = models.BooleanField(_("Yanked"), default=False, help_text=_("All of the release files were yanked from PyPI"))
+    requires_python = models.CharField(_("Requires Python"), max_length=100, blank=True, default="")
+    sort_key = models.CharField(_("Sort Key"), help_text="Sorts like the PEP 440 version number, empty for invalid numbers", max_length=255, blank=True, default="", db_collation="C")
+    prerelease = models.BooleanField(_("Pre-release"), default=False)
 
     objects = VersionManager()
 
     class Meta:
         get_latest_by = 'upload_time'
         ordering = ['-upload_time']
+        constraints = [
+            models.UniqueConstraint(fields=['package', 'number'], name='unique_package_version_number'),
+        ]
+        indexes = [
+            models.Index(fields=['package', 'sort_key'], name='package_version_sort_key'),
+        ]
 
     @property
     def pretty_license(self):
@@ -448,18 +575,42 @@ class Version(BaseModel):
 
     def save(self, *args, **kwargs):
         self.license = normalize_license(self.license)
+        self.sort_key, self.prerelease = version_sort_key(self.number)
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            if self.package is not None:
+                self.package.refresh_latest_release()
 
-        # reset the latest_version cache on the package
-        cache_name = self.package.cache_namer(self.package.last_released)
-        cache.delete(cache_name)
-        get_version(self.package)
+    def delete(self, *args, **kwargs):
+        package = self.package
+        with transaction.atomic(savepoint=False):
+            result = super().delete(*args, **kwargs)
+            if package is not None:
+                package.refresh_latest_release()
+        return result
 
-        # reset the pypi_version cache on the package
-        cache_name = self.package.cache_namer(self.package.pypi_version)
-        cache.delete(cache_name)
-        get_pypi_version(self.package)
+    def __str__(self):
+        return f"{self.package.title}: {self.number}"
 
-        super().save(*args, **kwargs)
+
+class HTTPValidator(BaseModel):
+    """ ETag / Last-Modified validators of the last full response received
+    for an API URL, sent back on the next request so unchanged resources come
+    back as 304 Not Modified. """
+
+    url = models.URLField(_("URL"), max_length=500, unique=True)
+    etag = models.CharField(_("ETag"), max_length=255, blank=True, default="")
+    last_modified = models.CharField(_("Last-Modified"), max_length=64, blank=True, default="")
 
     def __str__(self):
-        return f"{self.package.title}: {self.number}"
+        return self.url
+
+
+class PyPISync(BaseModel):
+    """ Serial of the last PyPI changelog event processed by
+    pypi_updater --incremental. A single row is kept. """
+
+    last_serial = models.BigIntegerField(_("Last Serial"))
+
+    def __str__(self):
+        return str(self.last_serial)
@@ -0,0 +1,70 @@
+"""
+Incremental PyPI sync for the pypi_updater command.
+
+PyPI numbers every change to the index with an increasing serial and exposes
+them through the changelog methods of its XML-RPC API. We store the serial of
+the last event processed (see PyPISync) and on the next run only refresh the
+packages whose project had a release or file event since.
+
+The first incremental run has no serial to start from: it refreshes every
+package and stores the serial PyPI reported before the run started, so no
+event is missed.
+"""
+import xmlrpc.client
+
+from django.conf import settings
+from packaging.utils import canonicalize_name
+
+
+def get_changelog_client():
+    return xmlrpc.client.ServerProxy(settings.PYPI_XMLRPC_URL)
+
+
+def changed_projects(client, serial):
+    """ Reads the PyPI changelog from serial onwards.
+
+        return: (set of canonical names of the projects that had a release
+        event, serial of the last event read)
+    """
+    names = set()
+    while True:
+        events = client.changelog_since_serial(serial)
+        if not events:
+            return names, serial
+        for name, version, timestamp, action, event_serial in events:
+            # Events without a version are project-level (creation, roles, ...)
+            if version is not None:
+                names.add(canonicalize_name(name))
+            serial = max(serial, event_serial)
+
+
+def packages_for_projects(names):
+    """ Returns the packages published on PyPI under one of names. """
+    from package.models import Package  # Added here to avoid circular imports
+
+    pks = [
+        package.pk
+        for package in Package.objects.exclude(pypi_url="").only("pk", "pypi_url").iterator()
+        if canonicalize_name(package.pypi_name) in names
+    ]
+    return Package.objects.filter(pk__in=pks)
+
+
+def changed_packages(client=None):
+    """ Returns (packages, serial): the packages to refresh and the serial to
+    store with save_serial() once they are. """
+    from package.models import Package, PyPISync  # Added here to avoid circular imports
+
+    client = client or get_changelog_client()
+    state = PyPISync.objects.first()
+    if state is None:
+        return Package.objects.all(), client.changelog_last_serial()
+    names, serial = changed_projects(client, state.last_serial)
+    return packages_for_projects(names), serial
+
+
+def save_serial(serial):
+    from package.models import PyPISync  # Added here to avoid circular imports
+
+    if not PyPISync.objects.update(last_serial=serial):
+        PyPISync.objects.create(last_serial=serial)
@@ -4,11 +4,85 @@ Base class for objects that interact with third-party code repository services.
 
 import json
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
 import requests
 
+from package.repos.conditional import ConditionalRequestAdapter
+
+_http_adapter = None
+_session = None
+
+
+def get_http_adapter():
+    """
+    Connection pool shared by every repo handler, sized to the number of
+    package_updater workers so concurrent fetches reuse connections. Every
+    request sent through it is scheduled by the per-host rate limiter, and GET
+    requests are revalidated against their stored ETag / Last-Modified.
+    """
+    global _http_adapter
+    if _http_adapter is None:
+        _http_adapter = ConditionalRequestAdapter(
+            pool_connections=settings.PACKAGE_UPDATER_HOST_CONCURRENCY,
+            pool_maxsize=settings.PACKAGE_UPDATER_WORKERS,
+        )
+    return _http_adapter
+
+
+def size_http_adapter(workers):
+    """
+    Grows the shared connection pool to serve workers concurrent requests,
+    for package_updater runs with more workers than PACKAGE_UPDATER_WORKERS.
+    Must be called before the requests start.
+    """
+    adapter = get_http_adapter()
+    if workers > adapter._pool_maxsize:
+        adapter.poolmanager.clear()
+        adapter.init_poolmanager(adapter._pool_connections, workers, block=adapter._pool_block)
+    return adapter
+
+
+def get_session():
+    """
+    requests.Session bound to the shared connection pool.
+    """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        mount_http_adapter(_session)
+    return _session
+
+
+def mount_http_adapter(session):
+    """ Makes a third-party client session (github3, python-gitlab) use the
+    shared connection pool. """
+    adapter = get_http_adapter()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def run_sync(func, *args, **kwargs):
+    """
+    Runs a blocking handler call in a worker thread. The thread's database
+    connection is released afterwards, the same way it is at the end of a
+    request.
+    """
+    def wrapped():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(wrapped, thread_sensitive=False)()
+
 
 class BaseHandler:
 
+    # Number of packages fetch_metadata_batch() handles in one call
+    batch_size = 1
+
     def __str__(self):
         return self.title
 
@@ -35,6 +109,9 @@ class BaseHandler:
 
                 return: package.models.Package instance
 
+            Raises NotModified when the repository has not changed since it
+            was last fetched.
+
             Must set the following fields:
 
                 package.repo_watchers (int)
@@ -47,9 +124,36 @@ class BaseHandler:
 
     def fetch_commits(self, package):
         """ Accepts a package.models.Package instance:
+
+            Raises NotModified when there are no new commits.
         """
         return NotImplemented
 
+    def fetch_metadata_batch(self, packages):
+        """ Accepts a list of package.models.Package instances and sets the
+        same fields as fetch_metadata() on each of them, using as few API
+        calls as the service allows:
+
+                return: dict mapping package.pk to the date of the latest
+                commit, for the packages where the service reported it
+        """
+        for package in packages:
+            self.fetch_metadata(package)
+        return {}
+
+    async def afetch_metadata(self, package):
+        """ Async counterpart of fetch_metadata().
+
+            Handlers built on blocking clients get this for free: the call
+            runs in a worker thread so many packages can be fetched at once.
+        """
+        return await run_sync(self.fetch_metadata, package)
+
+    async def afetch_commits(self, package):
+        """ Async counterpart of fetch_commits().
+        """
+        return await run_sync(self.fetch_commits, package)
+
     @property
     def is_other(self):
         """ DON'T CHANGE THIS PROPERTY! This should only be overridden by
@@ -97,8 +201,10 @@ class BaseHandler:
     def get_json(self, target):
         """
         Helpful utility method to do a quick GET for JSON data.
+
+        Raises NotModified when target has not changed since the last call.
         """
-        r = requests.get(target)
+        r = get_session().get(target)
         if r.status_code != 200:
             r.raise_for_status()
         return json.loads(r.content)
@@ -1,9 +1,9 @@
-from datetime import datetime, timedelta
 import re
 from warnings import warn
 
 
 from .base_handler import BaseHandler
+from .conditional import NotModified
 
 import requests
 
@@ -35,28 +35,16 @@ class BitbucketHandler(BaseHandler):
 
     def fetch_commits(self, package):
         from package.models import Commit  # Import placed here to avoid circular dependencies
+        commits = []
         for commit in self._get_bitbucket_commits(package):
             timestamp = commit["timestamp"].split("+")
             if len(timestamp) > 1:
                 timestamp = timestamp[0]
             else:
                 timestamp = commit["timestamp"]
-            commit, created = Commit.objects.get_or_create(package=package, commit_date=timestamp)
-
-        #  ugly way to get 52 weeks of commits
-        # TODO - make this better
-        now = datetime.now()
-        commits = package.commit_set.filter(
-            commit_date__gt=now - timedelta(weeks=52),
-        ).values_list('commit_date', flat=True)
-
-        weeks = [0] * 52
-        for cdate in commits:
-            age_weeks = (now - cdate).days // 7
-            if age_weeks < 52:
-                weeks[age_weeks] += 1
-
-        package.commit_list = ','.join(map(str, reversed(weeks)))
+            commits.append(Commit(package=package, commit_date=timestamp))
+        Commit.objects.bulk_ingest(commits)
+        package.commit_list = package.commits_over_52()
         package.save()
 
     def fetch_metadata(self, package):
@@ -86,7 +74,10 @@ class BitbucketHandler(BaseHandler):
             data = self.get_json(url)
         except requests.exceptions.HTTPError:
             return package
-        package.repo_forks = len(data['forks'])
+        except NotModified:
+            pass
+        else:
+            package.repo_forks = len(data['forks'])
 
         # get the followers of a repo
         url = f"{target}followers/"
@@ -94,7 +85,10 @@ class BitbucketHandler(BaseHandler):
             data = self.get_json(url)
         except requests.exceptions.HTTPError:
             return package
-        package.repo_watchers = data['count']
+        except NotModified:
+            pass
+        else:
+            package.repo_watchers = data['count']
 
         # Getting participants
         try:
@@ -0,0 +1,110 @@
+"""
+Conditional requests for PyPI and the repo APIs.
+
+The ETag and Last-Modified validators of every full GET response are stored in
+the database and sent back as If-None-Match / If-Modified-Since the next time
+the same URL is fetched. When the provider answers 304 Not Modified the
+adapter raises NotModified, so callers skip parsing and database writes
+altogether. GitHub does not count 304 responses against the rate limit.
+
+Pages after the first of a paginated list are always fetched in full: a 304
+half way through would leave the caller with a truncated list.
+"""
+from contextlib import contextmanager
+from datetime import timedelta
+import threading
+from urllib.parse import parse_qs, urlsplit
+
+from django.conf import settings
+from django.utils import timezone
+
+from package.repos.ratelimit import RateLimitedAdapter
+
+CONDITIONAL_HEADERS = ("If-None-Match", "If-Modified-Since")
+
+_local = threading.local()
+
+
+class NotModified(Exception):
+    """ Raised when a resource has not changed since it was last fetched. """
+
+    def __init__(self, response):
+        super().__init__(response.url)
+        self.response = response
+
+
+def get_validator(url):
+    """ Returns the stored validators of url if they are still fresh. """
+    from package.models import HTTPValidator  # Added here to avoid circular imports
+
+    oldest = timezone.now() - timedelta(seconds=settings.HTTP_VALIDATOR_MAX_AGE)
+    return HTTPValidator.objects.filter(url=url, modified__gte=oldest).first()
+
+
+def save_validator(url, response, validator=None):
+    """ Stores the validators of a full response, unless they are already on
+    record. """
+    from package.models import HTTPValidator  # Added here to avoid circular imports
+
+    etag = response.headers.get("ETag", "")
+    last_modified = response.headers.get("Last-Modified", "")
+    if not (etag or last_modified) or len(url) > HTTPValidator._meta.get_field("url").max_length:
+        return
+    if validator is not None and (validator.etag, validator.last_modified) == (etag, last_modified):
+        return
+    HTTPValidator.objects.update_or_create(
+        url=url,
+        defaults={"etag": etag, "last_modified": last_modified},
+    )
+
+
+def is_next_page(url):
+    """ return: True for the URLs of the pages after the first of a list
+    (GitHub and GitLab number them with a page parameter) """
+    return "page" in parse_qs(urlsplit(url).query)
+
+
+@contextmanager
+def unconditional():
+    """ Sends the GET requests made by this thread inside the block without
+    the stored validators, for lookups whose answer is needed even when it
+    has not changed (the repository a commit sync starts from, fetched
+    moments earlier by the metadata sync). """
+    previous = getattr(_local, "unconditional", False)
+    _local.unconditional = True
+    try:
+        yield
+    finally:
+        _local.unconditional = previous
+
+
+class ConditionalRequestAdapter(RateLimitedAdapter):
+    """ Rate limited transport adapter that revalidates GET requests with the
+    validators stored for their URL. Requests that already carry conditional
+    headers and the pages after the first of a list are left alone. """
+
+    def send(self, request, *args, **kwargs):
+        if (
+            request.method != "GET"
+            or is_next_page(request.url)
+            or any(header in request.headers for header in CONDITIONAL_HEADERS)
+        ):
+            return super().send(request, *args, **kwargs)
+
+        validator = None if getattr(_local, "unconditional", False) else get_validator(request.url)
+        if validator is not None:
+            if validator.etag:
+                request.headers["If-None-Match"] = validator.etag
+            if validator.last_modified:
+                request.headers["If-Modified-Since"] = validator.last_modified
+
+        response = super().send(request, *args, **kwargs)
+        if response.status_code == 304 and validator is not None:
+            # Give the connection back to the pool before bailing out
+            response.content
+            response.close()
+            raise NotModified(response)
+        if response.status_code == 200:
+            # Expired validators are not looked up, so they get rewritten here
+            save_validator(request.url, response, validator)
+        return response
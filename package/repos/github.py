@@ -1,12 +1,32 @@
-from time import sleep
+from datetime import timedelta
+import logging
 
+from dateutil.parser import parse as parse_datetime
 from django.conf import settings
+from django.utils import timezone
 
 from github3 import GitHub, login
+import requests
 
-from .base_handler import BaseHandler
+from .base_handler import BaseHandler, get_session, mount_http_adapter
+from .conditional import NotModified, unconditional
 from package.utils import uniquer
 
+logger = logging.getLogger(__name__)
+
+GRAPHQL_REPOSITORY_FIELDS = """
+    stargazerCount
+    forkCount
+    description
+    defaultBranchRef {
+        target {
+            ... on Commit {
+                committedDate
+            }
+        }
+    }
+"""
+
 
 class GitHubHandler(BaseHandler):
     title = "GitHub"
@@ -20,25 +40,31 @@ class GitHubHandler(BaseHandler):
             self.github = login(token=settings.GITHUB_TOKEN)
         else:
             self.github = GitHub()
+        mount_http_adapter(self.github._session)
 
-    def manage_ratelimit(self):
-        while self.github.ratelimit_remaining < 10:
-            print(f"{__file__}::manage_ratelimit::sleep(1)")
-            sleep(1)
+    @property
+    def batch_size(self):
+        # GraphQL requires a token; without one every package goes through
+        # REST, so packages are not serialized in batches
+        return settings.GITHUB_GRAPHQL_BATCH_SIZE if settings.GITHUB_TOKEN else 1
 
-    def _get_repo(self, package):
+    def _get_repo_path(self, package):
         repo_name = package.repo_name()
         if repo_name.endswith("/"):
             repo_name = repo_name[:-1]
         try:
-            username, repo_name = package.repo_name().split('/')
+            username, repo_name = repo_name.split('/')
         except ValueError:
             return None
-        return self.github.repository(username, repo_name)
+        return username, repo_name
 
+    def _get_repo(self, package):
+        repo_path = self._get_repo_path(package)
+        if repo_path is None:
+            return None
+        return self.github.repository(*repo_path)
 
     def fetch_metadata(self, package):
-        self.manage_ratelimit()
         repo = self._get_repo(package)
         if repo is None:
             return package
@@ -50,41 +76,126 @@ class GitHubHandler(BaseHandler):
         package.repo_description = repo.description
         # repo.stargazers_count
 
+        return self.fetch_contributors(package, repo)
+
+    def fetch_contributors(self, package, repo=None):
+        """ Sets package.participants to the contributors of the repository
+        and package.participants_fetched to now. """
+        if repo is None:
+            # The repository was fetched through GraphQL moments ago
+            with unconditional():
+                repo = self._get_repo(package)
+            if repo is None:
+                return package
+
         contributors = []
-        # for contributor in repo.contributors():
-        for contributor in repo.iter_contributors():
-            contributors.append(contributor.login)
-            self.manage_ratelimit()
+        try:
+            # for contributor in repo.contributors():
+            for contributor in repo.iter_contributors():
+                contributors.append(contributor.login)
+        except NotModified:
+            # Same contributors as last time
+            pass
 
         if contributors:
             package.participants = ','.join(uniquer(contributors))
+        package.participants_fetched = timezone.now()
 
         return package
 
+    def _query_repositories(self, repo_paths):
+        """ Runs one GraphQL query for a list of (owner, name) tuples.
+
+            return: list of repository dicts, None for repositories that could not be fetched
+        """
+        variables = {}
+        selections = []
+        for index, (owner, name) in enumerate(repo_paths):
+            variables[f"owner{index}"] = owner
+            variables[f"name{index}"] = name
+            selections.append(
+                f"r{index}: repository(owner: $owner{index}, name: $name{index}) {{{GRAPHQL_REPOSITORY_FIELDS}}}"
+            )
+        arguments = ", ".join(f"${key}: String!" for key in variables)
+        query = "query({}) {{\n{}\n}}".format(arguments, "\n".join(selections))
+
+        response = get_session().post(
+            settings.GITHUB_GRAPHQL_URL,
+            json={"query": query, "variables": variables},
+            headers={"Authorization": f"bearer {settings.GITHUB_TOKEN}"},
+        )
+        response.raise_for_status()
+        data = response.json().get("data") or {}
+        return [data.get(f"r{index}") for index in range(len(repo_paths))]
+
+    def fetch_metadata_batch(self, packages):
+        """ Fetches stars, forks, description and the latest commit date of
+        many repositories with a single GraphQL query. Contributors are not
+        available through GraphQL: they are fetched through REST for at most
+        GITHUB_CONTRIBUTORS_PER_BATCH packages whose participants are older
+        than GITHUB_CONTRIBUTORS_INTERVAL.
+
+        Packages the query fails for fall back to fetch_metadata().
+        """
+        latest_commits = {}
+        batch = []
+        for package in packages:
+            repo_path = self._get_repo_path(package)
+            if repo_path is None:
+                continue
+            batch.append((package, repo_path))
+
+        repositories = [None] * len(batch)
+        if settings.GITHUB_TOKEN and batch:
+            try:
+                repositories = self._query_repositories([repo_path for _, repo_path in batch])
+            except (requests.exceptions.RequestException, ValueError):
+                logger.warning("GitHub GraphQL batch failed, falling back to REST", exc_info=True)
+
+        stale = timezone.now() - timedelta(seconds=settings.GITHUB_CONTRIBUTORS_INTERVAL)
+        contributors_left = settings.GITHUB_CONTRIBUTORS_PER_BATCH
+        for (package, _), repository in zip(batch, repositories):
+            if repository is None:
+                self.fetch_metadata(package)
+                continue
+            package.repo_watchers = repository["stargazerCount"]
+            package.repo_forks = repository["forkCount"]
+            package.repo_description = repository["description"] or ""
+            if contributors_left and (package.participants_fetched is None or package.participants_fetched < stale):
+                contributors_left -= 1
+                try:
+                    self.fetch_contributors(package)
+                except Exception:
+                    logger.warning(f"Unable to fetch the contributors of {package}", exc_info=True)
+            try:
+                committed_date = parse_datetime(repository["defaultBranchRef"]["target"]["committedDate"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if not settings.USE_TZ:
+                committed_date = timezone.make_naive(committed_date)
+            latest_commits[package.pk] = committed_date
+
+        return latest_commits
+
     def fetch_commits(self, package):
 
-        self.manage_ratelimit()
-        repo = self._get_repo(package)
+        # fetch_metadata() usually looked the repository up moments ago, so
+        # a revalidated lookup would answer 304 before the commits are listed
+        with unconditional():
+            repo = self._get_repo(package)
         if repo is None:
             return package
 
-        from package.models import Commit  # Added here to avoid circular imports
-
-        # for commit in repo.commits():
-        for commit in repo.iter_commits():
-            self.manage_ratelimit()
-            try:
-                commit_record, created = Commit.objects.get_or_create(
-                    package=package,
-                    commit_date=commit.commit.committer['date']
-                )
-                if not created:
-                    break
-            except Commit.MultipleObjectsReturned:
-                continue
-            # If the commit record already exists, it means we are at the end of the
-            #   list we want to import
-
+        commits = []
+        try:
+            # for commit in repo.commits():
+            for commit in repo.iter_commits(since=package.commits_since()):
+                commits.append((commit.sha, parse_datetime(commit.commit.committer['date'])))
+        except NotModified:
+            if not commits:
+                raise
+
+        package.add_commits(commits)
         package.save()
         return package
 
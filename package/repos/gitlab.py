@@ -1,8 +1,11 @@
 
+from dateutil.parser import parse as parse_datetime
 from django.conf import settings
 from gitlab import Gitlab
+import requests
 
-from .base_handler import BaseHandler
+from .base_handler import BaseHandler, mount_http_adapter
+from .conditional import unconditional
 
 
 class GitlabHandler(BaseHandler):
@@ -14,10 +17,11 @@ class GitlabHandler(BaseHandler):
     gitlab: Gitlab
 
     def __init__(self):
+        session = mount_http_adapter(requests.Session())
         if settings.GITLAB_TOKEN:
-            self.gitlab = Gitlab(self.url, private_token=settings.GITLAB_TOKEN)
+            self.gitlab = Gitlab(self.url, private_token=settings.GITLAB_TOKEN, session=session)
         else:
-            self.gitlab = Gitlab(self.url)
+            self.gitlab = Gitlab(self.url, session=session)
 
     def _get_repo(self, repo_url):
         path = repo_url.replace(f"{self.url}/", "")
@@ -36,26 +40,21 @@ class GitlabHandler(BaseHandler):
 
     def fetch_commits(self, package):
 
-        repo = self._get_repo(package.repo_url)
+        # fetch_metadata() usually looked the project up moments ago, so a
+        # revalidated lookup would answer 304 before the commits are listed
+        with unconditional():
+            repo = self._get_repo(package.repo_url)
         if repo is None:
             return package
 
-        from package.models import Commit  # Added here to avoid circular imports
-
-        for commit in repo.commits.list(as_list=False):
-            try:
-                commit_record, created = Commit.objects.get_or_create(
-                    package=package,
-                    commit_date=commit.committed_date,
-                    commit_hash=commit.id,
-                )
-                if not created:
-                    break
-            except Commit.MultipleObjectsReturned:
-                continue
-            # If the commit record already exists, it means we are at the end of the
-            #   list we want to import
+        since = package.commits_since()
+        kwargs = {"since": since.isoformat()} if since is not None else {}
+        commits = [
+            (commit.id, parse_datetime(commit.committed_date))
+            for commit in repo.commits.list(as_list=False, **kwargs)
+        ]
 
+        package.add_commits(commits)
         package.save()
         return package
 
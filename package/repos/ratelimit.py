@@ -0,0 +1,129 @@
+"""
+Rate limit scheduler shared by every repo handler.
+
+Each API host has a token bucket kept in the cache backend, so all updater
+workers, threads and processes alike, draw from the same budget. The bucket
+is refilled from the provider's own rate limit headers. Once it runs dry,
+callers sleep until the advertised reset time instead of polling.
+
+Providers may keep separate budgets on one host, like GitHub does for its
+REST ("core") and GraphQL APIs. Responses naming their budget in the
+X-RateLimit-Resource header refill the bucket of that resource, and later
+requests to the same API draw from it.
+"""
+from time import sleep, time
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+
+# (remaining, reset, limit) header names, GitHub/Bitbucket style then GitLab style
+RATELIMIT_HEADERS = [
+    ("X-RateLimit-Remaining", "X-RateLimit-Reset", "X-RateLimit-Limit"),
+    ("RateLimit-Remaining", "RateLimit-Reset", "RateLimit-Limit"),
+]
+
+
+class RateLimiter:
+    """ Token bucket for a single API host, or a single resource of the
+    host when it has several budgets. """
+
+    def __init__(self, host, resource=None, reserve=None):
+        self.host = host
+        self.resource = resource
+        self.reserve = settings.REPO_RATELIMIT_RESERVE if reserve is None else reserve
+
+    def __str__(self):
+        return f"{self.host}:{self.resource}" if self.resource else self.host
+
+    @property
+    def remaining_key(self):
+        return f"ratelimit:{self}:remaining"
+
+    @property
+    def reset_key(self):
+        return f"ratelimit:{self}:reset"
+
+    def refill(self, remaining, reset):
+        """ Records the budget reported by the provider. The bucket expires at
+        the reset time, after which the provider's budget is full again. """
+        timeout = reset - time()
+        if timeout <= 0:
+            return
+        cache.set_many({
+            self.remaining_key: remaining,
+            self.reset_key: reset,
+        }, timeout)
+
+    def update_from_response(self, response):
+        headers = response.headers
+        if response.status_code == 429 and "Retry-After" in headers:
+            try:
+                self.refill(0, time() + int(headers["Retry-After"]))
+            except ValueError:
+                pass
+            return
+        for remaining_header, reset_header, _ in RATELIMIT_HEADERS:
+            if remaining_header in headers and reset_header in headers:
+                try:
+                    self.refill(int(headers[remaining_header]), int(headers[reset_header]))
+                except ValueError:
+                    pass
+                return
+
+    def acquire(self):
+        """ Takes a token from the bucket. When the bucket is down to its
+        reserve, sleeps until the provider refills it.
+
+            return: number of seconds spent waiting
+        """
+        try:
+            remaining = cache.decr(self.remaining_key)
+        except ValueError:
+            # No budget known yet, or the window has been reset
+            return 0
+        if remaining >= self.reserve:
+            return 0
+        reset = cache.get(self.reset_key)
+        if reset is None:
+            return 0
+        delay = max(reset - time(), 0)
+        if delay:
+            sleep(delay)
+        return delay
+
+
+_limiters = {}
+
+# (host, API) to the resource its responses last reported
+_resources = {}
+
+
+def get_ratelimiter(host, resource=None):
+    if (host, resource) not in _limiters:
+        _limiters[(host, resource)] = RateLimiter(host, resource)
+    return _limiters[(host, resource)]
+
+
+def get_api(url):
+    """ return: "graphql" for the GraphQL endpoint of a host, "rest" for
+    the other URLs """
+    return "graphql" if urlparse(url).path.rstrip("/").endswith("/graphql") else "rest"
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """ Transport adapter that routes every request through the rate limiter
+    of its host and API. """
+
+    def send(self, request, *args, **kwargs):
+        host, api = urlparse(request.url).netloc, get_api(request.url)
+        limiter = get_ratelimiter(host, _resources.get((host, api)))
+        limiter.acquire()
+        response = super().send(request, *args, **kwargs)
+        resource = response.headers.get("X-RateLimit-Resource")
+        if resource:
+            _resources[(host, api)] = resource
+            limiter = get_ratelimiter(host, resource)
+        limiter.update_from_response(response)
+        return response
@@ -0,0 +1,106 @@
+"""
+Per-package refresh scheduling for the package_updater command.
+
+Every package gets a next_refresh time of last_fetched plus an interval that
+shrinks as the package changes more often and grows more popular:
+
+* activity is the number of commits over the last COMMIT_WINDOW plus the
+  number of releases over the last RELEASE_WINDOW, turned into an expected
+  number of changes per day;
+* popularity is repo_watchers plus the number of users of the package, and
+  divides the interval by 1 + log10(1 + popularity).
+
+Packages without any recent commit or release are refreshed every
+PACKAGE_REFRESH_MAX_INTERVAL seconds, and no package is refreshed more often
+than every PACKAGE_REFRESH_MIN_INTERVAL seconds. Packages whose last refresh
+failed keep their old last_fetched and are retried after the minimum interval.
+"""
+from datetime import datetime, timedelta
+import math
+
+from django.conf import settings
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+COMMIT_WINDOW = timedelta(days=90)
+RELEASE_WINDOW = timedelta(days=365)
+
+
+def refresh_interval(recent_commits, recent_releases, popularity):
+    """ Returns the timedelta to wait between two refreshes of a package. """
+    min_interval = timedelta(seconds=settings.PACKAGE_REFRESH_MIN_INTERVAL)
+    max_interval = timedelta(seconds=settings.PACKAGE_REFRESH_MAX_INTERVAL)
+
+    changes_per_day = recent_commits / COMMIT_WINDOW.days + recent_releases / RELEASE_WINDOW.days
+    if not changes_per_day:
+        return max_interval
+    interval = timedelta(days=1 / changes_per_day) / (1 + math.log10(1 + max(popularity, 0)))
+    return max(min_interval, min(interval, max_interval))
+
+
+def count_per_package(queryset):
+    """ Subquery counting the rows of queryset that belong to the outer
+    package. Unlike Count() over joins, the counts do not multiply each other's
+    rows. """
+    counts = queryset.filter(package=OuterRef("pk")).order_by().values("package").annotate(count=Count("pk"))
+    return Coalesce(Subquery(counts.values("count"), output_field=IntegerField()), 0)
+
+
+def with_activity(queryset, now=None):
+    """ Annotates a Package queryset with the recent_commits, recent_releases
+    and usage_count used by refresh_interval(). """
+    from package.models import Commit, Package, Version  # Added here to avoid circular imports
+
+    now = now or timezone.now()
+    return queryset.annotate(
+        recent_commits=count_per_package(Commit.objects.filter(commit_date__gte=now - COMMIT_WINDOW)),
+        recent_releases=count_per_package(Version.objects.filter(upload_time__gte=now - RELEASE_WINDOW)),
+        usage_count=count_per_package(Package.usage.through.objects.all()),
+    )
+
+
+def schedule_packages(packages, now=None):
+    """ Computes and stores next_refresh for an iterable of packages with a
+    single query and a single bulk update.
+
+        return: number of packages scheduled
+    """
+    from package.models import Package  # Added here to avoid circular imports
+
+    now = now or timezone.now()
+    earliest = now + timedelta(seconds=settings.PACKAGE_REFRESH_MIN_INTERVAL)
+    pks = [package.pk for package in packages]
+    scheduled = []
+    for package in with_activity(Package.objects.filter(pk__in=pks), now).only("pk", "last_fetched", "repo_watchers"):
+        interval = refresh_interval(
+            package.recent_commits,
+            package.recent_releases,
+            package.repo_watchers + package.usage_count,
+        )
+        package.next_refresh = max((package.last_fetched or now) + interval, earliest)
+        scheduled.append(package)
+    Package.objects.bulk_update(scheduled, ["next_refresh"], batch_size=1000)
+    return len(scheduled)
+
+
+def due_packages(now=None):
+    """ Returns the packages whose next_refresh has passed, the most overdue
+    first. Packages never scheduled come before all others. """
+    from package.models import Package  # Added here to avoid circular imports
+
+    now = now or timezone.now()
+    return Package.objects.filter(
+        Q(next_refresh__isnull=True) | Q(next_refresh__lte=now)
+    ).order_by(F("next_refresh").asc(nulls_first=True), "-repo_watchers", "pk")
+
+
+def refresh_priority(package):
+    """ Sort key matching the order of due_packages(), used by the updater's
+    priority queue. """
+    return (
+        package.next_refresh is not None,
+        package.next_refresh or datetime.min,
+        -package.repo_watchers,
+        package.pk,
+    )
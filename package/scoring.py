@@ -0,0 +1,64 @@
+"""
+Package scores, used to order the packages of a grid.
+
+package_score() holds the formula. Package.calculate_score() feeds it the
+data of a single package on save, while rescore_packages() loads the inputs
+of a whole queryset with one aggregate query and writes the scores back in
+bulk, without touching the grid caches.
+"""
+import math
+
+from dateutil import relativedelta
+from django.db.models import F, Max, OuterRef, Subquery
+from django.utils.timezone import now
+
+# Order putting the latest release of a package first
+LATEST_VERSION_ORDER = (F("upload_time").desc(nulls_last=True), "-created", "-pk")
+
+
+def package_score(repo_watchers, last_updated, supports_python3, today=None):
+    """
+    Scores a penalty of 10% of the stars for each 3 months the package is not updated;
+    + a penalty of -30% of the stars if it does not support python 3.
+    So an abandoned packaged for 2 years would lose 80% of its stars.
+    """
+    delta = relativedelta.relativedelta(today or now(), last_updated)
+    delta_months = (delta.years * 12) + delta.months
+    last_updated_penalty = math.modf(delta_months / 3)[1] * repo_watchers / 10
+    # TODO: Address this better
+    python_3_penalty = 0 if supports_python3 else min([repo_watchers * 30 / 100, 1000])
+    # penalty for docs maybe
+    return repo_watchers - last_updated_penalty - python_3_penalty
+
+
+def rescore_packages(queryset=None, batch_size=1000):
+    """ Recomputes the score of the packages of queryset (all of them by
+    default) and stores the ones that changed.
+
+        return: number of packages whose score changed
+    """
+    from package.models import Package, Version  # Added here to avoid circular imports
+
+    if queryset is None:
+        queryset = Package.objects.all()
+    latest_version = Version.objects.filter(package=OuterRef("pk")).order_by(*LATEST_VERSION_ORDER)
+    rows = queryset.order_by().annotate(
+        last_commit=Max("commit__commit_date"),
+        latest_python3=Subquery(latest_version.values("supports_python3")[:1]),
+    ).values_list("pk", "repo_watchers", "last_commit", "latest_python3", "score")
+    if not rows:
+        return 0
+
+    pks, repo_watchers, last_commits, latest_python3, previous_scores = zip(*rows)
+    today = now()
+    scores = [
+        int(package_score(watchers, last_commit, python3, today))
+        for watchers, last_commit, python3 in zip(repo_watchers, last_commits, latest_python3)
+    ]
+    changed = [
+        Package(pk=pk, score=score)
+        for pk, score, previous in zip(pks, scores, previous_scores)
+        if score != previous
+    ]
+    Package.objects.bulk_update(changed, ["score"], batch_size=batch_size)
+    return len(changed)
@@ -4,4 +4,7 @@ from .test_models import *
 from package.tests.test_repos import *
 from package.tests.test_utils import *
 from package.tests.test_views import *
-from package.tests.test_signals import SignalTests
\ No newline at end of file
+from package.tests.test_signals import SignalTests
+from package.tests.test_updater import *
+from package.tests.test_ratelimit import *
+from package.tests.test_conditional import *
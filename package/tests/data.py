@@ -9,6 +9,13 @@ from django.utils.timezone import now
 abandoned_package_last_commit = datetime.datetime(now().year - 2, now().month, now().day, 0, 0)
 abandoned_package_last_commit_10_years = datetime.datetime(now().year - 10, now().month, now().day, 0, 0)
 
+
+def make_package(title="Django", slug="django", repo_url="https://github.com/django/django", **kwargs):
+    """ Creates a package in a "dummy" category, for tests that do not need
+    everything load() creates. """
+    category, created = Category.objects.get_or_create(slug="dummy", defaults={"title": "dummy"})
+    return Package.objects.create(title=title, slug=slug, repo_url=repo_url, category=category, **kwargs)
+
 def load():
     category, created = Category.objects.get_or_create(
         pk=2,
@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+import requests
+
+from core.test_utils.stub_server import StubServer
+from package.models import HTTPValidator
+from package.repos.base_handler import BaseHandler, mount_http_adapter
+from package.repos.conditional import NotModified, unconditional
+
+ETAG = '"a8f3"'
+
+
+class ConditionalRequestTest(TestCase):
+
+    def setUp(self):
+        self.session = mount_http_adapter(requests.Session())
+
+    def test_validators_are_stored_and_sent(self):
+        routes = {("GET", "/repos/django/django"): [
+            (200, {"stargazers_count": 1}, {"ETag": ETAG, "Last-Modified": "Mon, 04 Oct 2021 09:16:12 GMT"}),
+            (304, ""),
+        ]}
+        with StubServer(routes) as server:
+            url = server.url + "/repos/django/django"
+            self.assertEqual(self.session.get(url).json(), {"stargazers_count": 1})
+            with self.assertRaises(NotModified):
+                self.session.get(url)
+
+        validator = HTTPValidator.objects.get(url=url)
+        self.assertEqual(validator.etag, ETAG)
+        self.assertNotIn("If-None-Match", server.requests[0][2])
+        self.assertEqual(server.requests[1][2]["If-None-Match"], ETAG)
+        self.assertEqual(server.requests[1][2]["If-Modified-Since"], "Mon, 04 Oct 2021 09:16:12 GMT")
+
+    def test_changed_resource_updates_validator(self):
+        routes = {("GET", "/pypi/django/json"): [
+            (200, {"version": "3.2"}, {"ETag": ETAG}),
+            (200, {"version": "4.0"}, {"ETag": '"b713"'}),
+        ]}
+        with StubServer(routes) as server:
+            url = server.url + "/pypi/django/json"
+            self.session.get(url)
+            self.assertEqual(self.session.get(url).json(), {"version": "4.0"})
+        self.assertEqual(HTTPValidator.objects.get(url=url).etag, '"b713"')
+
+    @override_settings(HTTP_VALIDATOR_MAX_AGE=60)
+    def test_expired_validators_are_not_sent(self):
+        with StubServer({("GET", "/data"): (200, {}, {"ETag": ETAG})}) as server:
+            url = server.url + "/data"
+            self.session.get(url)
+            HTTPValidator.objects.filter(url=url).update(modified=timezone.now() - timedelta(seconds=120))
+            self.session.get(url)
+        self.assertNotIn("If-None-Match", server.requests[1][2])
+        self.assertGreater(HTTPValidator.objects.get(url=url).modified, timezone.now() - timedelta(seconds=60))
+
+    def test_unconditional(self):
+        routes = {("GET", "/data"): [(200, {"count": 3}, {"ETag": ETAG}), (200, {"count": 3}, {"ETag": ETAG})]}
+        with StubServer(routes) as server:
+            self.session.get(server.url + "/data")
+            with unconditional():
+                self.assertEqual(self.session.get(server.url + "/data").json(), {"count": 3})
+        self.assertNotIn("If-None-Match", server.requests[1][2])
+
+    def test_next_pages_are_not_revalidated(self):
+        routes = {("GET", "/repos/django/django/contributors"): (200, [{"login": "jacob"}], {"ETag": ETAG})}
+        with StubServer(routes) as server:
+            url = server.url + "/repos/django/django/contributors"
+            self.session.get(url + "?page=2")
+            self.session.get(url + "?page=2")
+            self.session.get(url)
+            self.session.get(url)
+        self.assertNotIn("If-None-Match", server.requests[1][2])
+        self.assertFalse(HTTPValidator.objects.filter(url=url + "?page=2").exists())
+        self.assertEqual(server.requests[3][2]["If-None-Match"], ETAG)
+
+    def test_get_json_not_modified(self):
+        routes = {("GET", "/data"): [(200, {"count": 3}, {"ETag": ETAG}), (304, "")]}
+        with StubServer(routes) as server:
+            handler = BaseHandler()
+            self.assertEqual(handler.get_json(server.url + "/data"), {"count": 3})
+            with self.assertRaises(NotModified):
+                handler.get_json(server.url + "/data")
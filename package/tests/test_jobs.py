@@ -0,0 +1,51 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from package import jobs
+from package.tests import data
+
+
+class RefreshQueueTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.queue = jobs.InProcessQueue({})
+        self.package = data.make_package()
+
+    def test_enqueue_dedupes_pending_jobs(self):
+        self.assertTrue(self.queue.enqueue(self.package))
+        self.assertFalse(self.queue.enqueue(self.package))
+        self.assertEqual(list(self.queue.jobs), [self.package.pk])
+        self.assertEqual(jobs.get_status(self.package)["status"], jobs.QUEUED)
+
+    @mock.patch("package.jobs.refresh_package")
+    def test_run_next(self, refresh_package):
+        self.queue.enqueue(self.package)
+        self.assertTrue(self.queue.run_next(timeout=0))
+        refresh_package.assert_called_once_with(self.package.pk)
+        self.assertEqual(jobs.get_status(self.package)["status"], jobs.FINISHED)
+        self.assertFalse(self.queue.run_next(timeout=0))
+        # The finished job no longer blocks a new one
+        self.assertTrue(self.queue.enqueue(self.package))
+
+    @mock.patch("package.jobs.refresh_package", side_effect=ValueError("boom"))
+    def test_failed_job(self, refresh_package):
+        self.queue.enqueue(self.package)
+        self.queue.run_next(timeout=0)
+        self.assertEqual(jobs.get_status(self.package)["status"], jobs.FAILED)
+        self.assertTrue(self.queue.enqueue(self.package))
+
+    @mock.patch("package.jobs.refresh_package")
+    def test_eager(self, refresh_package):
+        queue = jobs.InProcessQueue({"OPTIONS": {"EAGER": True}})
+        self.assertTrue(queue.enqueue(self.package))
+        refresh_package.assert_called_once_with(self.package.pk)
+        self.assertEqual(jobs.get_status(self.package)["status"], jobs.FINISHED)
+
+    def test_refresh_status_view(self):
+        self.queue.enqueue(self.package)
+        response = self.client.get(reverse("package_refresh_status", args=[self.package.slug]))
+        self.assertEqual(response.json()["status"], jobs.QUEUED)
@@ -1,6 +1,11 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
 from django.test import TestCase
+from django.utils import timezone
 
-from package.models import Package, Version
+from package.models import Commit, Package, Version
+from package.histogram import WEEKS, roll_commit_weeks, week_start
+from package.scoring import rescore_packages
 from package.tests import data, initial_data
 
 class VersionTests(TestCase):
@@ -36,12 +41,25 @@ class VersionTests(TestCase):
         p.save()  # updates the score
         self.assertLess(p.score, 0, p.score)
 
+    def test_rescore_packages(self):
+        Package.objects.update(score=0)
+        with self.assertNumQueries(2):
+            changed = rescore_packages()
+        self.assertEqual(changed, Package.objects.exclude(score=0).count())
+        for p in Package.objects.all():
+            self.assertEqual(p.score, int(p.calculate_score()), p.slug)
+        self.assertEqual(rescore_packages(), 0)
+
     def test_version_order(self):
         p = Package.objects.get(slug='django-cms')
         versions = p.version_set.by_version()
         expected_values = [ '2.0.0',
                             '2.0.1',
                             '2.0.2',
+                            '2.1.0.beta3',
+                            '2.1.0.rc1',
+                            '2.1.0.rc2',
+                            '2.1.0.rc3',
                             '2.1.0',
                             '2.1.1',
                             '2.1.2',
@@ -49,6 +67,12 @@ class VersionTests(TestCase):
         returned_values = [v.number for v in versions]
         self.assertEqual(returned_values,expected_values)
 
+    def test_pypi_version(self):
+        p = Package.objects.get(slug='django-cms')
+        self.assertEqual(p.pypi_version(), '2.1.3')
+        Version.objects.create(package=p, number='2.2rc1')
+        self.assertEqual(Package.objects.get(pk=p.pk).pypi_version(), '2.1.3')
+
     def test_version_license_length(self):
         v = Version.objects.all()[0]
         v.license = "x"*50
@@ -62,3 +86,162 @@ class PackageTests(TestCase):
     def test_license_latest(self):
         for p in Package.objects.all():
             self.assertEqual("UNKNOWN", p.license_latest)
+
+
+class CommitCursorTests(TestCase):
+    def setUp(self):
+        self.package = data.make_package()
+
+    def test_add_commits(self):
+        commits = [
+            ("c3", datetime(2021, 10, 3)),
+            ("c2", datetime(2021, 10, 2)),
+            ("c1", datetime(2021, 10, 1)),
+        ]
+        with self.assertNumQueries(4):
+            created = self.package.add_commits(commits)
+        self.assertEqual(len(created), 3)
+        self.assertEqual(self.package.commit_cursor_hash, "c3")
+        self.assertEqual(self.package.commit_cursor_date, datetime(2021, 10, 3))
+
+        # The API returns the cursor commit again, plus a newer one
+        created = self.package.add_commits([("c4", datetime(2021, 10, 4))] + commits[:1])
+        self.assertEqual([commit.commit_hash for commit in created], ["c4"])
+        self.assertEqual(self.package.commit_set.count(), 4)
+        self.assertEqual(self.package.last_updated(), datetime(2021, 10, 4))
+
+    def test_add_commits_same_date(self):
+        self.package.add_commits([("c1", datetime(2021, 10, 1))])
+        created = self.package.add_commits([("c2", datetime(2021, 10, 1)), ("c1", datetime(2021, 10, 1))])
+        self.assertEqual([commit.commit_hash for commit in created], ["c2"])
+
+    def test_commits_since_falls_back_to_latest_commit(self):
+        self.assertIsNone(self.package.commits_since())
+        Commit.objects.create(package=self.package, commit_date=datetime(2021, 10, 1))
+        self.assertEqual(self.package.commits_since(), timezone.make_aware(datetime(2021, 10, 1)))
+        created = self.package.add_commits([("c1", datetime(2021, 10, 1)), ("c0", datetime(2021, 9, 1))])
+        self.assertEqual(created, [])
+
+    def test_add_commits_aware_dates(self):
+        self.package.add_commits([("c1", datetime(2021, 10, 1, 12, tzinfo=dt_timezone.utc))])
+        self.assertEqual(
+            self.package.commit_cursor_date,
+            timezone.make_naive(datetime(2021, 10, 1, 12, tzinfo=dt_timezone.utc)),
+        )
+
+
+class CommitIngestTests(TestCase):
+    def setUp(self):
+        self.package = data.make_package()
+
+    def commits(self):
+        return [
+            Commit(package=self.package, commit_hash="c1", commit_date=datetime(2021, 10, 1)),
+            Commit(package=self.package, commit_hash="c2", commit_date=datetime(2021, 10, 1)),
+            Commit(package=self.package, commit_date=datetime(2021, 9, 1)),
+        ]
+
+    def test_bulk_ingest(self):
+        with self.assertNumQueries(4):
+            Commit.objects.bulk_ingest(self.commits())
+        self.assertEqual(self.package.commit_set.count(), 3)
+
+    def test_bulk_ingest_skips_known_commits(self):
+        self.assertIsNone(self.package.last_updated())
+        Commit.objects.bulk_ingest(self.commits())
+        Commit.objects.bulk_ingest(self.commits() + [
+            Commit(package=self.package, commit_hash="c3", commit_date=datetime(2021, 10, 2)),
+        ])
+        self.assertEqual(self.package.commit_set.count(), 4)
+        self.assertEqual(self.package.last_updated(), datetime(2021, 10, 2))
+        self.assertEqual(Package.objects.get(pk=self.package.pk).last_commit_date, datetime(2021, 10, 2))
+
+
+class VersionIngestTests(TestCase):
+    def setUp(self):
+        self.package = data.make_package(pypi_url="django")
+        self.release = {
+            "info": {
+                "version": "3.2.1",
+                "license": "BSD-3-Clause",
+                "requires_python": ">=3.6",
+                "classifiers": [
+                    "Development Status :: 5 - Production/Stable",
+                    "License :: OSI Approved :: BSD License",
+                    "Programming Language :: Python :: 3",
+                ],
+            },
+            "releases": {
+                "3.1": [{"upload_time": "2020-08-04T08:07:00", "yanked": False, "requires_python": ">=3.6"}],
+                "3.2": [
+                    {"upload_time": "2021-04-06T09:33:00", "yanked": True, "requires_python": ">=3.6"},
+                    {"upload_time": "2021-04-06T09:32:00", "yanked": True, "requires_python": ">=3.6"},
+                ],
+                "3.2.1": [{"upload_time": "2021-05-04T08:47:00", "yanked": False, "requires_python": ">=3.6"}],
+            },
+            "urls": [{"upload_time": "2021-05-04T08:47:00", "downloads": -1}],
+        }
+
+    def test_bulk_ingest(self):
+        Version.objects.create(package=self.package, number="3.1", license="BSD")
+        releases = self.package.pypi_releases(self.release)
+        with self.assertNumQueries(6):
+            Version.objects.bulk_ingest(self.package, releases)
+
+        versions = {version.number: version for version in self.package.version_set.all()}
+        self.assertEqual(sorted(versions), ["3.1", "3.2", "3.2.1"])
+        self.assertEqual(versions["3.1"].license, "BSD")
+        self.assertEqual(versions["3.1"].upload_time, datetime(2020, 8, 4, 8, 7))
+        self.assertTrue(versions["3.2"].yanked)
+        self.assertEqual(versions["3.2"].upload_time, datetime(2021, 4, 6, 9, 32))
+        latest = versions["3.2.1"]
+        self.assertEqual(latest.license, "BSD-3-Clause")
+        self.assertEqual(latest.licenses, ["BSD License"])
+        self.assertEqual(latest.requires_python, ">=3.6")
+        self.assertEqual(latest.development_status, 5)
+        self.assertTrue(latest.supports_python3)
+
+        package = Package.objects.select_related("latest_version").get(pk=self.package.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(package.last_released(), latest)
+            self.assertEqual(package.pypi_version(), "3.2.1")
+            self.assertEqual(package.license_latest, "BSD-3-Clause")
+            self.assertEqual(package.latest_upload_time, datetime(2021, 5, 4, 8, 47))
+
+    def test_last_released_skips_yanked(self):
+        self.release["releases"]["3.2.1"][0]["yanked"] = True
+        Version.objects.bulk_ingest(self.package, self.package.pypi_releases(self.release))
+        self.assertEqual(self.package.last_released().number, "3.1")
+        Version.objects.bulk_ingest(self.package, self.package.pypi_releases(self.release))
+        self.assertEqual(self.package.version_set.count(), 3)
+
+
+class CommitHistogramTests(TestCase):
+    def setUp(self):
+        self.package = data.make_package()
+        self.this_week = week_start()
+
+    def test_histogram_follows_ingestion(self):
+        monday = datetime.combine(self.this_week, datetime.min.time())
+        Commit.objects.bulk_ingest([
+            Commit(package=self.package, commit_hash="c1", commit_date=monday + timedelta(hours=1)),
+            Commit(package=self.package, commit_hash="c2", commit_date=monday - timedelta(days=1)),
+            Commit(package=self.package, commit_hash="c3", commit_date=monday - timedelta(weeks=60)),
+        ])
+        expected = [0] * (WEEKS - 2) + [1, 1]
+        self.assertEqual(self.package.commits_over_52_listed(), expected)
+
+        package = Package.objects.get(pk=self.package.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(package.commits_over_52(), ",".join(map(str, expected)))
+
+    def test_roll_commit_weeks(self):
+        Package.objects.filter(pk=self.package.pk).update(
+            commit_weeks=list(range(WEEKS)),
+            commit_weeks_end=self.this_week - timedelta(weeks=2),
+        )
+        self.assertEqual(roll_commit_weeks(), 1)
+        self.package.refresh_from_db()
+        self.assertEqual(self.package.commit_weeks, list(range(2, WEEKS)) + [0, 0])
+        self.assertEqual(self.package.commit_weeks_end, self.this_week)
+        self.assertEqual(roll_commit_weeks(), 0)
@@ -0,0 +1,68 @@
+import xmlrpc.client
+
+from django.test import TestCase
+
+from core.test_utils.stub_server import StubServer
+from package.models import PyPISync
+from package.pypi_sync import changed_packages, changed_projects, save_serial
+from package.tests import data
+
+
+def rpc_response(value):
+    return 200, xmlrpc.client.dumps((value,), methodresponse=True, allow_none=True), {"Content-Type": "text/xml"}
+
+
+# Stand-in for the PyPI changelog: (name, version, timestamp, action, serial)
+EVENTS = [
+    ("Django-CMS", "3.9.0", 1633340000, "new release", 101),
+    ("django-cms", "3.9.0", 1633340001, "add py3 file django_cms-3.9.0-py3-none-any.whl", 102),
+    ("django-uni-form", None, 1633340002, "add Owner alice", 103),
+    ("requests", "2.26.0", 1633340003, "new release", 104),
+]
+
+
+class PyPISyncTest(TestCase):
+
+    def setUp(self):
+        self.cms = data.make_package(
+            title="django CMS", slug="django-cms",
+            repo_url="https://github.com/django-cms/django-cms",
+            pypi_url="http://pypi.python.org/pypi/django-cms",
+        )
+        self.uni_form = data.make_package(
+            title="django-uni-form", slug="django-uni-form",
+            repo_url="https://github.com/pydanny/django-uni-form",
+            pypi_url="django-uni-form",
+        )
+
+    def client(self, server):
+        return xmlrpc.client.ServerProxy(server.url + "/pypi", allow_none=True)
+
+    def test_changed_projects(self):
+        routes = {("POST", "/pypi"): [rpc_response(EVENTS), rpc_response([])]}
+        with StubServer(routes) as server:
+            names, serial = changed_projects(self.client(server), 100)
+        self.assertEqual(names, {"django-cms", "requests"})
+        self.assertEqual(serial, 104)
+        self.assertIn(b"changelog_since_serial", server.requests[0][3])
+        self.assertIn(b"<int>104</int>", server.requests[1][3])
+
+    def test_first_run_refreshes_every_package(self):
+        routes = {("POST", "/pypi"): rpc_response(100)}
+        with StubServer(routes) as server:
+            packages, serial = changed_packages(self.client(server))
+        self.assertEqual(set(packages), {self.cms, self.uni_form})
+        self.assertEqual(serial, 100)
+
+    def test_incremental_run(self):
+        save_serial(100)
+        routes = {("POST", "/pypi"): [rpc_response(EVENTS), rpc_response([])]}
+        with StubServer(routes) as server:
+            packages, serial = changed_packages(self.client(server))
+        self.assertEqual(list(packages), [self.cms])
+        self.assertEqual(serial, 104)
+
+    def test_save_serial(self):
+        save_serial(100)
+        save_serial(104)
+        self.assertEqual(list(PyPISync.objects.values_list("last_serial", flat=True)), [104])
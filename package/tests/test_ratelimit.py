@@ -0,0 +1,109 @@
+from time import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+
+from package.repos.ratelimit import RateLimitedAdapter, RateLimiter, get_ratelimiter
+
+
+def make_response(status_code=200, **headers):
+    response = Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    return response
+
+
+class RateLimiterTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.limiter = RateLimiter("api.example.com", reserve=2)
+
+    def test_unknown_budget_does_not_wait(self):
+        self.assertEqual(self.limiter.acquire(), 0)
+
+    def test_github_headers(self):
+        reset = int(time()) + 60
+        self.limiter.update_from_response(make_response(**{
+            "X-RateLimit-Remaining": "10",
+            "X-RateLimit-Reset": str(reset),
+        }))
+        self.assertEqual(cache.get(self.limiter.remaining_key), 10)
+        self.assertEqual(cache.get(self.limiter.reset_key), reset)
+
+    def test_gitlab_headers(self):
+        reset = int(time()) + 60
+        self.limiter.update_from_response(make_response(**{
+            "RateLimit-Remaining": "7",
+            "RateLimit-Reset": str(reset),
+        }))
+        self.assertEqual(cache.get(self.limiter.remaining_key), 7)
+
+    def test_retry_after(self):
+        self.limiter.update_from_response(make_response(429, **{"Retry-After": "30"}))
+        self.assertEqual(cache.get(self.limiter.remaining_key), 0)
+
+    def test_expired_reset_is_ignored(self):
+        self.limiter.refill(0, time() - 10)
+        self.assertIsNone(cache.get(self.limiter.remaining_key))
+
+    def test_acquire_takes_tokens(self):
+        self.limiter.refill(5, time() + 60)
+        self.assertEqual(self.limiter.acquire(), 0)
+        self.assertEqual(cache.get(self.limiter.remaining_key), 4)
+
+    def test_acquire_waits_for_reset(self):
+        reset = time() + 60
+        self.limiter.refill(2, reset)
+        with mock.patch("package.repos.ratelimit.sleep") as sleep:
+            delay = self.limiter.acquire()
+        self.assertAlmostEqual(delay, 60, delta=1)
+        sleep.assert_called_once_with(delay)
+
+
+class RateLimitedAdapterTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_send_goes_through_the_limiter(self):
+        request = PreparedRequest()
+        request.prepare(method="GET", url="https://api.example.org/repos/")
+        response = make_response(**{
+            "X-RateLimit-Remaining": "100",
+            "X-RateLimit-Reset": str(int(time()) + 60),
+        })
+        with mock.patch.object(HTTPAdapter, "send", return_value=response):
+            RateLimitedAdapter().send(request)
+            RateLimitedAdapter().send(request)
+        limiter = get_ratelimiter("api.example.org")
+        self.assertEqual(cache.get(limiter.remaining_key), 100)
+
+    def test_separate_resources(self):
+        reset = str(int(time()) + 60)
+        rest = PreparedRequest()
+        rest.prepare(method="GET", url="https://api.github.example/repos/django/django")
+        graphql = PreparedRequest()
+        graphql.prepare(method="POST", url="https://api.github.example/graphql")
+        responses = [
+            make_response(**{"X-RateLimit-Remaining": "4000", "X-RateLimit-Reset": reset, "X-RateLimit-Resource": "core"}),
+            make_response(**{"X-RateLimit-Remaining": "10", "X-RateLimit-Reset": reset, "X-RateLimit-Resource": "graphql"}),
+            make_response(**{"X-RateLimit-Remaining": "3999", "X-RateLimit-Reset": reset, "X-RateLimit-Resource": "core"}),
+        ]
+        with mock.patch.object(HTTPAdapter, "send", side_effect=responses):
+            RateLimitedAdapter().send(rest)
+            RateLimitedAdapter().send(graphql)
+            RateLimitedAdapter().send(rest)
+        core = get_ratelimiter("api.github.example", "core")
+        graphql_limiter = get_ratelimiter("api.github.example", "graphql")
+        self.assertEqual(cache.get(core.remaining_key), 3999)
+        self.assertEqual(cache.get(graphql_limiter.remaining_key), 10)
+
+        # Later GraphQL requests draw from the GraphQL budget only
+        with mock.patch.object(HTTPAdapter, "send", return_value=make_response()):
+            RateLimitedAdapter().send(graphql)
+        self.assertEqual(cache.get(graphql_limiter.remaining_key), 9)
+        self.assertEqual(cache.get(core.remaining_key), 3999)
@@ -1,10 +1,20 @@
 
+from datetime import datetime, timedelta
+import json
+import os
+from unittest import mock
+
 from django.test import TestCase
+from django.utils import timezone
 
+from core.test_utils.stub_server import StubServer
 from package.repos import get_repo_for_repo_url
-from package.repos.base_handler import BaseHandler
+from package.repos.base_handler import BaseHandler, mount_http_adapter
+from package.repos.conditional import NotModified
 from package.repos.unsupported import UnsupportedHandler
-from package.models import Package, Category
+from package.models import Commit, HTTPValidator, Package, Category
+
+TEST_DATA = os.path.join(os.path.dirname(__file__), "test_data")
 
 
 class BaseBase(TestCase):
@@ -230,6 +240,66 @@ class TestGithubRepo(TestBaseHandler):
     #     self.assertEqual(self.package.repo_watchers, 0)
     #     self.package.fetch_commits()
 
+    def test_fetch_commits_since_cursor(self):
+        from package.repos.github import repo_handler as github_handler
+
+        self.package.commit_cursor_hash = "c1"
+        self.package.commit_cursor_date = datetime(2021, 10, 1)
+        repo = mock.Mock()
+        repo.iter_commits.return_value = [
+            mock.Mock(sha="c2", commit=mock.Mock(committer={"date": "2021-10-04T09:16:12Z"})),
+        ]
+        with mock.patch.object(github_handler, "_get_repo", return_value=repo):
+            github_handler.fetch_commits(self.package)
+
+        repo.iter_commits.assert_called_once_with(since=timezone.make_aware(datetime(2021, 10, 1)))
+        self.assertEqual(list(Commit.objects.values_list("commit_hash", flat=True)), ["c2"])
+        self.assertEqual(Package.objects.get(pk=self.package.pk).commit_cursor_hash, "c2")
+
+    def test_fetch_metadata_then_commits(self):
+        from github3 import GitHubEnterprise
+        from package.repos.github import GitHubHandler
+
+        handler = GitHubHandler()
+        path = "/api/v3/repos/django/django"
+        etag = {"ETag": '"a8f3"'}
+        with StubServer({}) as server:
+            repository = {
+                "id": 4164482,
+                "name": "django",
+                "full_name": "django/django",
+                "owner": {"login": "django", "id": 27804, "url": f"{server.url}/api/v3/users/django"},
+                "url": f"{server.url}{path}",
+                "description": "The Web framework for perfectionists with deadlines.",
+                "watchers": 63012,
+                "forks": 26877,
+            }
+            server.routes.update({
+                ("GET", path): [(200, repository, etag), (200, repository, etag), (304, "")],
+                ("GET", f"{path}/contributors"): [(200, [{"login": "jacob", "id": 21}], etag)],
+                ("GET", f"{path}/commits"): [(200, [{
+                    "sha": "c1",
+                    "url": f"{server.url}{path}/commits/c1",
+                    "commit": {"committer": {"name": "Jacob", "date": "2021-10-04T09:16:12Z"}, "message": "Fix"},
+                }], etag)],
+            })
+            handler.github = GitHubEnterprise(server.url)
+            mount_http_adapter(handler.github._session)
+
+            handler.fetch_metadata(self.package)
+            handler.fetch_commits(self.package)
+            # The metadata itself is still revalidated
+            with self.assertRaises(NotModified):
+                handler.fetch_metadata(self.package)
+
+        self.assertEqual(self.package.participants, "jacob")
+        self.assertEqual(list(Commit.objects.values_list("commit_hash", flat=True)), ["c1"])
+        lookups = [headers for method, request_path, headers, body in server.requests if request_path == path]
+        self.assertEqual(len(lookups), 3)
+        self.assertNotIn("If-None-Match", lookups[1])
+        self.assertEqual(lookups[2]["If-None-Match"], '"a8f3"')
+        self.assertTrue(HTTPValidator.objects.filter(url=f"{server.url}{path}").exists())
+
 class TestGitlabRepo(TestBaseHandler):
     def setUp(self):
         super().setUp()
@@ -250,3 +320,79 @@ class TestRepos(BaseBase):
         self.assertEqual(g.url, "https://github.com")
         self.assertTrue("github" in supported_repos())
         self.assertRaises(ImportError, lambda: get_repo("xyzzy"))
+
+
+class TestGithubGraphQL(BaseBase):
+    def setUp(self):
+        super().setUp()
+        self.django = Package.objects.create(
+            title="Django",
+            slug="django",
+            repo_url="https://github.com/django/django",
+            category=self.category
+        )
+        self.missing = Package.objects.create(
+            title="Missing",
+            slug="missing",
+            repo_url="https://github.com/ghost/missing",
+            category=self.category
+        )
+        with open(os.path.join(TEST_DATA, "github", "graphql_repositories.json")) as f:
+            self.recorded = json.load(f)
+
+    def fetch(self, response):
+        from package.repos.github import repo_handler as github_handler
+
+        with StubServer({("POST", "/graphql"): response}) as server:
+            with self.settings(GITHUB_TOKEN="secret", GITHUB_GRAPHQL_URL=f"{server.url}/graphql"):
+                with mock.patch.object(github_handler, "fetch_metadata") as fetch_metadata, \
+                        mock.patch.object(github_handler, "fetch_contributors") as fetch_contributors:
+                    latest_commits = github_handler.fetch_metadata_batch([self.django, self.missing])
+        self.fetch_contributors = fetch_contributors
+        return server, fetch_metadata, latest_commits
+
+    def test_fetch_metadata_batch(self):
+        server, fetch_metadata, latest_commits = self.fetch((200, self.recorded))
+
+        self.assertEqual(len(server.requests), 1)
+        method, path, headers, body = server.requests[0]
+        self.assertEqual(headers["Authorization"], "bearer secret")
+        self.assertEqual(json.loads(body)["variables"], {
+            "owner0": "django", "name0": "django",
+            "owner1": "ghost", "name1": "missing",
+        })
+
+        self.assertEqual(self.django.repo_watchers, 63012)
+        self.assertEqual(self.django.repo_forks, 26877)
+        self.assertEqual(self.django.repo_description, "The Web framework for perfectionists with deadlines.")
+        self.assertIn(self.django.pk, latest_commits)
+        self.assertNotIn(self.missing.pk, latest_commits)
+
+        # the repository missing from the GraphQL response goes through REST
+        fetch_metadata.assert_called_once_with(self.missing)
+        # contributors are not in GraphQL, and were never fetched
+        self.fetch_contributors.assert_called_once_with(self.django)
+
+    def test_fetch_metadata_batch_recent_contributors(self):
+        self.django.participants_fetched = timezone.now() - timedelta(days=1)
+        self.fetch((200, self.recorded))
+        self.fetch_contributors.assert_not_called()
+
+    def test_fetch_metadata_batch_contributors_cap(self):
+        with self.settings(GITHUB_CONTRIBUTORS_PER_BATCH=0):
+            self.fetch((200, self.recorded))
+        self.fetch_contributors.assert_not_called()
+        self.assertIsNone(self.django.participants_fetched)
+
+    def test_batch_size(self):
+        from package.repos.github import repo_handler as github_handler
+
+        with self.settings(GITHUB_TOKEN="secret", GITHUB_GRAPHQL_BATCH_SIZE=50):
+            self.assertEqual(github_handler.batch_size, 50)
+        with self.settings(GITHUB_TOKEN=None):
+            self.assertEqual(github_handler.batch_size, 1)
+
+    def test_fetch_metadata_batch_error(self):
+        server, fetch_metadata, latest_commits = self.fetch((502, "Bad Gateway"))
+        self.assertEqual(latest_commits, {})
+        self.assertEqual(fetch_metadata.call_count, 2)
@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from package.models import Commit, Package, Version
+from package.scheduling import due_packages, refresh_interval, schedule_packages, with_activity
+from package.tests import data
+
+MIN_INTERVAL = 60 * 15
+MAX_INTERVAL = 60 * 60 * 24 * 7
+
+
+@override_settings(PACKAGE_REFRESH_MIN_INTERVAL=MIN_INTERVAL, PACKAGE_REFRESH_MAX_INTERVAL=MAX_INTERVAL)
+class RefreshIntervalTest(TestCase):
+
+    def test_inactive_package(self):
+        self.assertEqual(refresh_interval(0, 0, 5000), timedelta(seconds=MAX_INTERVAL))
+
+    def test_hot_package(self):
+        self.assertEqual(refresh_interval(2000, 12, 5000), timedelta(seconds=MIN_INTERVAL))
+
+    def test_activity_and_popularity_shorten_interval(self):
+        quiet = refresh_interval(3, 1, 10)
+        self.assertLess(refresh_interval(30, 1, 10), quiet)
+        self.assertLess(refresh_interval(3, 6, 10), quiet)
+        self.assertLess(refresh_interval(3, 1, 1000), quiet)
+
+
+@override_settings(PACKAGE_REFRESH_MIN_INTERVAL=MIN_INTERVAL, PACKAGE_REFRESH_MAX_INTERVAL=MAX_INTERVAL)
+class SchedulePackagesTest(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.dead = data.make_package(
+            title="Dead", slug="dead", repo_url="https://github.com/example/dead", last_fetched=self.now,
+        )
+        self.hot = data.make_package(
+            title="Hot", slug="hot", repo_url="https://github.com/example/hot",
+            last_fetched=self.now, repo_watchers=5000,
+        )
+        Commit.objects.bulk_create([
+            Commit(package=self.hot, commit_hash=f"{index:x}", commit_date=self.now - timedelta(hours=index))
+            for index in range(200)
+        ])
+
+    def test_schedule_packages(self):
+        self.assertEqual(schedule_packages([self.dead, self.hot], now=self.now), 2)
+        self.dead.refresh_from_db()
+        self.hot.refresh_from_db()
+        self.assertEqual(self.dead.next_refresh, self.now + timedelta(seconds=MAX_INTERVAL))
+        self.assertEqual(self.hot.next_refresh, self.now + timedelta(seconds=MIN_INTERVAL))
+
+    def test_with_activity(self):
+        self.hot.usage.add(User.objects.create_user("one"), User.objects.create_user("two"))
+        Version.objects.create(package=self.hot, number="1.0", upload_time=self.now - timedelta(days=10))
+        Version.objects.create(package=self.hot, number="0.9", upload_time=self.now - timedelta(days=400))
+        packages = with_activity(Package.objects.order_by("title"), self.now)
+        self.assertEqual(
+            [(package.recent_commits, package.recent_releases, package.usage_count) for package in packages],
+            [(0, 0, 0), (200, 1, 2)],
+        )
+
+    def test_failed_refresh_is_retried_after_min_interval(self):
+        Package.objects.filter(pk=self.hot.pk).update(last_fetched=self.now - timedelta(days=30))
+        schedule_packages([self.hot], now=self.now)
+        self.hot.refresh_from_db()
+        self.assertEqual(self.hot.next_refresh, self.now + timedelta(seconds=MIN_INTERVAL))
+
+    def test_due_packages(self):
+        Package.objects.filter(pk=self.dead.pk).update(next_refresh=self.now - timedelta(days=1))
+        Package.objects.filter(pk=self.hot.pk).update(next_refresh=self.now - timedelta(minutes=5))
+        self.assertEqual(list(due_packages(self.now)), [self.dead, self.hot])
+
+        Package.objects.filter(pk=self.hot.pk).update(next_refresh=None)
+        self.assertEqual(list(due_packages(self.now)), [self.hot, self.dead])
+
+        schedule_packages([self.dead, self.hot], now=self.now)
+        self.assertEqual(list(due_packages(self.now)), [])
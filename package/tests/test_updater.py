@@ -0,0 +1,133 @@
+from datetime import datetime
+import threading
+import time
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from package.models import Commit, Package
+from package.repos.base_handler import BaseHandler, get_http_adapter
+from package.repos.conditional import NotModified
+from package.tests import data
+from package.updater import update_packages
+
+
+class SlowHandler(BaseHandler):
+    title = "Slow"
+    url = "https://slow.example.com"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fetched = []
+
+    def fetch_metadata(self, package):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(0.05)
+        package.repo_watchers = 42
+        with self.lock:
+            self.in_flight -= 1
+        return package
+
+    def fetch_commits(self, package):
+        with self.lock:
+            self.fetched.append(package.slug)
+        return package
+
+
+class BrokenHandler(SlowHandler):
+
+    def fetch_metadata(self, package):
+        raise ValueError("boom")
+
+
+class UpdaterTest(TransactionTestCase):
+
+    def setUp(self):
+        for index in range(6):
+            data.make_package(
+                title=f"Package {index}",
+                slug=f"package-{index}",
+                repo_url=f"https://slow.example.com/user/package-{index}",
+            )
+
+    def update(self, handler, **kwargs):
+        with mock.patch.object(Package, "repo", new_callable=mock.PropertyMock, return_value=handler):
+            return update_packages(Package.objects.all(), **kwargs)
+
+    def test_updates_all_packages(self):
+        handler = SlowHandler()
+        updated = self.update(handler, workers=4, host_concurrency=4)
+        self.assertEqual(updated, 6)
+        self.assertEqual(sorted(handler.fetched), [f"package-{index}" for index in range(6)])
+        self.assertEqual(Package.objects.filter(repo_watchers=42).count(), 6)
+        self.assertGreater(handler.max_in_flight, 1)
+
+    def test_host_concurrency(self):
+        handler = SlowHandler()
+        self.update(handler, workers=6, host_concurrency=2)
+        self.assertLessEqual(handler.max_in_flight, 2)
+
+    def test_connection_pool_follows_workers(self):
+        workers = get_http_adapter()._pool_maxsize + 8
+        self.update(SlowHandler(), workers=workers, host_concurrency=2)
+        self.assertEqual(get_http_adapter()._pool_maxsize, workers)
+        self.assertEqual(get_http_adapter().poolmanager.connection_pool_kw["maxsize"], workers)
+
+    def test_failures_are_isolated(self):
+        handler = BrokenHandler()
+        updated = self.update(handler, workers=2, host_concurrency=2)
+        self.assertEqual(updated, 0)
+        self.assertEqual(handler.fetched, [])
+
+
+class BatchHandler(SlowHandler):
+    batch_size = 4
+
+    def fetch_metadata_batch(self, packages):
+        with self.lock:
+            self.batches.append([package.slug for package in packages])
+        return {package.pk: self.latest_commit for package in packages}
+
+
+class BatchUpdaterTest(UpdaterTest):
+
+    def test_batched_metadata_skips_unchanged_commits(self):
+        handler = BatchHandler()
+        handler.batches = []
+        handler.latest_commit = datetime(2012, 1, 1)
+        Commit.objects.create(package=Package.objects.get(slug="package-0"), commit_date=datetime(2012, 1, 1))
+
+        updated = self.update(handler, workers=4, host_concurrency=4)
+        self.assertEqual(updated, 6)
+        self.assertEqual(sorted(len(batch) for batch in handler.batches), [2, 4])
+        # package-0 already has the latest commit reported by the batch
+        self.assertEqual(sorted(handler.fetched), [f"package-{index}" for index in range(1, 6)])
+
+    def test_no_batch(self):
+        handler = BatchHandler()
+        handler.batches = []
+        self.update(handler, workers=4, host_concurrency=4, batch=False)
+        self.assertEqual(handler.batches, [])
+        self.assertEqual(len(handler.fetched), 6)
+
+
+class NotModifiedHandler(SlowHandler):
+
+    def fetch_metadata(self, package):
+        raise NotModified(mock.Mock(url=package.repo_url))
+
+
+class NotModifiedUpdaterTest(UpdaterTest):
+
+    def test_unchanged_packages_are_not_saved(self):
+        handler = NotModifiedHandler()
+        Package.objects.update(repo_watchers=7)
+        with mock.patch.object(Package, "save") as save:
+            updated = self.update(handler, workers=2, host_concurrency=2)
+        self.assertEqual(updated, 0)
+        save.assert_not_called()
+        self.assertEqual(handler.fetched, [])
@@ -1,6 +1,6 @@
 from django.test import TestCase
 
-from package.utils import uniquer, normalize_license
+from package.utils import uniquer, normalize_license, version_sort_key
 
 
 class UtilsTest(TestCase):
@@ -17,3 +17,14 @@ class UtilsTest(TestCase):
                 "License :: OSI Approved :: MIT License")
         self.assertEqual(normalize_license("Pow" * 80), "Custom")
         self.assertEqual(normalize_license("MIT"), "MIT")
+
+    def test_version_sort_key(self):
+        numbers = [
+            "0.9", "1.0.dev1", "1.0a1", "1.0a2.dev3", "1.0a2", "1.0b1", "1.0rc1",
+            "1.0", "1.0.post1.dev1", "1.0.post1", "1.0.1", "1.10", "2!0.1",
+        ]
+        keys = [version_sort_key(number)[0] for number in numbers]
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(version_sort_key("1.0.0"), version_sort_key("1.0"))
+        self.assertEqual(version_sort_key("1.0rc1"), (keys[6], True))
+        self.assertEqual(version_sort_key("not a version"), ("", False))
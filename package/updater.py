@@ -0,0 +1,168 @@
+"""
+Concurrent update engine used by the package_updater command.
+
+Packages are pulled off a shared queue by a fixed number of workers. Each
+repo host gets its own semaphore so one provider is never hit by more than
+PACKAGE_UPDATER_HOST_CONCURRENCY requests at a time, and all handlers share a
+single HTTP connection pool (see package.repos.base_handler).
+
+Handlers that can fetch metadata for many repositories in one API call
+(GitHub's GraphQL API) are run in batches first. Their packages then only
+have their commits fetched when the batch reported a commit newer than the
+latest one we have.
+
+Repo APIs answering 304 Not Modified (see package.repos.conditional) leave
+the package untouched: nothing is parsed and only last_fetched is written.
+
+Workers pull packages from a priority queue, the most overdue ones first
+(see package.scheduling).
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.invalidation import adeferred_invalidation
+from package.repos.base_handler import run_sync, size_http_adapter
+from package.repos.conditional import NotModified
+from package.scheduling import refresh_priority
+from package.signals import signal_fetch_latest_metadata
+
+logger = logging.getLogger(__name__)
+
+
+class HostLimiter:
+    """ Hands out one semaphore per repo host. """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._semaphores = {}
+
+    def __call__(self, handler):
+        host = urlparse(handler.url).netloc or handler.title
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.limit)
+        return self._semaphores[host]
+
+
+def save_metadata(package):
+    signal_fetch_latest_metadata.send(sender=package)
+    package.last_fetched = timezone.now()
+    package.save()
+
+
+def mark_fetched(package):
+    package.last_fetched = timezone.now()
+    type(package).objects.filter(pk=package.pk).update(last_fetched=package.last_fetched)
+
+
+def has_new_commits(package, latest_commit):
+    if latest_commit is None:
+        return True
+    last_updated = package.last_updated()
+    return last_updated is None or latest_commit > last_updated
+
+
+async def prefetch_metadata(packages, limiter):
+    """ Runs fetch_metadata_batch() for the handlers that support batching.
+
+        return: dict mapping package.pk to the latest commit date reported
+        by the handler (None when unknown), for every package whose metadata
+        was fetched
+    """
+    groups = {}
+    for package in packages:
+        handler = package.repo
+        if handler.batch_size > 1:
+            groups.setdefault(handler, []).append(package)
+
+    chunks = []
+    for handler, group in groups.items():
+        for start in range(0, len(group), handler.batch_size):
+            chunks.append((handler, group[start:start + handler.batch_size]))
+
+    async def fetch(handler, chunk):
+        try:
+            async with adeferred_invalidation(), limiter(handler):
+                latest_commits = await run_sync(handler.fetch_metadata_batch, chunk)
+        except Exception:
+            logger.error(f"Unable to batch update {len(chunk)} {handler} packages", exc_info=True)
+            return {}
+        return {package.pk: latest_commits.get(package.pk) for package in chunk}
+
+    prefetched = {}
+    for result in await asyncio.gather(*(fetch(handler, chunk) for handler, chunk in chunks)):
+        prefetched.update(result)
+    return prefetched
+
+
+async def update_package(package, limiter, prefetched=None):
+    """ Refreshes the repo metadata and commits of a single package.
+
+        return: True if the package was updated, False if it failed or
+        had not changed.
+    """
+    prefetched = prefetched or {}
+    handler = package.repo
+    try:
+        async with limiter(handler):
+            if package.pk in prefetched:
+                fetch_commits = await run_sync(has_new_commits, package, prefetched[package.pk])
+            else:
+                await handler.afetch_metadata(package)
+                fetch_commits = True
+            await run_sync(save_metadata, package)
+            if fetch_commits:
+                try:
+                    await handler.afetch_commits(package)
+                except NotModified:
+                    pass
+    except NotModified:
+        logger.debug(f"{package.title} has not changed")
+        await run_sync(mark_fetched, package)
+        return False
+    except Exception:
+        logger.error(f"Unable to update {package.title}", exc_info=True)
+        return False
+    return True
+
+
+async def _update_packages(packages, workers, host_concurrency, batch):
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=workers))
+
+    limiter = HostLimiter(host_concurrency)
+    prefetched = await prefetch_metadata(packages, limiter) if batch else {}
+
+    queue = asyncio.PriorityQueue()
+    for package in packages:
+        queue.put_nowait((refresh_priority(package), package))
+
+    updated = 0
+
+    async def worker():
+        nonlocal updated
+        while not queue.empty():
+            _, package = queue.get_nowait()
+            # Flushed once the package is saved, not at the end of the run
+            async with adeferred_invalidation():
+                if await update_package(package, limiter, prefetched):
+                    updated += 1
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return updated
+
+
+def update_packages(packages, workers=None, host_concurrency=None, batch=True):
+    """ Updates an iterable of packages concurrently.
+
+        return: number of packages updated successfully
+    """
+    workers = workers or settings.PACKAGE_UPDATER_WORKERS
+    host_concurrency = host_concurrency or settings.PACKAGE_UPDATER_HOST_CONCURRENCY
+    size_http_adapter(workers)
+    # Querysets must be evaluated before entering the event loop
+    return asyncio.run(_update_packages(list(packages), workers, host_concurrency, batch))
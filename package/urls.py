@@ -14,6 +14,7 @@ from package.views import (
                             package_list,
                             package_detail,
                             post_data,
+                            refresh_status,
                             edit_documentation,
                             github_webhook
                             )
@@ -48,6 +49,10 @@ urlpatterns = [
         name="post_package_data",
     ),
 
+    path('<slug:slug>/refresh-status/', view=refresh_status,
+        name="package_refresh_status",
+    ),
+
     path('<slug:slug>/example/add/', view=add_example,
         name="add_example",
     ),
@@ -1,5 +1,5 @@
 from trove_classifiers import classifiers
-from distutils.version import LooseVersion as versioner
+from packaging.version import InvalidVersion, Version
 
 from requests.compat import quote
 
@@ -34,7 +34,7 @@ def uniquer(seq, idfun=None):
 
 def get_version(package):
 
-    versions = package.version_set.exclude(upload_time=None)
+    versions = package.version_set.exclude(upload_time=None).exclude(yanked=True)
     try:
         return versions.latest()
     except models.ObjectDoesNotExist:
@@ -42,18 +42,50 @@ def get_version(package):
 
 
 def get_pypi_version(package):
-    versions = []
-    for v_str in package.version_set.values_list('number', flat=True):
-        v = versioner(v_str)
-        comparable = True
-        for elem in v.version:
-            if isinstance(elem, str):
-                comparable = False
-        if comparable:
-            versions.append(v)
-    if versions:
-        return str(sorted(versions)[-1])
-    return ''
+    """ Highest final release number of package, or its highest pre-release
+    when it has no final release. """
+    versions = package.version_set.exclude(sort_key="").order_by("prerelease", "-sort_key")
+    return versions.values_list("number", flat=True).first() or ""
+
+
+def _sortable_number(number):
+    # Length-prefixed so that 10 sorts after 9
+    digits = str(number)
+    return f"{len(digits):02d}{digits}"
+
+
+def version_sort_key(number):
+    """ Turns a version number into a string that sorts like PEP 440
+    versions do, compared byte by byte (the C collation).
+
+        return: (sort key, is pre-release) tuple; the key is empty for
+        numbers that are not valid PEP 440 versions
+    """
+    try:
+        version = Version(number)
+    except InvalidVersion:
+        return "", False
+
+    release = list(version.release)
+    # 1.0 and 1.0.0 are the same version
+    while len(release) > 1 and release[-1] == 0:
+        release.pop()
+    key = _sortable_number(version.epoch)
+    key += "".join(_sortable_number(part) for part in release) + "."
+
+    # Every field below starts with a marker character: "!" sorts before
+    # "a", "b", "c", "d" and "p", which sort before "~"
+    if version.pre is not None:
+        letter, pre_number = version.pre
+        key += {"a": "a", "b": "b", "rc": "c"}[letter] + _sortable_number(pre_number)
+    elif version.dev is not None and version.post is None:
+        # 1.0.dev1 comes before 1.0a1
+        key += "!"
+    else:
+        key += "~"
+    key += "p" + _sortable_number(version.post) if version.post is not None else "!"
+    key += "d" + _sortable_number(version.dev) if version.dev is not None else "~"
+    return key, version.is_prerelease
 
 
 def normalize_license(license):
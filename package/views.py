@@ -1,15 +1,13 @@
 import importlib
 import json
 
-from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.cache import cache
 from django.urls import reverse
-from django.db.models import Count, Q
-from django.http import HttpResponseRedirect, HttpResponse, HttpResponseForbidden
+from django.db.models import Count
+from django.http import HttpResponseRedirect, HttpResponse, HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import PermissionDenied
 from django.views.decorators.http import require_POST
@@ -18,8 +16,10 @@ from django.views.decorators.http import require_POST
 from grid.models import Grid
 from homepage.models import Dpotw, Gotw
 from package.forms import PackageForm, PackageExampleForm, DocumentationForm
+from package.jobs import enqueue_refresh, get_status
 from package.models import Category, Package, PackageExample
 from package.repos import get_all_repos
+from searchv2 import autocomplete
 
 
 def repo_data_for_js():
@@ -89,10 +89,10 @@ def edit_package(request, slug, template_name="package/package_form.html"):
 def update_package(request, slug):
 
     package = get_object_or_404(Package, slug=slug)
-    package.fetch_metadata()
-    package.fetch_commits()
-    package.last_fetched = timezone.now()
-    messages.add_message(request, messages.INFO, 'Package updated successfully')
+    if enqueue_refresh(package):
+        messages.add_message(request, messages.INFO, 'Package refresh queued')
+    else:
+        messages.add_message(request, messages.INFO, 'Package refresh already in progress')
 
     return HttpResponseRedirect(reverse("package", kwargs={"slug": package.slug}))
 
@@ -166,10 +166,8 @@ def package_autocomplete(request):
     """
     Provides Package matching based on matches of the beginning
     """
-    titles = []
     q = request.GET.get("q", "")
-    if q:
-        titles = (x.title for x in Package.objects.filter(title__istartswith=q))
+    titles = (title for title, pk in autocomplete.search(autocomplete.PACKAGE, q))
 
     response = HttpResponse("\n".join(titles))
 
@@ -179,7 +177,7 @@ def package_autocomplete(request):
 
 def category(request, slug, template_name="package/category.html"):
     category = get_object_or_404(Category, slug=slug)
-    packages = category.package_set.select_related().annotate(usage_count=Count("usage")).order_by("-repo_watchers", "title")
+    packages = category.package_set.select_related("category", "latest_version").annotate(usage_count=Count("usage")).order_by("-repo_watchers", "title")
     return render(request, template_name, {
         "category": category,
         "packages": packages,
@@ -191,15 +189,8 @@ def ajax_package_list(request, template_name="package/ajax_package_list.html"):
     q = request.GET.get("q", "")
     packages = []
     if q:
-        _dash = f"{settings.PACKAGINATOR_SEARCH_PREFIX}-{q}"
-        _space = f"{settings.PACKAGINATOR_SEARCH_PREFIX} {q}"
-        _underscore = f'{settings.PACKAGINATOR_SEARCH_PREFIX}_{q}'
-        packages = Package.objects.filter(
-                        Q(title__istartswith=q) |
-                        Q(title__istartswith=_dash) |
-                        Q(title__istartswith=_space) |
-                        Q(title__istartswith=_underscore)
-                    )
+        pks = [pk for title, pk in autocomplete.search(autocomplete.PACKAGE, q)]
+        packages = Package.objects.filter(pk__in=pks)
 
     packages_already_added_list = []
     grid_slug = request.GET.get("grid", "")
@@ -351,7 +342,8 @@ def package_detail(request, slug, template_name="package/package.html"):
                 pypi_no_release=pypi_no_release,
                 warnings=warnings,
                 latest_version=package.last_released(),
-                repo=package.repo
+                repo=package.repo,
+                refresh_status=get_status(package),
             )
         )
 
@@ -376,14 +368,20 @@ def post_data(request, slug):
         # except Exception as e:
         #     print e
     package = get_object_or_404(Package, slug=slug)
-    package.fetch_pypi_data()
-    package.repo.fetch_metadata(package)
-    package.repo.fetch_commits(package)
-    package.last_fetched = timezone.now()
-    package.save()
+    enqueue_refresh(package)
     return HttpResponseRedirect(reverse("package", kwargs={"slug": package.slug}))
 
 
+def refresh_status(request, slug):
+    package = get_object_or_404(Package, slug=slug)
+    status = get_status(package) or {}
+    return JsonResponse({
+        "status": status.get("status"),
+        "updated": status.get("updated"),
+        "last_fetched": package.last_fetched,
+    })
+
+
 @login_required
 def edit_documentation(request, slug, template_name="package/documentation_form.html"):
     package = get_object_or_404(Package, slug=slug)
@@ -416,7 +414,5 @@ def github_webhook(request):
             return HttpResponse("Service Test pass")
 
         package = get_object_or_404(Package, repo_url=repo_url)
-        package.repo.fetch_commits(package)
-        package.last_fetched = timezone.now()
-        package.save()
+        enqueue_refresh(package)
     return HttpResponse()
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from searchv2.models import SearchV2
+from searchv2.models import SearchBuild, SearchV2
 
 
 @admin.register(SearchV2)
@@ -16,3 +16,9 @@ class SearchV2Admin(admin.ModelAdmin):
     list_filter = ["item_type", "category"]
     ordering = ["-weight"]
     search_fields = ["title", "title_no_prefix", "category"]
+
+
+@admin.register(SearchBuild)
+class SearchBuildAdmin(admin.ModelAdmin):
+    list_display = ["pk", "full", "started", "finished", "items"]
+    list_filter = ["full"]
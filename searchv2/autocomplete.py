@@ -0,0 +1,122 @@
+"""
+In-memory prefix index for the autocomplete views.
+
+Every process keeps the lowercased titles and slugs of all packages and
+grids, with and without PACKAGINATOR_SEARCH_PREFIX, in sorted arrays and
+answers prefix queries by bisecting them instead of running istartswith
+queries on every keystroke.
+
+Creating or deleting a package or grid, or changing its title or slug,
+deletes INDEX_VERSION_KEY from the cache (deferred like the other invalidations, see core.invalidation). Before
+a lookup the process compares the version in the cache with the one its
+index was built at, and rebuilds the index when they differ.
+"""
+import bisect
+import logging
+import threading
+import uuid
+
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from core.invalidation import invalidate
+from searchv2.utils import remove_prefix
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION_KEY = "autocomplete_index_version"
+
+PACKAGE = "package"
+GRID = "grid"
+
+
+class PrefixIndex:
+    """ Sorted (key, title, pk) entries of one kind of item. """
+
+    def __init__(self, items):
+        """ items: iterable of (pk, title, slug) """
+        entries = set()
+        for pk, title, slug in items:
+            for key in {title.lower(), slug.lower(), remove_prefix(title), remove_prefix(slug)}:
+                entries.add((key, title, pk))
+        self.entries = sorted(entries)
+        self.keys = [entry[0] for entry in self.entries]
+
+    def search(self, prefix, limit=None):
+        """ return: list of (title, pk) of the items with a key starting with
+        prefix, ordered by title """
+        prefix = prefix.lower()
+        matches = {}
+        for i in range(bisect.bisect_left(self.keys, prefix), len(self.keys)):
+            key, title, pk = self.entries[i]
+            if not key.startswith(prefix):
+                break
+            matches[pk] = title
+        results = sorted((title, pk) for pk, title in matches.items())
+        if limit:
+            return results[:limit]
+        return results
+
+
+class AutocompleteIndex:
+    """ The prefix indexes of this process, reloaded when the version in the
+    cache changes. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.indexes = {}
+
+    def current_version(self):
+        version = cache.get(INDEX_VERSION_KEY)
+        if version is None:
+            cache.add(INDEX_VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(INDEX_VERSION_KEY)
+        return version
+
+    def load(self, version):
+        from grid.models import Grid  # Added here to avoid circular imports
+        from package.models import Package
+
+        self.indexes = {
+            PACKAGE: PrefixIndex(Package.objects.values_list("pk", "title", "slug")),
+            GRID: PrefixIndex(Grid.objects.values_list("pk", "title", "slug")),
+        }
+        self.version = version
+
+    def get(self, kind):
+        version = self.current_version()
+        if version != self.version:
+            with self.lock:
+                if version != self.version:
+                    self.load(version)
+        return self.indexes[kind]
+
+
+_index = AutocompleteIndex()
+
+
+def search(kind, prefix, limit=None):
+    """ return: list of (title, pk) of the packages or grids (kind) with a
+    title or slug starting with prefix, ordered by title """
+    if not prefix:
+        return []
+    return _index.get(kind).search(prefix, limit)
+
+
+def invalidate_autocomplete():
+    invalidate(INDEX_VERSION_KEY)
+
+
+def indexed_values(instance):
+    """ return: the title and slug of a package or grid as they were loaded
+    or last set, None for deferred fields """
+    return instance.__dict__.get("title"), instance.__dict__.get("slug")
+
+
+def warm():
+    """ Loads the index ahead of the first request. """
+    try:
+        _index.get(PACKAGE)
+    except DatabaseError:
+        logger.warning("Unable to load the autocomplete index", exc_info=True)
@@ -0,0 +1,215 @@
+"""
+Relevance and latency benchmark of the search backends.
+
+generate_corpus() fills SearchV2 with a synthetic catalog: a few well-known
+anchor packages that the judgements in searchv2/benchmark_data refer to,
+drowned in random packages and grids made from a common vocabulary.
+run_benchmark() replays a query log against each backend and reports the
+p50/p95/p99 latency, the database queries per search, and the MRR and
+NDCG@10 of the results against the judgements.
+
+The searchv2_benchmark command runs it against a throwaway test database,
+an in-memory cache and a temporary BM25 index file; nothing here touches the
+network.
+"""
+from datetime import timedelta
+import json
+import math
+import os
+import random
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.text import slugify
+
+from searchv2 import bm25
+from searchv2.cache import search_results, set_generation
+from searchv2.models import SearchBuild, SearchV2
+from searchv2.query import search_queryset, update_search_vectors
+from searchv2.utils import remove_prefix, clean_title
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "benchmark_data")
+QUERIES_FILE = os.path.join(DATA_DIR, "queries.txt")
+JUDGEMENTS_FILE = os.path.join(DATA_DIR, "judgements.json")
+
+ANCHORS = [
+    ("Django REST framework", "django-rest-framework", "Web APIs for Django, made easy.", 140),
+    ("django-celery-beat", "django-celery-beat", "Database-backed periodic tasks for Celery.", 110),
+    ("Django Debug Toolbar", "django-debug-toolbar", "A configurable set of panels that display debug information about the current request.", 120),
+    ("django-allauth", "django-allauth", "Integrated set of Django applications addressing authentication, registration and account management.", 120),
+    ("django-crispy-forms", "django-crispy-forms", "The best way to have DRY Django forms.", 115),
+    ("django-filter", "django-filter", "A generic system for filtering Django QuerySets based on user selections.", 110),
+    ("django-storages", "django-storages", "Support for many storage backends in Django, such as Amazon S3.", 105),
+    ("django-haystack", "django-haystack", "Modular search for Django.", 90),
+    ("Wagtail", "wagtail", "A Django content management system focused on flexibility and user experience.", 120),
+    ("django CMS", "django-cms", "The easy-to-use and developer-friendly enterprise CMS powered by Django.", 115),
+]
+
+VOCABULARY = [
+    "admin", "ajax", "analytics", "api", "audit", "auth", "backup", "blog",
+    "cache", "calendar", "captcha", "cart", "celery", "chart", "comments",
+    "config", "cors", "cron", "csv", "dashboard", "debug", "email", "export",
+    "fields", "files", "filter", "forms", "geo", "graphql", "health", "history",
+    "i18n", "images", "import", "json", "jwt", "logging", "mail", "markdown",
+    "media", "menu", "migrations", "models", "money", "notifications", "oauth",
+    "pages", "payments", "permissions", "polls", "queue", "rest", "search",
+    "secrets", "seo", "settings", "sitemap", "social", "storage", "tables",
+    "tags", "tasks", "templates", "tenant", "testing", "themes", "translation",
+    "upload", "users", "utils", "video", "views", "widgets", "wiki",
+]
+
+CATEGORIES = ["App", "Framework", "Other", "Project"]
+
+PERCENTILES = (50, 95, 99)
+
+
+def corpus_row(item_type, title, slug, description, weight, **extra):
+    return SearchV2(
+        item_type=item_type,
+        title=title,
+        title_no_prefix=remove_prefix(title),
+        slug=slug,
+        slug_no_prefix=remove_prefix(slug),
+        clean_title=clean_title(remove_prefix(slug)),
+        description=description,
+        absolute_url=f"/{item_type}s/{slug}/",
+        weight=weight,
+        **extra,
+    )
+
+
+def generate_corpus(size, seed=0, batch_size=5000):
+    """ Replaces the SearchV2 rows with the anchors and size - len(ANCHORS)
+    random packages and grids, starts a new index generation and writes the
+    BM25 index.
+
+        return: number of rows created
+    """
+    rand = random.Random(seed)
+    now = timezone.now()
+    rows = []
+    for title, slug, description, weight in ANCHORS:
+        rows.append(corpus_row(
+            "package", title, slug, description, weight,
+            category="App", python3=True, last_committed=now - timedelta(days=10),
+        ))
+    for i in range(size - len(rows)):
+        words = rand.sample(VOCABULARY, rand.randint(1, 3))
+        if rand.random() < 0.1:
+            title = " ".join(word.capitalize() for word in words)
+            rows.append(corpus_row(
+                "grid", title, f"{slugify(title)}-{i}", f"Packages for {' and '.join(words)}.",
+                rand.randint(0, 100),
+            ))
+            continue
+        title = "-".join(["django"] + words if rand.random() < 0.7 else words)
+        description = " ".join(rand.choices(VOCABULARY, k=rand.randint(4, 12)))
+        rows.append(corpus_row(
+            "package", title, f"{title}-{i}", f"{description.capitalize()}.", rand.randint(0, 130),
+            category=rand.choice(CATEGORIES),
+            python3=rand.random() < 0.8,
+            repo_watchers=rand.randint(0, 5000),
+            last_committed=now - timedelta(days=rand.randint(0, 2000)),
+        ))
+
+    SearchV2.objects.all().delete()
+    SearchV2.objects.bulk_create(rows, batch_size=batch_size)
+    update_search_vectors()
+    build = SearchBuild.objects.create(full=True, items=len(rows), finished=timezone.now())
+    set_generation(build.pk)
+    bm25.write_index()
+    return len(rows)
+
+
+def load_queries(path=QUERIES_FILE):
+    """ return: the queries of a query log, one per line """
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def load_judgements(path=JUDGEMENTS_FILE):
+    """ return: dict of query to a dict of slug to relevance grade """
+    with open(path) as f:
+        return json.load(f)
+
+
+def postgres_backend(q, limit=10):
+    return [row.slug for row in search_queryset(q)[:limit]]
+
+
+def cached_backend(q, limit=10):
+    return [row.slug for row in search_results(q, limit=limit)]
+
+
+def bm25_backend(q, limit=10):
+    ids = bm25.search_ids(q, limit) or []
+    rows = SearchV2.objects.in_bulk(ids)
+    return [rows[pk].slug for pk in ids if pk in rows]
+
+
+BACKENDS = {
+    "postgres": postgres_backend,
+    "cached": cached_backend,
+    "bm25": bm25_backend,
+}
+
+
+def percentile(values, p):
+    """ Nearest-rank percentile of values. """
+    if not values:
+        return 0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def reciprocal_rank(results, relevant):
+    for position, slug in enumerate(results, start=1):
+        if relevant.get(slug, 0) > 0:
+            return 1 / position
+    return 0
+
+
+def ndcg(results, relevant, k=10):
+    """ Normalized discounted cumulative gain of the first k results. """
+    dcg = sum(
+        (2 ** relevant.get(slug, 0) - 1) / math.log2(position + 1)
+        for position, slug in enumerate(results[:k], start=1)
+    )
+    ideal = sorted(relevant.values(), reverse=True)[:k]
+    idcg = sum((2 ** grade - 1) / math.log2(position + 1) for position, grade in enumerate(ideal, start=1))
+    return dcg / idcg if idcg else 0
+
+
+def run_backend(search, queries, judgements, repeat=1):
+    """ Replays queries repeat times against search, a callable returning
+    the ranked slugs of a query.
+
+        return: dict of the latency percentiles in milliseconds, the mean
+        number of database queries per search, and the mean MRR and
+        NDCG@10 over the judged queries
+    """
+    latencies, query_counts, ranks, gains = [], [], [], []
+    for _ in range(repeat):
+        for q in queries:
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                results = search(q)
+                latencies.append((time.perf_counter() - start) * 1000)
+            query_counts.append(len(captured))
+            if q in judgements:
+                ranks.append(reciprocal_rank(results, judgements[q]))
+                gains.append(ndcg(results, judgements[q]))
+
+    report = {f"p{p}": percentile(latencies, p) for p in PERCENTILES}
+    report["queries"] = sum(query_counts) / len(query_counts) if query_counts else 0
+    report["mrr"] = sum(ranks) / len(ranks) if ranks else 0
+    report["ndcg"] = sum(gains) / len(gains) if gains else 0
+    return report
+
+
+def run_benchmark(backends, queries, judgements, repeat=1):
+    """ return: dict of backend name to its run_backend() report """
+    return {name: run_backend(BACKENDS[name], queries, judgements, repeat) for name in backends}
@@ -0,0 +1,285 @@
+"""
+In-memory BM25 search backend, used when SEARCH_BACKEND is "bm25".
+
+At the end of each index build write_index() turns the SearchV2 table into
+a compact inverted index: the sorted vocabulary, and for each token the
+documents holding it with their term frequencies, all stored as typed
+arrays in one file at SEARCH_BM25_INDEX. The file is written aside and
+moved into place, so readers always see a complete index.
+
+Web processes memory-map the file (see warm() in wsgi.py) and read the
+arrays in place. Before a search they stat the file and map it again when a
+build replaced it, so every process follows the builds without talking to
+the database or the cache. Searching returns SearchV2 pks; only fetching the
+rows to display them goes to the database, by primary key (see
+searchv2.cache.search_results). Without a readable index file searches fall
+back to Postgres.
+
+Words of a query match tokens they are a prefix of, like the Postgres
+backend. Documents holding every word are ranked by their BM25 score times
+SEARCH_BM25_WEIGHT plus their weight; when none holds them all, the
+documents holding any of them are ranked instead, which softens typos.
+"""
+from array import array
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import sys
+import threading
+
+from django.conf import settings
+
+from searchv2.models import SearchV2
+from searchv2.query import WORD_RE
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SV2BM25\x01"
+
+# Term frequency multiplier of the words in each field; names count as much
+# as the A weight of the Postgres search vector does against descriptions
+FIELD_BOOSTS = (
+    ("title", 3),
+    ("title_no_prefix", 3),
+    ("slug", 3),
+    ("description", 1),
+    ("category", 1),
+    ("participants", 1),
+)
+
+# BM25 term frequency saturation and document length normalization
+K1 = 1.2
+B = 0.75
+
+# Tokens a query word expands to as a prefix, the most frequent first
+MAX_EXPANSIONS = 100
+
+ARRAYS = (
+    ("doc_ids", "I"),
+    ("doc_weights", "i"),
+    ("doc_norms", "f"),
+    ("token_offsets", "I"),
+    ("vocabulary", "B"),
+    ("posting_offsets", "I"),
+    ("posting_docs", "I"),
+    ("posting_freqs", "H"),
+)
+
+
+def tokenize(text):
+    return WORD_RE.findall(text.lower()) if text else []
+
+
+def build_arrays(rows):
+    """ rows: iterable of (pk, weight, *values of the FIELD_BOOSTS fields)
+
+        return: dict of array name to array
+    """
+    doc_ids, doc_weights, lengths = array("I"), array("i"), []
+    postings = {}
+    for doc, (pk, weight, *values) in enumerate(rows):
+        freqs = {}
+        for (_, boost), value in zip(FIELD_BOOSTS, values):
+            for token in tokenize(value):
+                freqs[token] = freqs.get(token, 0) + boost
+        doc_ids.append(pk)
+        doc_weights.append(weight or 0)
+        lengths.append(sum(freqs.values()))
+        for token, freq in freqs.items():
+            postings.setdefault(token, []).append((doc, min(freq, 0xFFFF)))
+
+    average = sum(lengths) / len(lengths) if lengths else 1
+    doc_norms = array("f", (K1 * (1 - B + B * length / (average or 1)) for length in lengths))
+
+    token_offsets, vocabulary = array("I", [0]), array("B")
+    posting_offsets, posting_docs, posting_freqs = array("I", [0]), array("I"), array("H")
+    for token in sorted(postings):
+        vocabulary.frombytes(token.encode("utf-8"))
+        token_offsets.append(len(vocabulary))
+        for doc, freq in postings[token]:
+            posting_docs.append(doc)
+            posting_freqs.append(freq)
+        posting_offsets.append(len(posting_docs))
+
+    return {
+        "doc_ids": doc_ids,
+        "doc_weights": doc_weights,
+        "doc_norms": doc_norms,
+        "token_offsets": token_offsets,
+        "vocabulary": vocabulary,
+        "posting_offsets": posting_offsets,
+        "posting_docs": posting_docs,
+        "posting_freqs": posting_freqs,
+    }
+
+
+def write_arrays(arrays, path):
+    """ Writes arrays to path: MAGIC, the length and JSON of a header giving
+    the byte order and the offset and length of each array, then the arrays,
+    each aligned on 8 bytes. """
+    layout, offset = [], 0
+    for name, typecode in ARRAYS:
+        layout.append([name, typecode, offset, len(arrays[name])])
+        offset += -(-len(arrays[name]) * arrays[name].itemsize // 8) * 8
+    header = json.dumps({"byteorder": sys.byteorder, "arrays": layout}).encode("ascii")
+    start = -(-(len(MAGIC) + 4 + len(header)) // 8) * 8
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(4, "little"))
+        f.write(header)
+        for name, typecode, offset, length in layout:
+            f.write(b"\0" * (start + offset - f.tell()))
+            arrays[name].tofile(f)
+    os.replace(tmp_path, path)
+
+
+def write_index(path=None):
+    """ Writes the inverted index of the SearchV2 rows to path, by default
+    SEARCH_BM25_INDEX. """
+    fields = [name for name, _ in FIELD_BOOSTS]
+    rows = SearchV2.objects.order_by("pk").values_list("pk", "weight", *fields).iterator()
+    write_arrays(build_arrays(rows), path or settings.SEARCH_BM25_INDEX)
+
+
+class BM25Index:
+    """ Inverted index read in place from a memory-mapped file. """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a search index")
+        length = int.from_bytes(self.mmap[len(MAGIC):len(MAGIC) + 4], "little")
+        header = json.loads(self.mmap[len(MAGIC) + 4:len(MAGIC) + 4 + length])
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was written on a {header['byteorder']} endian machine")
+        start = -(-(len(MAGIC) + 4 + length) // 8) * 8
+
+        view = memoryview(self.mmap)
+        for name, typecode, offset, length in header["arrays"]:
+            size = length * array(typecode).itemsize
+            if start + offset + size > len(self.mmap):
+                raise ValueError(f"{path} is truncated")
+            setattr(self, name, view[start + offset:start + offset + size].cast(typecode))
+        self.size = len(self.doc_ids)
+
+    def token(self, i):
+        return bytes(self.vocabulary[self.token_offsets[i]:self.token_offsets[i + 1]])
+
+    def lower_bound(self, key):
+        """ return: the id of the first token not lower than key """
+        lo, hi = 0, len(self.token_offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.token(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def frequency(self, i):
+        return self.posting_offsets[i + 1] - self.posting_offsets[i]
+
+    def expand(self, word):
+        """ return: ids of the most frequent tokens starting with word """
+        prefix = word.encode("utf-8")
+        tokens = range(self.lower_bound(prefix), self.lower_bound(prefix + b"\xff"))
+        if len(tokens) > MAX_EXPANSIONS:
+            return heapq.nlargest(MAX_EXPANSIONS, tokens, key=self.frequency)
+        return tokens
+
+    def word_scores(self, word):
+        """ return: dict of document to the best BM25 score of a token word
+        expands to """
+        scores = {}
+        for i in self.expand(word):
+            frequency = self.frequency(i)
+            idf = math.log(1 + (self.size - frequency + 0.5) / (frequency + 0.5))
+            for j in range(self.posting_offsets[i], self.posting_offsets[i + 1]):
+                doc, freq = self.posting_docs[j], self.posting_freqs[j]
+                score = idf * freq * (K1 + 1) / (freq + self.doc_norms[doc])
+                if score > scores.get(doc, 0):
+                    scores[doc] = score
+        return scores
+
+    def search(self, q, limit=None):
+        """ return: list of the pks of the documents matching q, best
+        matches first """
+        words = set(tokenize(q))
+        if not words or not self.size:
+            return []
+        word_scores = [self.word_scores(word) for word in words]
+        docs = set.intersection(*(set(scores) for scores in word_scores))
+        if not docs:
+            docs = set.union(*(set(scores) for scores in word_scores))
+
+        ranking = settings.SEARCH_BM25_WEIGHT
+        results = []
+        for doc in docs:
+            bm25 = sum(scores.get(doc, 0) for scores in word_scores)
+            weight = self.doc_weights[doc]
+            results.append((-(bm25 * ranking + weight), -weight, self.doc_ids[doc]))
+        if limit:
+            results = heapq.nsmallest(limit, results)
+        else:
+            results.sort()
+        return [pk for _, _, pk in results]
+
+
+class IndexFile:
+    """ The BM25Index of this process, mapped again when the file at
+    SEARCH_BM25_INDEX is replaced. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+
+    def is_current(self, stat):
+        return (
+            self.index is not None
+            and (self.index.stat.st_ino, self.index.stat.st_mtime_ns) == (stat.st_ino, stat.st_mtime_ns)
+        )
+
+    def get(self):
+        """ return: the BM25Index, or None when there is no readable index
+        file """
+        path = settings.SEARCH_BM25_INDEX
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if not self.is_current(stat):
+            with self.lock:
+                if not self.is_current(stat):
+                    try:
+                        # Searches still holding the previous index keep it
+                        # mapped until they are done with it
+                        self.index = BM25Index(path)
+                    except (OSError, ValueError, KeyError):
+                        logger.warning(f"Unable to load the search index at {path}", exc_info=True)
+                        return None
+        return self.index
+
+
+_index_file = IndexFile()
+
+
+def search_ids(q, limit=None):
+    """ return: the ordered pks of the matches of q, or None when there is
+    no readable index file """
+    index = _index_file.get()
+    if index is None:
+        logger.warning(f"No search index at {settings.SEARCH_BM25_INDEX}")
+        return None
+    return index.search(q, limit)
+
+
+def warm():
+    """ Maps the index ahead of the first request. """
+    _index_file.get()
@@ -1,133 +1,303 @@
-import json
-import requests
+"""
+Builders of the SearchV2 index.
 
+build_1() rebuilds the rows of every package and grid. build_incremental()
+only rebuilds the rows of the packages and grids changed since the last
+build started: saved (modified), refreshed (last_fetched), or given new
+commits, releases or grid packages. Both remove the rows of deleted items
+and record a SearchBuild, whose pk is the generation of the index (see
+searchv2.cache).
+
+A build reads its inputs with one query for the packages and one for the
+grids, asks Read the Docs about the packages (see searchv2.docs), computes
+the rows and weights in memory, and writes them with one bulk create and
+bulk update inside a transaction, so readers never see a half-built index.
+The transaction starts by taking an advisory lock, so builds overlapping
+(the incremental cron run and the daily full build) write one after the
+other, and never both create the row of the same item.
+With SEARCH_BACKEND "bm25" it then writes the BM25 index file of the whole
+table (see searchv2.bm25).
+
+Weights that decay with time (recent commits and releases) are only
+recomputed for the items an incremental build touches; the daily full build
+catches up on the others.
+"""
 from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Exists, F, Max, OuterRef, Q
+from django.urls import reverse
 from django.utils import timezone
 
-from grid.models import Grid
-from package.models import Package, Commit
-from searchv2.models import SearchV2
+from grid.models import Grid, GridPackage
+from package.models import Package, Commit, Version
+from searchv2.bm25 import write_index
+from searchv2.cache import set_generation
+from searchv2.docs import probe_docs
+from searchv2.models import SearchBuild, SearchV2
+from searchv2.query import update_search_vectors
 from searchv2.utils import remove_prefix, clean_title
 
+QUARTER_DELTA = timedelta(90)
+HALF_YEAR_DELTA = timedelta(182)
+YEAR_DELTA = timedelta(365)
+
+UPDATE_FIELDS = [
+    "modified",
+    "weight",
+    "title",
+    "title_no_prefix",
+    "slug_no_prefix",
+    "clean_title",
+    "description",
+    "category",
+    "absolute_url",
+    "repo_watchers",
+    "repo_forks",
+    "pypi_downloads",
+    "usage",
+    "participants",
+    "last_committed",
+    "last_released",
+    "python3",
+]
+
 
 def build_1():
-    now = timezone.now()
-    quarter_delta = timedelta(90)
-    half_year_delta = timedelta(182)
-    year_delta = timedelta(365)
-    last_week = now - timedelta(7)
-
-    SearchV2.objects.filter(created__lte=last_week).delete()
-    for package in Package.objects.all():
-        print(f"{package}")
-        obj, created = SearchV2.objects.get_or_create(
-            item_type="package",
-            slug=package.slug,
-        )
-        obj.slug_no_prefix = remove_prefix(package.slug)
-        obj.clean_title = clean_title(remove_prefix(package.slug))
-        obj.title = package.title
-        obj.title_no_prefix = remove_prefix(package.title)
-        obj.description = package.repo_description
-        obj.category = package.category.title
-        obj.absolute_url = package.get_absolute_url()
-        obj.repo_watchers = package.repo_watchers
-        obj.repo_forks = package.repo_forks
-        obj.pypi_downloads = package.pypi_downloads
-        obj.usage = package.usage.count()
-        obj.participants = package.participants
-
-        optional_save = False
-        try:
-            obj.last_committed = package.last_updated()
-            optional_save = True
-        except Commit.DoesNotExist:
-            pass
-
-        last_released = package.last_released()
-        if last_released and last_released.upload_time:
-            obj.last_released = last_released.upload_time
-            optional_save = True
-
-        if optional_save:
-            obj.save()
-
-        # Weighting part
-        # Weighting part
-        # Weighting part
-        weight = 0
-        optional_save = False
-
-        # Read the docs!
-        rtfd_url = f"http://readthedocs.org/api/v1/build/{obj.slug}/"
-        r = requests.get(rtfd_url)
-        if r.status_code == 200:
-            data = json.loads(r.content)
-            if data['meta']['total_count']:
-                weight += 20
-
-        if not package.is_deprecated:
-
-            if obj.description.strip():
-                weight += 20
-
-            if obj.repo_watchers:
-                weight += min(obj.repo_watchers, 20)
-
-            if obj.repo_forks:
-                weight += min(obj.repo_forks, 20)
-
-            if obj.pypi_downloads:
-                weight += min(obj.pypi_downloads / 1000, 20)
-
-            if obj.usage:
-                weight += min(obj.usage, 20)
-
-            # Is there ongoing work or is this forgotten?
-            if obj.last_committed:
-                if now - obj.last_committed < quarter_delta:
-                    weight += 20
-                elif now - obj.last_committed < half_year_delta:
-                    weight += 10
-                elif now - obj.last_committed < year_delta:
-                    weight += 5
-
-            # Is the last release less than a year old?
-            last_released = obj.last_released
-            if last_released:
-                if now - last_released < year_delta:
-                    weight += 20
-
-            if weight:
-                obj.weight = weight
-                obj.save()
-
-    max_weight = SearchV2.objects.only("weight").order_by("-weight").first().weight
+    """ Rebuilds the whole index. """
+    build = SearchBuild.objects.create(full=True)
+    return _build(build, Package.objects.all(), Grid.objects.all())
+
+
+def build_incremental():
+    """ Rebuilds the rows of the packages and grids changed since the last
+    build started. Falls back to build_1() when there was none. """
+    last_build = SearchBuild.objects.filter(finished__isnull=False).order_by("-pk").first()
+    if last_build is None:
+        return build_1()
+    since = last_build.started
+    build = SearchBuild.objects.create(full=False)
+    packages = Package.objects.filter(
+        Q(modified__gte=since)
+        | Q(last_fetched__gte=since)
+        | Exists(Commit.objects.filter(package=OuterRef("pk"), created__gte=since))
+        | Exists(Version.objects.filter(package=OuterRef("pk"), created__gte=since))
+    )
+    grids = Grid.objects.filter(
+        Q(modified__gte=since)
+        | Exists(GridPackage.objects.filter(grid=OuterRef("pk"), created__gte=since))
+    )
+    return _build(build, packages, grids)
+
+
+def remove_deleted():
+    """ Deletes the rows of packages and grids that no longer exist. """
+    return (
+        SearchV2.objects.filter(item_type="package").exclude(slug__in=Package.objects.values("slug")).delete()[0]
+        + SearchV2.objects.filter(item_type="grid").exclude(slug__in=Grid.objects.values("slug")).delete()[0]
+    )
+
+
+def package_weight(row, docs, now):
+    """ Weight of the SearchV2 row of a package, from its field values. """
+    weight = 0
+
+    # Read the docs!
+    if docs:
+        weight += 20
+
+    # Deprecated packages only keep the Read the Docs bonus
+    if row["deprecated"]:
+        return weight
+
+    if row["description"].strip():
+        weight += 20
+
+    if row["repo_watchers"]:
+        weight += min(row["repo_watchers"], 20)
+
+    if row["repo_forks"]:
+        weight += min(row["repo_forks"], 20)
+
+    if row["pypi_downloads"]:
+        weight += min(row["pypi_downloads"] / 1000, 20)
+
+    if row["usage"]:
+        weight += min(row["usage"], 20)
+
+    # Is there ongoing work or is this forgotten?
+    if row["last_committed"]:
+        if now - row["last_committed"] < QUARTER_DELTA:
+            weight += 20
+        elif now - row["last_committed"] < HALF_YEAR_DELTA:
+            weight += 10
+        elif now - row["last_committed"] < YEAR_DELTA:
+            weight += 5
+
+    # Is the last release less than a year old?
+    if row["last_released"]:
+        if now - row["last_released"] < YEAR_DELTA:
+            weight += 20
+
+    # Fractions are truncated, the way saving the float to the IntegerField did
+    return int(weight)
+
+
+def grid_weight(row, max_weight):
+    """ Weight of the SearchV2 row of a grid, below the heaviest package. """
     increment = max_weight / 6
-    for grid in Grid.objects.all():
-        obj, created = SearchV2.objects.get_or_create(
-            item_type="grid",
-            slug=grid.slug,
-        )
-        obj.slug_no_prefix = remove_prefix(grid.slug)
-        obj.clean_title = clean_title(remove_prefix(grid.slug))
-        obj.title = grid.title
-        obj.title_no_prefix = remove_prefix(grid.title)
-        obj.description = grid.description
-        obj.absolute_url = grid.get_absolute_url()
+    weight = max_weight - increment
+
+    if not row["is_locked"]:
+        weight -= increment
+
+    if not row["header"]:
+        weight -= increment
+
+    if not row["has_packages"]:
+        weight -= increment
+
+    return int(weight)
+
+
+def package_rows(packages, now):
+    """ return: list of SearchV2 field values of packages, from one query
+    and the Read the Docs probe stage """
+    rows = []
+    packages = packages.annotate(
+        category_title=F("category__title"),
+        usage_count=Count("usage", distinct=True),
+        python3=F("latest_version__supports_python3"),
+    ).values(
+        "slug",
+        "title",
+        "repo_description",
+        "category_title",
+        "repo_watchers",
+        "repo_forks",
+        "pypi_downloads",
+        "usage_count",
+        "participants",
+        "last_commit_date",
+        "latest_upload_time",
+        "date_deprecated",
+        "python3",
+    )
+    for package in packages:
+        row = {
+            "item_type": "package",
+            "slug": package["slug"],
+            "slug_no_prefix": remove_prefix(package["slug"]),
+            "clean_title": clean_title(remove_prefix(package["slug"])),
+            "title": package["title"],
+            "title_no_prefix": remove_prefix(package["title"]),
+            "description": package["repo_description"] or "",
+            "category": package["category_title"] or "",
+            "absolute_url": reverse("package", args=[package["slug"]]),
+            "repo_watchers": package["repo_watchers"],
+            "repo_forks": package["repo_forks"],
+            "pypi_downloads": package["pypi_downloads"],
+            "usage": package["usage_count"],
+            "participants": package["participants"] or "",
+            "last_committed": package["last_commit_date"],
+            "last_released": package["latest_upload_time"],
+            "python3": bool(package["python3"]),
+            "deprecated": package["date_deprecated"] is not None,
+        }
+        rows.append(row)
+
+    docs = probe_docs([row["slug"] for row in rows], now)
+    for row in rows:
+        row["weight"] = package_weight(row, docs[row["slug"]], now)
+        del row["deprecated"]
+    return rows
+
+
+def grid_rows(grids, max_weight):
+    """ return: list of SearchV2 field values of grids, from one query """
+    rows = []
+    grids = grids.annotate(
+        has_packages=Exists(GridPackage.objects.filter(grid=OuterRef("pk"))),
+    ).values("slug", "title", "description", "is_locked", "header", "has_packages")
+    for grid in grids:
+        rows.append({
+            "item_type": "grid",
+            "slug": grid["slug"],
+            "slug_no_prefix": remove_prefix(grid["slug"]),
+            "clean_title": clean_title(remove_prefix(grid["slug"])),
+            "title": grid["title"],
+            "title_no_prefix": remove_prefix(grid["title"]),
+            "description": grid["description"] or "",
+            "category": "",
+            "absolute_url": reverse("grid", args=[grid["slug"]]),
+            "repo_watchers": 0,
+            "repo_forks": 0,
+            "pypi_downloads": 0,
+            "usage": 0,
+            "participants": "",
+            "last_committed": None,
+            "last_released": None,
+            "python3": False,
+            "weight": grid_weight(grid, max_weight),
+        })
+    return rows
+
+
+# Key of the pg_advisory_xact_lock held by a build while it writes
+BUILD_LOCK_ID = 0x53454152
+
+
+def lock_builds():
+    """ Waits for the builds writing in other transactions to commit. The lock
+    is released at the end of the current transaction. """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [BUILD_LOCK_ID])
+
+
+def save_rows(rows, now):
+    """ Creates or updates the SearchV2 rows of rows with a bulk create and a
+    bulk update.
 
-        weight = max_weight - increment
+        return: pks of the rows
+    """
+    existing = {
+        (item_type, slug): pk
+        for pk, item_type, slug in SearchV2.objects.values_list("pk", "item_type", "slug")
+    }
 
-        if not grid.is_locked:
-            weight -= increment
+    created, updated = [], []
+    for row in rows:
+        obj = SearchV2(modified=now, **row)
+        obj.pk = existing.get((row["item_type"], row["slug"]))
+        if obj.pk is None:
+            created.append(obj)
+        else:
+            updated.append(obj)
+    SearchV2.objects.bulk_create(created, batch_size=1000)
+    SearchV2.objects.bulk_update(updated, UPDATE_FIELDS, batch_size=1000)
+    return [obj.pk for obj in created + updated]
 
-        if not grid.header:
-            weight -= increment
 
-        if not grid.packages.exists():
-            weight -= increment
+def _build(build, packages, grids):
+    now = build.started
+    rows = package_rows(packages, now)
 
-        obj.weight = weight
-        obj.save()
+    weights = [row["weight"] for row in rows]
+    if not build.full:
+        slugs = [row["slug"] for row in rows]
+        others = SearchV2.objects.filter(item_type="package").exclude(slug__in=slugs)
+        weights.append(others.aggregate(Max("weight"))["weight__max"] or 0)
+    rows += grid_rows(grids, max(weights, default=0))
 
+    with transaction.atomic(savepoint=False):
+        lock_builds()
+        remove_deleted()
+        built = save_rows(rows, now)
+        update_search_vectors(SearchV2.objects.filter(pk__in=built))
+        build.items = len(built)
+        build.finished = timezone.now()
+        build.save()
+    set_generation(build.pk)
+    if settings.SEARCH_BACKEND == "bm25":
+        write_index()
     return SearchV2.objects.all()
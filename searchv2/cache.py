@@ -0,0 +1,77 @@
+"""
+Cache of search results, keyed on the index generation.
+
+The generation is the pk of the last finished SearchBuild. The builders
+store it in the cache when they finish, which moves every search to new
+keys, so cached results never outlive the index they were computed from.
+
+For each normalized query the cache holds the ordered pks of the first
+SEARCH_CACHE_MAX_RESULTS matches and the maximum weight of the index; a hot
+query costs one cache read and one primary key fetch.
+
+With SEARCH_BACKEND "bm25" the matches come from the memory-mapped index of
+this process instead (see searchv2.bm25), which is cheaper than a cache
+read, so they are not cached.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+from searchv2 import bm25
+from searchv2.models import SearchBuild, SearchV2
+from searchv2.query import search_queryset
+
+GENERATION_KEY = "search_generation"
+
+
+def current_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        generation = SearchBuild.objects.filter(finished__isnull=False).aggregate(Max("pk"))["pk__max"] or 0
+        cache.set(GENERATION_KEY, generation, None)
+    return generation
+
+
+def set_generation(generation):
+    cache.set(GENERATION_KEY, generation, None)
+
+
+def normalize_query(q):
+    return " ".join(q.lower().split())
+
+
+def max_weight():
+    """ return: the highest weight in the index """
+    key = f"search_max_weight:{current_generation()}"
+    weight = cache.get(key)
+    if weight is None:
+        weight = SearchV2.objects.aggregate(Max("weight"))["weight__max"] or 0
+        cache.set(key, weight, settings.SEARCH_CACHE_TIMEOUT)
+    return weight
+
+
+def search_ids(q):
+    """ return: the ordered pks of the first matches of q """
+    q = normalize_query(q)
+    if not q:
+        return []
+    if settings.SEARCH_BACKEND == "bm25":
+        ids = bm25.search_ids(q, settings.SEARCH_CACHE_MAX_RESULTS)
+        if ids is not None:
+            return ids
+    digest = hashlib.md5(q.encode("utf-8")).hexdigest()
+    key = f"search:{current_generation()}:{digest}"
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(search_queryset(q).values_list("pk", flat=True)[:settings.SEARCH_CACHE_MAX_RESULTS])
+        cache.set(key, ids, settings.SEARCH_CACHE_TIMEOUT)
+    return ids
+
+
+def search_results(q, limit=None):
+    """ return: list of the SearchV2 rows matching q, best matches first """
+    ids = search_ids(q)[:limit]
+    rows = SearchV2.objects.in_bulk(ids)
+    return [rows[pk] for pk in ids if pk in rows]
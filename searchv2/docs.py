@@ -0,0 +1,99 @@
+"""
+Read the Docs probe stage of the search index builders.
+
+Packages documented on Read the Docs weigh more in search. probe_docs() asks
+the Read the Docs API about many packages at once from a thread pool of
+READTHEDOCS_PROBE_WORKERS, each request bounded by READTHEDOCS_PROBE_TIMEOUT,
+and stores the answers as DocsProbe rows. Answers younger than
+READTHEDOCS_PROBE_TTL are reused instead of probing again. A failed probe
+keeps the previous answer (or False) and is retried on the next build.
+
+The probes go through a plain session: the repo handlers' shared one
+revalidates GET requests (see package.repos.conditional), which would turn a
+re-probe into a 304 with no answer in it.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import logging
+
+import requests
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from searchv2.models import DocsProbe
+
+logger = logging.getLogger(__name__)
+
+_session = None
+
+
+def get_session():
+    """ requests.Session for the Read the Docs API, with a connection pool
+    sized to the probe workers. """
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=settings.READTHEDOCS_PROBE_WORKERS)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+
+def probe(slug):
+    """ return: whether Read the Docs builds documentation for slug, or None
+    if it could not tell """
+    url = f"{settings.READTHEDOCS_API_URL}/build/{slug}/"
+    try:
+        r = get_session().get(url, timeout=settings.READTHEDOCS_PROBE_TIMEOUT)
+        if r.status_code == 404:
+            return False
+        r.raise_for_status()
+        return bool(r.json()["meta"]["total_count"])
+    except (requests.RequestException, ValueError, KeyError):
+        logger.warning(f"Unable to probe Read the Docs for {slug}", exc_info=True)
+        return None
+
+
+def probe_in_thread(slug):
+    """ probe() for the thread pool. The thread's database connection is
+    released afterwards, the same way run_sync() does. """
+    try:
+        return probe(slug)
+    finally:
+        close_old_connections()
+
+
+def probe_docs(slugs, now=None):
+    """ return: dict of slug to whether Read the Docs builds its
+    documentation, probing only the slugs without a fresh DocsProbe """
+    if not settings.READTHEDOCS_API_URL:
+        return {slug: False for slug in slugs}
+
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=settings.READTHEDOCS_PROBE_TTL)
+    stored = {row.slug: row for row in DocsProbe.objects.filter(slug__in=slugs)}
+    results = {slug: row.has_docs for slug, row in stored.items()}
+    pending = [slug for slug in slugs if slug not in stored or stored[slug].checked < stale]
+    if not pending:
+        return results
+
+    with ThreadPoolExecutor(max_workers=settings.READTHEDOCS_PROBE_WORKERS) as executor:
+        answers = dict(zip(pending, executor.map(probe_in_thread, pending)))
+
+    created, updated = [], []
+    for slug, has_docs in answers.items():
+        if has_docs is None:
+            results.setdefault(slug, False)
+            continue
+        results[slug] = has_docs
+        if slug in stored:
+            stored[slug].has_docs = has_docs
+            stored[slug].checked = now
+            updated.append(stored[slug])
+        else:
+            created.append(DocsProbe(slug=slug, has_docs=has_docs, checked=now))
+    DocsProbe.objects.bulk_create(created, batch_size=1000)
+    DocsProbe.objects.bulk_update(updated, ["has_docs", "checked"], batch_size=1000)
+    return results
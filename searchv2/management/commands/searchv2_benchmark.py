@@ -0,0 +1,62 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from searchv2 import benchmark
+
+
+class Command(BaseCommand):
+
+    help = "Measures the latency and relevance of the search backends on a synthetic index in the test database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size", type=int, default=10000,
+            help="Number of SearchV2 rows generated",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the generated index")
+        parser.add_argument(
+            "--repeat", type=int, default=3,
+            help="Number of times the query log is replayed against each backend",
+        )
+        parser.add_argument(
+            "--backend", action="append", dest="backends", choices=sorted(benchmark.BACKENDS),
+            help="Backend measured, may be repeated (default: all)",
+        )
+        parser.add_argument("--queries", default=benchmark.QUERIES_FILE, help="Query log, one query per line")
+        parser.add_argument("--judgements", default=benchmark.JUDGEMENTS_FILE, help="JSON relevance judgements")
+        parser.add_argument("--keepdb", action="store_true", help="Keep the test database between runs")
+        parser.add_argument(
+            "--noinput", "--no-input", action="store_false", dest="interactive",
+            help="Destroy an existing test database without asking",
+        )
+
+    def handle(self, *args, **options):
+        queries = benchmark.load_queries(options["queries"])
+        judgements = benchmark.load_judgements(options["judgements"])
+        backends = options["backends"] or sorted(benchmark.BACKENDS)
+
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=not options["interactive"], keepdb=options["keepdb"],
+        )
+        cache = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "searchv2-benchmark"}}
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir, override_settings(
+                CACHES=cache, SEARCH_BM25_INDEX=os.path.join(tmp_dir, "searchv2.idx"),
+            ):
+                size = benchmark.generate_corpus(options["size"], options["seed"])
+                reports = benchmark.run_benchmark(backends, queries, judgements, options["repeat"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+
+        self.stdout.write(f"{size} rows, {len(queries)} queries x {options['repeat']}, {len(judgements)} judged")
+        self.stdout.write(f"{'backend':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}{'MRR':>8}{'NDCG@10':>9}")
+        for name, report in reports.items():
+            self.stdout.write(
+                f"{name:<12}{report['p50']:>10.2f}{report['p95']:>10.2f}{report['p99']:>10.2f}"
+                f"{report['queries']:>10.2f}{report['mrr']:>8.3f}{report['ndcg']:>9.3f}"
+            )
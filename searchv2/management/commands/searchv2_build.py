@@ -4,7 +4,7 @@ from time import gmtime, strftime
 from django.core.management.base import BaseCommand
 from django.conf import settings
 
-from searchv2.builders import build_1
+from searchv2.builders import build_1, build_incremental
 from core.utils import healthcheck
 
 
@@ -12,10 +12,19 @@ class Command(BaseCommand):
 
     help = "Constructs the search results for the system"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental", action="store_true",
+            help="Only rebuild the packages and grids changed since the last build",
+        )
+
     def handle(self, *args, **options):
 
         print("Commencing search result building now %s " % strftime("%a, %d %b %Y %H:%M:%S +0000", gmtime()), file=stdout)
-        build_1()
+        if options["incremental"]:
+            build_incremental()
+        else:
+            build_1()
 
         print("Finished at %s" % strftime("%a, %d %b %Y %H:%M:%S +0000", gmtime()), file=stdout)
         if getattr(settings, "HEALTHCHECK_ENABLED", False):
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.7 on 2026-10-18 09:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def fill_search_vector(apps, schema_editor):
+    SearchV2 = apps.get_model("searchv2", "SearchV2")
+    SearchV2.objects.update(search_vector=(
+        SearchVector("title", "title_no_prefix", "slug", weight="A", config="simple")
+        + SearchVector("description", weight="B", config="english")
+        + SearchVector("category", weight="C", config="simple")
+        + SearchVector("participants", weight="D", config="simple")
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('searchv2', '0003_auto_20180214_0617'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchv2',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Search vector'),
+        ),
+        migrations.AddIndex(
+            model_name='searchv2',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='searchv2_search_vector'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+    ]
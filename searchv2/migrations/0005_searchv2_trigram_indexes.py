@@ -0,0 +1,24 @@
+# Generated by Django 3.2.7 on 2026-10-18 09:40
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('searchv2', '0004_searchv2_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='searchv2',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='searchv2_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='searchv2',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['slug_no_prefix'], name='searchv2_slug_no_prefix_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.7 on 2026-10-18 10:05
+
+from django.db import migrations, models
+import django.utils.timezone
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('searchv2', '0005_searchv2_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchBuild',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('started', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Started')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Finished')),
+                ('full', models.BooleanField(default=True, verbose_name='Full build')),
+                ('items', models.IntegerField(default=0, verbose_name='Items built')),
+            ],
+            options={
+                'ordering': ['-pk'],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.7 on 2026-10-18 10:30
+
+from django.db import migrations, models
+import django_extensions.db.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('searchv2', '0006_searchbuild'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocsProbe',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('slug', models.SlugField(unique=True, verbose_name='Slug')),
+                ('has_docs', models.BooleanField(default=False, verbose_name='Has docs')),
+                ('checked', models.DateTimeField(db_index=True, verbose_name='Checked')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
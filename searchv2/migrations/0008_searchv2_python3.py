@@ -0,0 +1,22 @@
+# Generated by Django 3.2.7 on 2026-10-18 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('searchv2', '0007_docsprobe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchv2',
+            name='python3',
+            field=models.BooleanField(default=False, verbose_name='Supports Python 3'),
+        ),
+        migrations.AddIndex(
+            model_name='searchv2',
+            index=models.Index(fields=['-weight', '-id'], name='searchv2_weight_id'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.7 on 2026-10-18 14:20
+
+from django.db import migrations, models
+
+# Keeps the oldest row of every set of duplicate items
+REMOVE_DUPLICATE_ITEMS = """
+DELETE FROM searchv2_searchv2 duplicate
+USING searchv2_searchv2 original
+WHERE duplicate.id > original.id
+  AND duplicate.item_type = original.item_type
+  AND duplicate.slug = original.slug
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('searchv2', '0008_searchv2_python3'),
+    ]
+
+    operations = [
+        migrations.RunSQL(REMOVE_DUPLICATE_ITEMS, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='searchv2',
+            constraint=models.UniqueConstraint(fields=('item_type', 'slug'), name='unique_searchv2_item_type_slug'),
+        ),
+    ]
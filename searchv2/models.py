@@ -1,6 +1,9 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.cache import cache
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 
 from core.models import BaseModel
 from package.models import Package
@@ -45,10 +48,21 @@ class SearchV2(BaseModel):
                         help_text="List of collaborats/participants on the project", blank=True)
     last_committed = models.DateTimeField(_("Last commit"), blank=True, null=True)
     last_released = models.DateTimeField(_("Last release"), blank=True, null=True)
+    python3 = models.BooleanField(_("Supports Python 3"), default=False)
+    search_vector = SearchVectorField(_("Search vector"), null=True, editable=False)
 
     class Meta:
         ordering = ['-weight', ]
         verbose_name_plural = 'SearchV2s'
+        indexes = [
+            GinIndex(fields=["search_vector"], name="searchv2_search_vector"),
+            GinIndex(fields=["title"], name="searchv2_title_trgm", opclasses=["gin_trgm_ops"]),
+            GinIndex(fields=["slug_no_prefix"], name="searchv2_slug_no_prefix_trgm", opclasses=["gin_trgm_ops"]),
+            models.Index(fields=["-weight", "-id"], name="searchv2_weight_id"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["item_type", "slug"], name="unique_searchv2_item_type_slug"),
+        ]
 
     def __str__(self):
         return f"{self.weight}:{self.title}"
@@ -74,3 +88,31 @@ class SearchV2(BaseModel):
 
     def _self(self):
         return self
+
+
+class SearchBuild(BaseModel):
+    """ A run of the index builders (see searchv2.builders). The pk of the
+    last finished build is the generation of the index. """
+
+    started = models.DateTimeField(_("Started"), default=timezone.now)
+    finished = models.DateTimeField(_("Finished"), blank=True, null=True)
+    full = models.BooleanField(_("Full build"), default=True)
+    items = models.IntegerField(_("Items built"), default=0)
+
+    class Meta:
+        ordering = ['-pk']
+
+    def __str__(self):
+        return f"{self.pk}:{'full' if self.full else 'incremental'}:{self.started}"
+
+
+class DocsProbe(BaseModel):
+    """ Last answer of Read the Docs about the documentation of a package
+    (see searchv2.docs). """
+
+    slug = models.SlugField(_("Slug"), unique=True)
+    has_docs = models.BooleanField(_("Has docs"), default=False)
+    checked = models.DateTimeField(_("Checked"), db_index=True)
+
+    def __str__(self):
+        return f"{self.slug}:{self.has_docs}"
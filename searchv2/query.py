@@ -0,0 +1,163 @@
+"""
+Full-text search over the SearchV2 index.
+
+Every row has a search_vector built from its title, slugs, category,
+description and participants by update_search_vectors() at the end of each
+index build, and the column is GIN indexed. A query matches the rows holding
+every one of its words as a prefix, so as-you-type queries find complete
+words, and the matches are ordered by their ts_rank times SEARCH_RANK_WEIGHT
+plus their weight.
+
+When that finds fewer than SEARCH_FUZZY_MIN_RESULTS rows, rows whose title
+or prefix-less slug is similar to the query (pg_trgm word similarity of at
+least SEARCH_FUZZY_THRESHOLD, served by trigram GIN indexes) are added after
+the full-text matches, so typos like "djnago-rest" still find something.
+"""
+from datetime import timedelta
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import BooleanField, Count, ExpressionWrapper, F, FloatField, Func, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from searchv2.models import SearchV2
+from searchv2.utils import remove_prefix, clean_title
+
+WORD_RE = re.compile(r"[^\W_]+")
+
+
+class TrigramWordSimilarity(Func):
+    """ pg_trgm word_similarity(string, expression) """
+    function = "word_similarity"
+    output_field = FloatField()
+
+    def __init__(self, string, expression, **extra):
+        super().__init__(Value(string), expression, **extra)
+
+
+class TrigramWordSimilar(Func):
+    """ string <% expression: word_similarity() reaches the session's
+    pg_trgm.word_similarity_threshold. Can use gin_trgm_ops indexes. """
+    template = "%(expressions)s"
+    arg_joiner = " <%% "
+    output_field = BooleanField()
+
+    def __init__(self, string, expression, **extra):
+        super().__init__(Value(string), expression, **extra)
+
+
+def search_document():
+    """ The expression search_vector is computed from. Names are indexed as
+    they are, the descriptions with English stemming. """
+    return (
+        SearchVector("title", "title_no_prefix", "slug", weight="A", config="simple")
+        + SearchVector("description", weight="B", config="english")
+        + SearchVector("category", weight="C", config="simple")
+        + SearchVector("participants", weight="D", config="simple")
+    )
+
+
+def update_search_vectors(queryset=None):
+    if queryset is None:
+        queryset = SearchV2.objects.all()
+    return queryset.update(search_vector=search_document())
+
+
+def search_query(q):
+    """ return: SearchQuery matching every word of q as a prefix, or None
+    when q has no words """
+    words = WORD_RE.findall(q.lower())
+    if not words:
+        return None
+    raw = " & ".join(f"{word}:*" for word in words)
+    return (
+        SearchQuery(raw, search_type="raw", config="simple")
+        | SearchQuery(raw, search_type="raw", config="english")
+    )
+
+
+def set_fuzzy_threshold():
+    """ Sets the word similarity threshold of the pg_trgm operators (and so of
+    the trigram indexes) for the current database session. """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)",
+            [str(settings.SEARCH_FUZZY_THRESHOLD)],
+        )
+
+
+def needs_fuzzy(queryset):
+    """ return: True if the full-text queryset has too few rows """
+    wanted = settings.SEARCH_FUZZY_MIN_RESULTS
+    return wanted > 0 and len(queryset.values_list("pk", flat=True)[:wanted]) < wanted
+
+
+def search_queryset(q):
+    """ return: the SearchV2 rows matching q, best matches first """
+    query = search_query(q)
+    if query is None:
+        return SearchV2.objects.none()
+
+    match = Q(search_vector=query)
+    title = clean_title(remove_prefix(q))
+    if title:
+        match |= Q(clean_title__startswith=title)
+
+    queryset = SearchV2.objects.filter(match)
+    if not needs_fuzzy(queryset):
+        return queryset.annotate(
+            rank=SearchRank(F("search_vector"), query),
+        ).annotate(
+            score=ExpressionWrapper(
+                F("rank") * settings.SEARCH_RANK_WEIGHT + F("weight"),
+                output_field=FloatField(),
+            ),
+        ).order_by(F("score").desc(nulls_last=True), "-weight", "pk")
+
+    set_fuzzy_threshold()
+    text = q.lower()
+    fuzzy = Q(TrigramWordSimilar(text, "title")) | Q(TrigramWordSimilar(text, "slug_no_prefix"))
+    return SearchV2.objects.filter(match | fuzzy).annotate(
+        exact=ExpressionWrapper(match, output_field=BooleanField()),
+        rank=SearchRank(F("search_vector"), query),
+        similarity=Greatest(
+            TrigramWordSimilarity(text, "title"),
+            TrigramWordSimilarity(text, "slug_no_prefix"),
+        ),
+    ).annotate(
+        score=ExpressionWrapper(
+            (F("rank") + F("similarity")) * settings.SEARCH_RANK_WEIGHT + F("weight"),
+            output_field=FloatField(),
+        ),
+    ).order_by("-exact", F("score").desc(nulls_last=True), "-weight", "pk")
+
+
+def filter_results(queryset, item_type=None, category=None, python3=None, fresh_days=None):
+    """ Narrows SearchV2 rows down to an item type, a category, Python 3
+    support, and to the items committed or released in the last fresh_days
+    days. Filters left to None are not applied. """
+    if item_type is not None:
+        queryset = queryset.filter(item_type=item_type)
+    if category is not None:
+        queryset = queryset.filter(category=category)
+    if python3 is not None:
+        queryset = queryset.filter(python3=python3)
+    if fresh_days is not None:
+        since = timezone.now() - timedelta(days=fresh_days)
+        queryset = queryset.filter(Q(last_committed__gte=since) | Q(last_released__gte=since))
+    return queryset
+
+
+def facet_counts(queryset):
+    """ return: dict of the number of rows of queryset per item type, per
+    category and per Python 3 support, from one grouped query """
+    facets = {"item_type": {}, "category": {}, "python3": {}}
+    groups = queryset.order_by().values("item_type", "category", "python3").annotate(count=Count("pk"))
+    for group in groups:
+        for name in facets:
+            value = group[name]
+            facets[name][value] = facets[name].get(value, 0) + group["count"]
+    return facets
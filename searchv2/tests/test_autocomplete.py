@@ -0,0 +1,58 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from package.models import Package
+from package.tests import initial_data
+from searchv2 import autocomplete
+from searchv2.autocomplete import PrefixIndex
+
+
+class PrefixIndexTest(TestCase):
+
+    def test_search(self):
+        index = PrefixIndex([
+            (1, "Django Uni-Form", "django-uni-form"),
+            (2, "django-crispy-forms", "django-crispy-forms"),
+            (3, "Celery", "celery"),
+        ])
+        self.assertEqual(index.search("uni"), [("Django Uni-Form", 1)])
+        self.assertEqual(index.search("DJANGO"), [("Django Uni-Form", 1), ("django-crispy-forms", 2)])
+        self.assertEqual(index.search("crispy"), [("django-crispy-forms", 2)])
+        self.assertEqual(index.search("django", limit=1), [("Django Uni-Form", 1)])
+        self.assertEqual(index.search("x"), [])
+
+
+class AutocompleteTest(TestCase):
+
+    def setUp(self):
+        initial_data.load()
+
+    def test_reload_on_change(self):
+        self.assertEqual(autocomplete.search(autocomplete.PACKAGE, "super"), [("Supertester", 2)])
+        package = Package.objects.get(slug="supertester")
+        package.title = "Hypertester"
+        package.save()
+        self.assertEqual(autocomplete.search(autocomplete.PACKAGE, "super"), [("Hypertester", 2)])
+        self.assertEqual(autocomplete.search(autocomplete.PACKAGE, "hyper"), [("Hypertester", 2)])
+        package.delete()
+        self.assertEqual(autocomplete.search(autocomplete.PACKAGE, "hyper"), [])
+
+    def test_invalidated_by_title_and_slug_only(self):
+        version = autocomplete._index.current_version()
+        package = Package.objects.get(slug="supertester")
+        package.repo_watchers = 10
+        package.save()
+        self.assertEqual(autocomplete._index.current_version(), version)
+        package.slug = "hypertester"
+        package.save()
+        self.assertNotEqual(autocomplete._index.current_version(), version)
+
+    def test_no_queries(self):
+        autocomplete.search(autocomplete.GRID, "test")
+        with self.assertNumQueries(0):
+            self.assertEqual(autocomplete.search(autocomplete.GRID, "another"), [("Another Testing", 2)])
+
+    def test_ajax_package_list_view(self):
+        response = self.client.get(reverse("ajax_package_list") + "?q=ser")
+        self.assertContains(response, "Serious Testing")
+        self.assertNotContains(response, "Supertester")
@@ -0,0 +1,66 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from searchv2 import benchmark
+from searchv2.models import SearchV2
+
+
+class MetricsTest(SimpleTestCase):
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([3], 95), 3)
+        self.assertEqual(benchmark.percentile([], 50), 0)
+
+    def test_reciprocal_rank(self):
+        relevant = {"django-filter": 2}
+        self.assertEqual(benchmark.reciprocal_rank(["django-filter", "a"], relevant), 1)
+        self.assertEqual(benchmark.reciprocal_rank(["a", "b", "django-filter"], relevant), 1 / 3)
+        self.assertEqual(benchmark.reciprocal_rank(["a", "b"], relevant), 0)
+
+    def test_ndcg(self):
+        relevant = {"a": 3, "b": 1}
+        self.assertEqual(benchmark.ndcg(["a", "b", "c"], relevant), 1)
+        self.assertLess(benchmark.ndcg(["b", "a"], relevant), 1)
+        self.assertEqual(benchmark.ndcg(["c"], relevant), 0)
+        self.assertEqual(benchmark.ndcg(["a"], {}), 0)
+
+
+class BenchmarkTest(TestCase):
+
+    def test_generate_corpus(self):
+        self.assertEqual(benchmark.generate_corpus(50, seed=1), 50)
+        self.assertEqual(SearchV2.objects.count(), 50)
+        self.assertFalse(SearchV2.objects.filter(search_vector__isnull=True).exists())
+        slugs = set(SearchV2.objects.values_list("slug", flat=True))
+        self.assertTrue({slug for _, slug, _, _ in benchmark.ANCHORS} <= slugs)
+
+    @override_settings(SEARCH_BACKEND="postgres")
+    def test_run_benchmark(self):
+        cache.clear()
+        benchmark.generate_corpus(50)
+        judgements = {
+            "rest framework": {"django-rest-framework": 3},
+            "wagtail": {"wagtail": 3},
+        }
+        reports = benchmark.run_benchmark(benchmark.BACKENDS, list(judgements), judgements, repeat=2)
+        self.assertEqual(set(reports), set(benchmark.BACKENDS))
+        for report in reports.values():
+            self.assertEqual(report["mrr"], 1)
+            self.assertLessEqual(report["p50"], report["p99"])
+        self.assertEqual(reports["postgres"]["queries"], 1)
+        # The search query then the rows on the first pass, only the rows on
+        # the second one
+        self.assertEqual(reports["cached"]["queries"], 1.5)
+        self.assertEqual(reports["bm25"]["queries"], 1)
+
+    def test_data_files(self):
+        queries = benchmark.load_queries()
+        judgements = benchmark.load_judgements()
+        self.assertTrue(queries)
+        self.assertTrue(set(judgements) <= set(queries))
+        anchors = {slug for _, slug, _, _ in benchmark.ANCHORS}
+        for relevant in judgements.values():
+            self.assertTrue(set(relevant) <= anchors)
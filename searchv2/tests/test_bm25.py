@@ -0,0 +1,123 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from package.models import Package
+from package.tests import initial_data
+from searchv2 import bm25
+from searchv2.builders import build_1
+from searchv2.cache import search_ids, search_results
+from searchv2.models import SearchV2
+
+ROWS = [
+    (1, 140, "Django REST framework", "REST framework", "django-rest-framework", "Web APIs for Django.", "App", "tom"),
+    (2, 110, "django-celery-beat", "celery-beat", "django-celery-beat", "Periodic tasks for Celery.", "App", ""),
+    (5, 10, "django-rest-utils", "rest-utils", "django-rest-utils", "Utilities for REST APIs.", "Other", None),
+]
+
+
+class BM25IndexTest(SimpleTestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, "searchv2.idx")
+
+    def index(self, rows=ROWS):
+        bm25.write_arrays(bm25.build_arrays(rows), self.path)
+        return bm25.BM25Index(self.path)
+
+    def test_arrays(self):
+        index = self.index()
+        self.assertEqual(list(index.doc_ids), [1, 2, 5])
+        self.assertEqual(list(index.doc_weights), [140, 110, 10])
+        tokens = [index.token(i) for i in range(len(index.token_offsets) - 1)]
+        self.assertEqual(tokens, sorted(tokens))
+        self.assertIn(b"celery", tokens)
+
+    def test_search(self):
+        index = self.index()
+        self.assertEqual(index.search("rest"), [1, 5])
+        self.assertEqual(index.search("res"), [1, 5])
+        self.assertEqual(index.search("REST framework"), [1])
+        self.assertEqual(index.search("utilities"), [5])
+        self.assertEqual(index.search("rest", limit=1), [1])
+        self.assertEqual(index.search("!!!"), [])
+        self.assertEqual(index.search("zzz"), [])
+
+    def test_any_word(self):
+        # No document holds "beet", so the ones holding "celery" match
+        self.assertEqual(self.index().search("celery beet"), [2])
+
+    def test_blend_weight(self):
+        rows = [(1, 0) + ROWS[0][2:], (2, 100) + ROWS[2][2:]]
+        index = self.index(rows)
+        with self.settings(SEARCH_BM25_WEIGHT=0):
+            self.assertEqual(index.search("rest"), [2, 1])
+        with self.settings(SEARCH_BM25_WEIGHT=1000):
+            self.assertEqual(index.search("rest framework utilities"), [1, 2])
+
+    def test_empty(self):
+        self.assertEqual(self.index([]).search("rest"), [])
+
+    def test_truncated(self):
+        self.index()
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 8)
+        with self.assertRaises(ValueError):
+            bm25.BM25Index(self.path)
+
+    def test_not_an_index(self):
+        with open(self.path, "wb") as f:
+            f.write(b"Not an index")
+        with self.assertRaises(ValueError):
+            bm25.BM25Index(self.path)
+
+
+@override_settings(SEARCH_BACKEND="bm25")
+class BM25BackendTest(TestCase):
+
+    def setUp(self):
+        initial_data.load()
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.path = os.path.join(tmp_dir.name, "searchv2.idx")
+
+    def test_search(self):
+        with self.settings(SEARCH_BM25_INDEX=self.path):
+            build_1()
+            self.assertTrue(os.path.exists(self.path))
+            self.assertEqual(search_results("ser")[0].title, "Serious Testing")
+            results = search_results("another tes")
+            self.assertEqual({item.title for item in results}, {"Another Test", "Another Testing"})
+            supertester = SearchV2.objects.get(slug="supertester")
+            with self.assertNumQueries(0):
+                self.assertEqual(search_ids("thetestm"), [supertester.pk])
+            self.assertEqual(search_ids("!!!"), [])
+
+    def test_rebuild(self):
+        with self.settings(SEARCH_BM25_INDEX=self.path):
+            build_1()
+            self.assertEqual(search_ids("hyper"), [])
+            package = Package.objects.get(slug="supertester")
+            package.title = "Hypertester"
+            package.save()
+            build_1()
+            self.assertEqual(search_ids("hyper"), [SearchV2.objects.get(slug="supertester").pk])
+
+    def test_no_index(self):
+        with self.settings(SEARCH_BACKEND="postgres"):
+            build_1()
+        with self.settings(SEARCH_BM25_INDEX=self.path):
+            # Falls back to Postgres until a build writes the index
+            self.assertEqual(search_results("ser")[0].title, "Serious Testing")
+
+    def test_broken_index(self):
+        with self.settings(SEARCH_BACKEND="postgres"):
+            build_1()
+        with open(self.path, "wb") as f:
+            f.write(bm25.MAGIC + b"\xff")
+        with self.settings(SEARCH_BM25_INDEX=self.path):
+            self.assertIsNone(bm25.search_ids("ser"))
+            self.assertEqual(search_results("ser")[0].title, "Serious Testing")
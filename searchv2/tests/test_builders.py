@@ -1,8 +1,12 @@
-from django.test import TestCase
+from django.db import IntegrityError, transaction
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
 
 from package.tests import initial_data
-from searchv2.models import SearchV2
-from searchv2.builders import build_1
+from grid.models import Grid
+from package.models import Package
+from searchv2.models import SearchBuild, SearchV2
+from searchv2.builders import build_1, build_incremental, grid_weight, package_weight
 
 
 class BuilderTest(TestCase):
@@ -14,3 +18,76 @@ class BuilderTest(TestCase):
         self.assertEqual(SearchV2.objects.count(), 0)
         build_1()
         self.assertEqual(SearchV2.objects.count(), 6)
+
+    def test_build_incremental(self):
+        build_1()
+        self.assertEqual(SearchBuild.objects.filter(full=True).count(), 1)
+        package = Package.objects.get(slug="supertester")
+        package.title = "Hypertester"
+        package.save()
+        Grid.objects.get(slug="another-testing").delete()
+
+        build_incremental()
+        build = SearchBuild.objects.first()
+        self.assertFalse(build.full)
+        self.assertEqual(build.items, 1)
+        self.assertEqual(SearchV2.objects.get(slug="supertester").title, "Hypertester")
+        self.assertFalse(SearchV2.objects.filter(slug="another-testing").exists())
+        self.assertEqual(SearchV2.objects.count(), 5)
+
+        build_incremental()
+        self.assertEqual(SearchBuild.objects.first().items, 0)
+
+    def test_build_1_queries(self):
+        build_1()
+        package = SearchV2.objects.get(slug="supertester")
+        package.weight = -1
+        package.save()
+        with self.assertNumQueries(11):
+            build_1()
+        self.assertEqual(SearchV2.objects.count(), 6)
+        self.assertNotEqual(SearchV2.objects.get(slug="supertester").weight, -1)
+
+    def test_unique_item(self):
+        build_1()
+        row = SearchV2.objects.get(slug="supertester")
+        row.pk = None
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            row.save()
+        build_1()
+        self.assertEqual(SearchV2.objects.filter(slug="supertester").count(), 1)
+
+
+class WeightTest(SimpleTestCase):
+
+    def package(self, **fields):
+        row = {
+            "deprecated": False,
+            "description": "",
+            "repo_watchers": 0,
+            "repo_forks": 0,
+            "pypi_downloads": 0,
+            "usage": 0,
+            "last_committed": None,
+            "last_released": None,
+        }
+        row.update(fields)
+        return row
+
+    def test_package_weight(self):
+        now = timezone.now()
+        row = self.package(description="Testing", repo_watchers=5, pypi_downloads=2500, last_committed=now)
+        self.assertEqual(package_weight(row, False, now), 47)
+        self.assertEqual(package_weight(row, True, now), 67)
+
+    def test_deprecated_package_weight(self):
+        now = timezone.now()
+        row = self.package(deprecated=True, description="Testing", repo_watchers=5)
+        self.assertEqual(package_weight(row, False, now), 0)
+        self.assertEqual(package_weight(row, True, now), 20)
+
+    def test_grid_weight(self):
+        row = {"is_locked": False, "header": False, "has_packages": True}
+        # Three sixths below the heaviest package, truncated
+        self.assertEqual(grid_weight(row, 120), 60)
+        self.assertEqual(grid_weight(row, 115), 57)
@@ -0,0 +1,41 @@
+from django.test import TestCase
+
+from package.models import Package
+from package.tests import initial_data
+from searchv2.builders import build_1
+from searchv2.cache import current_generation, max_weight, search_ids, search_results
+from searchv2.models import SearchBuild, SearchV2
+
+
+class SearchCacheTest(TestCase):
+
+    def setUp(self):
+        initial_data.load()
+        build_1()
+
+    def test_generation(self):
+        self.assertEqual(current_generation(), SearchBuild.objects.first().pk)
+        build_1()
+        self.assertEqual(current_generation(), SearchBuild.objects.first().pk)
+
+    def test_search_results(self):
+        self.assertEqual(search_results('ser')[0].title, 'Serious Testing')
+        with self.assertNumQueries(1):
+            self.assertEqual(search_results('  SER ')[0].title, 'Serious Testing')
+        self.assertEqual(search_results(''), [])
+
+    def test_invalidated_by_build(self):
+        self.assertEqual(search_ids('hyper'), [])
+        package = Package.objects.get(slug='supertester')
+        package.title = 'Hypertester'
+        package.save()
+        # Cached until the next build
+        self.assertEqual(search_ids('hyper'), [])
+        build_1()
+        self.assertEqual(search_ids('hyper'), [SearchV2.objects.get(slug='supertester').pk])
+
+    def test_max_weight(self):
+        weight = max_weight()
+        self.assertEqual(weight, max(SearchV2.objects.values_list('weight', flat=True)))
+        with self.assertNumQueries(0):
+            self.assertEqual(max_weight(), weight)
@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.test_utils.stub_server import StubServer
+from package.models import HTTPValidator
+from package.tests import initial_data
+from searchv2.builders import build_1
+from searchv2.docs import probe_docs
+from searchv2.models import DocsProbe, SearchV2
+
+# Stand-in for the Read the Docs build API
+ROUTES = {
+    ("GET", "/api/v1/build/testability/"): (200, {"meta": {"total_count": 3}, "objects": []}),
+    ("GET", "/api/v1/build/supertester/"): (200, {"meta": {"total_count": 0}, "objects": []}),
+    ("GET", "/api/v1/build/serious-testing/"): (500, "Internal Server Error"),
+}
+
+
+class DocsProbeTest(TestCase):
+
+    def probe(self, server, slugs, now=None):
+        with override_settings(READTHEDOCS_API_URL=server.url + "/api/v1"):
+            return probe_docs(slugs, now)
+
+    def test_probe_docs(self):
+        slugs = ["testability", "supertester", "serious-testing", "another-test"]
+        with StubServer(ROUTES) as server:
+            results = self.probe(server, slugs)
+        self.assertEqual(results, {
+            "testability": True,
+            "supertester": False,
+            "serious-testing": False,
+            "another-test": False,
+        })
+        self.assertEqual(len(server.requests), 4)
+        # Failed probes are not stored, so they are retried
+        self.assertEqual(
+            set(DocsProbe.objects.values_list("slug", flat=True)),
+            {"testability", "supertester", "another-test"},
+        )
+
+    def test_ttl(self):
+        slugs = ["testability", "supertester"]
+        with StubServer(ROUTES) as server:
+            self.probe(server, slugs)
+            self.assertEqual(self.probe(server, slugs), {"testability": True, "supertester": False})
+            self.assertEqual(len(server.requests), 2)
+
+            later = timezone.now() + timedelta(days=30)
+            self.probe(server, slugs, later)
+            self.assertEqual(len(server.requests), 4)
+        self.assertEqual(DocsProbe.objects.get(slug="testability").checked, later)
+
+    def test_failed_probe_keeps_answer(self):
+        DocsProbe.objects.create(slug="serious-testing", has_docs=True, checked=timezone.now() - timedelta(days=30))
+        with StubServer(ROUTES) as server:
+            self.assertEqual(self.probe(server, ["serious-testing"]), {"serious-testing": True})
+
+    def test_not_revalidated(self):
+        routes = {("GET", "/api/v1/build/testability/"): [
+            (200, {"meta": {"total_count": 3}, "objects": []}, {"ETag": '"a8f3"'}),
+            (304, "", {"ETag": '"a8f3"'}),
+        ]}
+        with StubServer(routes) as server:
+            self.probe(server, ["testability"])
+            later = timezone.now() + timedelta(days=30)
+            # A 304 tells nothing, so the stored answer is kept
+            self.assertEqual(self.probe(server, ["testability"], later), {"testability": True})
+        self.assertNotIn("If-None-Match", server.requests[1][2])
+        self.assertFalse(HTTPValidator.objects.exists())
+        self.assertLess(DocsProbe.objects.get(slug="testability").checked, later)
+
+    def test_build_weight(self):
+        initial_data.load()
+        with StubServer(ROUTES) as server:
+            with override_settings(READTHEDOCS_API_URL=server.url + "/api/v1"):
+                build_1()
+            with_docs = SearchV2.objects.get(slug="testability").weight
+            DocsProbe.objects.all().delete()
+            build_1()
+        self.assertEqual(with_docs - SearchV2.objects.get(slug="testability").weight, 20)
@@ -43,6 +43,29 @@ class FunctionalPackageTest(TestCase):
         results = search_function('ser')
         self.assertEqual(results[0].title, 'Serious Testing')
 
+    def test_search_function_full_text(self):
+        build_1()
+        # Matches the description of Supertester, stemmed
+        results = search_function('commands')
+        self.assertEqual([item.title for item in results], ['Supertester'])
+        # Every word must match, the last one as a prefix
+        results = search_function('another tes')
+        self.assertEqual({item.title for item in results}, {'Another Test', 'Another Testing'})
+        # Participants are searched too
+        results = search_function('thetestm')
+        self.assertEqual([item.title for item in results], ['Supertester'])
+        self.assertFalse(search_function('!!!').exists())
+
+    def test_search_function_fuzzy(self):
+        build_1()
+        results = search_function('supertster')
+        self.assertEqual(results[0].title, 'Supertester')
+        # Full-text matches come before the similar titles
+        results = search_function('serious')
+        self.assertEqual(results[0].title, 'Serious Testing')
+        with self.settings(SEARCH_FUZZY_MIN_RESULTS=0):
+            self.assertFalse(search_function('supertster').exists())
+
 
 class ViewTest(TestCase):
 
@@ -2,8 +2,6 @@ import json
 
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
-from django.db.models import Q
-from django.db.models import Max
 from django.http import HttpResponseForbidden, HttpResponseRedirect, HttpResponse
 from django.shortcuts import render
 
@@ -11,10 +9,12 @@ from rest_framework.generics import ListAPIView, RetrieveAPIView
 
 from homepage.views import homepage
 from package.models import Package
+from searchv2 import autocomplete
 from searchv2.forms import SearchForm
 from searchv2.builders import build_1
+from searchv2.cache import max_weight, search_results
 from searchv2.models import SearchV2
-from searchv2.utils import remove_prefix, clean_title
+from searchv2.query import search_queryset
 
 
 @login_required
@@ -32,18 +32,8 @@ def build_search(request, template_name="searchv2/build_results.html"):
 
 
 def search_function(q):
-    """ TODO - make generic title searches have lower weight """
-
-    items = []
-    if q:
-        items = SearchV2.objects.filter(
-                    Q(clean_title__startswith=clean_title(remove_prefix(q))) |
-                    Q(title__icontains=q) |
-                    Q(title_no_prefix__startswith=q.lower()) |
-                    Q(slug__startswith=q.lower()) |
-                    Q(slug_no_prefix__startswith=q.lower()))
-        #grids    = Grid.objects.filter(Q(title__icontains=q) | Q(description__icontains=q))
-    return items
+    """ Full-text search of grids and packages, see searchv2.query """
+    return search_queryset(q)
 
 
 def search(request, template_name='searchv2/search.html'):
@@ -82,9 +72,9 @@ def search(request, template_name='searchv2/search.html'):
     form = SearchForm(request.GET or None)
 
     return render(request, template_name, {
-            'items': search_function(q),
+            'items': search_results(q),
             'form': form,
-            'max_weight': SearchV2.objects.all().aggregate(Max('weight'))['weight__max']
+            'max_weight': max_weight(),
         })
 
 def search2(request, template_name='searchv2/search.html'):
@@ -99,14 +89,10 @@ def search_packages_autocomplete(request):
     Searches in Packages
     """
     q = request.GET.get('term', '')
-    if q:
-        objects = search_function(q)[:15]
-        objects = objects.values_list('title', flat=True)
-        json_response = json.dumps(list(objects))
-    else:
-        json_response = json.dumps([])
+    titles = [title for title, pk in autocomplete.search(autocomplete.PACKAGE, q, limit=15)]
+    json_response = json.dumps(titles)
 
-    return HttpResponse(json_response, mimetype='text/javascript')
+    return HttpResponse(json_response, content_type='text/javascript')
 
 
 class SearchListAPIView(ListAPIView):
@@ -115,7 +101,7 @@ class SearchListAPIView(ListAPIView):
 
     def get_queryset(self):
         q = self.request.GET.get('q', '')
-        return search_function(q)
+        return search_results(q)
 
 
 class SearchDetailAPIView(RetrieveAPIView):
@@ -76,6 +76,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.DeferredInvalidationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "dj_pagination.middleware.PaginationMiddleware",
@@ -180,6 +181,10 @@ EMAIL_DEBUG = DEBUG
 
 CACHE_TIMEOUT = 60 * 60
 
+# Delete the cache keys dirtied by model saves when the transaction commits
+# (see core.invalidation)
+CACHE_INVALIDATION_ON_COMMIT = True
+
 ROOT_URLCONF = "urls"
 
 SECRET_KEY = "CHANGEME"
@@ -213,6 +218,29 @@ PACKAGINATOR_HELP_TEXT = {
 
 PACKAGINATOR_SEARCH_PREFIX = "django"
 
+# Weight of a full perfect text match (ts_rank 1) against the SearchV2 weight
+SEARCH_RANK_WEIGHT = env.int("SEARCH_RANK_WEIGHT", default=1000)
+
+# Typo-tolerant trigram matches are added when full-text search finds fewer
+# results than this (0 turns them off)
+SEARCH_FUZZY_MIN_RESULTS = env.int("SEARCH_FUZZY_MIN_RESULTS", default=5)
+
+# Minimum pg_trgm word similarity of a query to a title or slug
+SEARCH_FUZZY_THRESHOLD = env.float("SEARCH_FUZZY_THRESHOLD", default=0.5)
+
+# Matches of a query kept in the search result cache, and for how many seconds
+SEARCH_CACHE_MAX_RESULTS = env.int("SEARCH_CACHE_MAX_RESULTS", default=1000)
+SEARCH_CACHE_TIMEOUT = env.int("SEARCH_CACHE_TIMEOUT", default=60 * 60 * 24)
+
+# "postgres", or "bm25" to search the index file the builds write instead
+SEARCH_BACKEND = env("SEARCH_BACKEND", default="postgres")
+
+# BM25 index file, written by the builds and memory-mapped by the web processes
+SEARCH_BM25_INDEX = env("SEARCH_BM25_INDEX", default=os.path.join(PROJECT_ROOT, "searchv2.idx"))
+
+# Weight of one point of BM25 score against the SearchV2 weight
+SEARCH_BM25_WEIGHT = env.float("SEARCH_BM25_WEIGHT", default=10.0)
+
 # if set to False any auth user can add/modify packages
 # only django admins can delete
 RESTRICT_PACKAGE_EDITORS = False
@@ -320,13 +348,6 @@ ADMIN_URL_BASE = environ.get("ADMIN_URL_BASE", r"^admin/")
 
 URL_REGEX_GITHUB = r"(?:http|https|git)://github.com/[^/]*/([^/]*)/{0,1}"
 
-########### redis setup
-
-# import redis
-# from rq import Worker, Queue, Connection
-
-########### end redis setup
-
 ########### crispy_forms setup
 CRISPY_TEMPLATE_PACK = "bootstrap3"
 ########### end crispy_forms setup
@@ -336,9 +357,61 @@ CRISPY_TEMPLATE_PACK = "bootstrap3"
 GITHUB_API_SECRET = environ.get("GITHUB_API_SECRET")
 GITHUB_APP_ID = environ.get("GITHUB_APP_ID")
 GITHUB_TOKEN = environ.get("GITHUB_TOKEN")
+GITHUB_GRAPHQL_URL = environ.get("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+# Repositories fetched per GraphQL query by the package_updater command
+GITHUB_GRAPHQL_BATCH_SIZE = env.int("GITHUB_GRAPHQL_BATCH_SIZE", default=50)
+# Seconds between two REST fetches of the contributors of a repository fetched
+# through GraphQL, which does not list them
+GITHUB_CONTRIBUTORS_INTERVAL = env.int("GITHUB_CONTRIBUTORS_INTERVAL", default=60 * 60 * 24 * 7)
+# Most repositories of a GraphQL batch whose contributors are fetched through
+# REST; the others wait for a later batch
+GITHUB_CONTRIBUTORS_PER_BATCH = env.int("GITHUB_CONTRIBUTORS_PER_BATCH", default=5)
 
 GITLAB_TOKEN = environ.get("GITLAB_TOKEN", "")
 
+########## PACKAGE UPDATER
+# Number of packages refreshed at the same time by the package_updater command
+PACKAGE_UPDATER_WORKERS = env.int("PACKAGE_UPDATER_WORKERS", default=8)
+# Maximum number of requests in flight against a single repo host
+PACKAGE_UPDATER_HOST_CONCURRENCY = env.int("PACKAGE_UPDATER_HOST_CONCURRENCY", default=4)
+# Requests kept in hand before the repo rate limiter waits for the provider's reset
+REPO_RATELIMIT_RESERVE = env.int("REPO_RATELIMIT_RESERVE", default=50)
+# Seconds after which stored ETag/Last-Modified validators are ignored and the
+# resource is downloaded in full again
+HTTP_VALIDATOR_MAX_AGE = env.int("HTTP_VALIDATOR_MAX_AGE", default=60 * 60 * 24 * 7)
+# Queue of the package refreshes requested from the web (see package.jobs).
+# Jobs wait in Redis for a package_refresh_worker process. Only local DEBUG
+# settings without REDIS_URL run them inside the request, and the tests keep
+# them in memory (see settings/test.py).
+PACKAGE_REFRESH_QUEUE = {
+    "BACKEND": "package.jobs.RedisQueue",
+    "LOCATION": env.str("REDIS_URL", default="redis://localhost:6379/0"),
+}
+if DEBUG and "REDIS_URL" not in environ:
+    PACKAGE_REFRESH_QUEUE = {
+        "BACKEND": "package.jobs.InProcessQueue",
+        "OPTIONS": {"EAGER": True},
+    }
+# Refresh jobs run at the same time by each package_refresh_worker process
+PACKAGE_REFRESH_CONCURRENCY = env.int("PACKAGE_REFRESH_CONCURRENCY", default=2)
+# Seconds after which a pending refresh job no longer blocks a new one for the same package
+PACKAGE_REFRESH_JOB_TIMEOUT = env.int("PACKAGE_REFRESH_JOB_TIMEOUT", default=60 * 10)
+# XML-RPC endpoint whose changelog drives pypi_updater --incremental
+PYPI_XMLRPC_URL = environ.get("PYPI_XMLRPC_URL", "https://pypi.org/pypi")
+# Bounds, in seconds, of the interval between two refreshes of a package (see package.scheduling)
+PACKAGE_REFRESH_MIN_INTERVAL = env.int("PACKAGE_REFRESH_MIN_INTERVAL", default=60 * 15)
+PACKAGE_REFRESH_MAX_INTERVAL = env.int("PACKAGE_REFRESH_MAX_INTERVAL", default=60 * 60 * 24 * 7)
+
+########## SEARCH BUILDER
+# Read the Docs API probed for the documentation of each package (empty to skip)
+READTHEDOCS_API_URL = environ.get("READTHEDOCS_API_URL", "https://readthedocs.org/api/v1")
+# Read the Docs requests in flight at the same time while building the index
+READTHEDOCS_PROBE_WORKERS = env.int("READTHEDOCS_PROBE_WORKERS", default=8)
+# Seconds to wait for a Read the Docs response
+READTHEDOCS_PROBE_TIMEOUT = env.int("READTHEDOCS_PROBE_TIMEOUT", default=10)
+# Seconds a stored probe result is reused before the package is probed again
+READTHEDOCS_PROBE_TTL = env.int("READTHEDOCS_PROBE_TTL", default=60 * 60 * 24 * 7)
+
 ########### SEKURITY
 ALLOWED_HOSTS = ["*"]
 
@@ -25,6 +25,11 @@ CACHES = {
     }
 }
 
+PACKAGE_REFRESH_QUEUE = {
+    "BACKEND": "package.jobs.RedisQueue",
+    "LOCATION": env.str("REDIS_URL"),
+}
+
 
 # Anymail with Mailgun
 INSTALLED_APPS += ("anymail",)
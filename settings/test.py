@@ -2,6 +2,8 @@
 locally.
 """
 import logging
+import os
+import tempfile
 
 
 from settings.base import *
@@ -21,6 +23,21 @@ SERVE_MEDIA = DEBUG
 
 PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
 
+# TestCase transactions never commit
+CACHE_INVALIDATION_ON_COMMIT = False
+
+# Refresh jobs run as soon as they are enqueued, without Redis
+PACKAGE_REFRESH_QUEUE = {
+    "BACKEND": "package.jobs.InProcessQueue",
+    "OPTIONS": {"EAGER": True},
+}
+
+# Tests probing Read the Docs point this at a StubServer
+READTHEDOCS_API_URL = ""
+
+# Builds and benchmarks run by the tests write their BM25 index here
+SEARCH_BM25_INDEX = os.path.join(tempfile.gettempdir(), f"djangopackages-test-{os.getpid()}.idx")
+
 if "debug_toolbar" in INSTALLED_APPS:
     INSTALLED_APPS.remove("debug_toolbar")
 
@@ -21,3 +21,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "settings.docker")
 
 application = get_wsgi_application()
+
+# Load the autocomplete index before the first request
+from searchv2.autocomplete import warm  # noqa: E402
+warm()
+
+# Map the BM25 search index before the first request
+from django.conf import settings  # noqa: E402
+if settings.SEARCH_BACKEND == "bm25":
+    from searchv2.bm25 import warm as warm_bm25
+    warm_bm25()